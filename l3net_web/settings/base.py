@@ -37,6 +37,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'validation.compression.DecompressRequestMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -156,4 +157,75 @@ CACHES = {
 
 # Hugging Face Configuration
 HF_TOKEN = os.getenv('HF_TOKEN', '')
-HF_REPO_ID = os.getenv('HF_REPO_ID', 'sieben-ips/l3net')
\ No newline at end of file
+HF_REPO_ID = os.getenv('HF_REPO_ID', 'sieben-ips/l3net')
+
+# Dataset versions are cached in the database and refreshed in the background
+# once older than HF_VERSIONS_TTL; failed or unknown-version lookups re-check
+# the hub at most once per HF_VERSIONS_RETRY_INTERVAL (seconds)
+HF_VERSIONS_TTL = int(os.getenv('HF_VERSIONS_TTL', 300))
+HF_VERSIONS_RETRY_INTERVAL = int(os.getenv('HF_VERSIONS_RETRY_INTERVAL', 60))
+
+# Hub client: timeouts (seconds), retries of transient errors, and the circuit
+# breaker that fails fast after HF_HUB_CIRCUIT_FAILURES consecutive failures
+HF_HUB_CONNECT_TIMEOUT = float(os.getenv('HF_HUB_CONNECT_TIMEOUT', 3.05))
+HF_HUB_READ_TIMEOUT = float(os.getenv('HF_HUB_READ_TIMEOUT', 10))
+HF_HUB_MAX_RETRIES = int(os.getenv('HF_HUB_MAX_RETRIES', 2))
+HF_HUB_RETRY_MAX_DELAY = float(os.getenv('HF_HUB_RETRY_MAX_DELAY', 2))
+HF_HUB_CIRCUIT_FAILURES = int(os.getenv('HF_HUB_CIRCUIT_FAILURES', 5))
+HF_HUB_CIRCUIT_RESET_SECONDS = int(os.getenv('HF_HUB_CIRCUIT_RESET_SECONDS', 30))
+HF_HUB_POOL_SIZE = int(os.getenv('HF_HUB_POOL_SIZE', 10))
+
+# Exam image sources. Each dataset version is served by the source named in
+# IMAGE_SOURCE_VERSIONS (e.g. "v1.0=mirror,v1.1=mirror"), or IMAGE_SOURCE_DEFAULT.
+# The mirror expects one snapshot_download tree per revision: <root>/<revision>/...
+IMAGE_SOURCES = {
+    'huggingface': {
+        'BACKEND': 'validation.images.sources.HuggingFaceSource',
+    },
+    'filesystem': {
+        'BACKEND': 'validation.images.sources.FilesystemSource',
+    },
+}
+if os.getenv('IMAGE_MIRROR_ROOT'):
+    IMAGE_SOURCES['mirror'] = {
+        'BACKEND': 'validation.images.sources.LocalMirrorSource',
+        'OPTIONS': {'root': os.getenv('IMAGE_MIRROR_ROOT')},
+    }
+IMAGE_SOURCE_DEFAULT = os.getenv('IMAGE_SOURCE_DEFAULT', 'huggingface')
+IMAGE_SOURCE_VERSIONS = dict(
+    item.strip().split('=', 1) for item in os.getenv('IMAGE_SOURCE_VERSIONS', '').split(',') if '=' in item
+)
+
+# Exam image cache (bounded, LRU-evicted copy of dataset images on local disk)
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(BASE_DIR, 'tmp', 'image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', 5 * 1024 ** 3))  # 5 GiB
+
+# Long-edge sizes (px) of the JPEG previews rendered for exam lists and the viewer
+IMAGE_PREVIEW_SIZES = [256, 1024]
+
+# Optional internal redirect for serving cached images through a fronting proxy
+# (e.g. nginx X-Accel-Redirect). The prefix maps to IMAGE_CACHE_DIR; leave empty
+# to stream files from Django with sendfile.
+IMAGE_ACCEL_REDIRECT_PREFIX = os.getenv('IMAGE_ACCEL_REDIRECT_PREFIX', '')
+IMAGE_ACCEL_REDIRECT_HEADER = os.getenv('IMAGE_ACCEL_REDIRECT_HEADER', 'X-Accel-Redirect')
+
+# Background prefetch of the next exams of a run when an exam is opened.
+# Set IMAGE_PREFETCH_COUNT to 0 to disable.
+IMAGE_PREFETCH_COUNT = int(os.getenv('IMAGE_PREFETCH_COUNT', 3))
+IMAGE_PREFETCH_WORKERS = int(os.getenv('IMAGE_PREFETCH_WORKERS', 2))
+IMAGE_PREFETCH_MAX_PENDING_PER_USER = int(os.getenv('IMAGE_PREFETCH_MAX_PENDING_PER_USER', 3))
+
+# Bulk ingestion: rows per INSERT batch, and how dataset files map to exams.
+# The manifest pattern is matched against each file path of a dataset revision
+# and must capture the exam identifier as (?P<external_id>...).
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 1000))
+# Asynchronous ingest jobs (manage.py run_ingest_worker): seconds between polls
+# for new jobs, and after which a running job without progress is failed
+INGEST_WORKER_POLL_SECONDS = float(os.getenv('INGEST_WORKER_POLL_SECONDS', 2))
+INGEST_JOB_STALE_SECONDS = int(os.getenv('INGEST_JOB_STALE_SECONDS', 900))
+# Largest body accepted once a gzip/zstd request is decompressed (zip-bomb guard)
+INGEST_MAX_DECOMPRESSED_BYTES = int(os.getenv('INGEST_MAX_DECOMPRESSED_BYTES', 512 * 1024 * 1024))
+EXAM_MANIFEST_PATTERN = os.getenv(
+    'EXAM_MANIFEST_PATTERN',
+    r'^(?:.*/)?(?P<external_id>[^/]+)\.(?:png|jpe?g|tiff?|bmp|dcm)$'
+)
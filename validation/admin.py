@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.contrib import messages
 from django.db import transaction
 import random
-from .models import Exam, Run, ModelVersion
+from .models import Exam, Run, ModelVersion, IngestJob
 
 @admin.register(Exam)
 class ExamAdmin(admin.ModelAdmin):
@@ -128,3 +128,12 @@ class RunAdmin(admin.ModelAdmin):
     def get_exam_count(self, obj):
         return obj.get_exam_count()
     get_exam_count.short_description = 'Exam Count'
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'run', 'processed', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind', 'created_at')
+    readonly_fields = ('run', 'processed', 'total', 'result', 'errors', 'worker',
+                       'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    exclude = ('payload',)  # may be many megabytes
+    ordering = ('-created_at',)
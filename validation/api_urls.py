@@ -16,6 +16,9 @@ urlpatterns = [
     # Exam endpoints
     path('exams/', api_views.ExamListCreateView.as_view(), name='exam_list_create'),
     path('exams/all/', api_views.list_all_exams, name='list_all_exams'),
+    path('exams/bulk/', api_views.bulk_create_exams, name='bulk_create_exams'),
+    path('exams/resolve/', api_views.resolve_exams, name='resolve_exams'),
+    path('exams/import/', api_views.import_exams_from_manifest, name='import_exams_from_manifest'),
     path('exams/<int:pk>/', api_views.ExamDetailView.as_view(), name='exam_detail'),
     path('exams/external/<str:external_id>/', api_views.get_exam_by_external_id, name='get_exam_by_external_id'),
     
@@ -28,8 +31,12 @@ urlpatterns = [
     path('runs/<int:pk>/', api_views.RunDetailView.as_view(), name='run_detail'),
     path('runs/with-predictions/', api_views.create_run_with_predictions, name='create_run_with_predictions'),
     path('runs/<int:run_id>/predictions/', api_views.add_predictions_to_run, name='add_predictions_to_run'),
+    path('runs/<int:run_id>/predictions/stream/', api_views.stream_predictions_to_run, name='stream_predictions_to_run'),
     path('runs/<int:run_id>/predictions/get/', api_views.get_run_predictions, name='get_run_predictions'),
     
+    # Ingestion job endpoints
+    path('jobs/<int:job_id>/', api_views.get_ingest_job, name='get_ingest_job'),
+    
     # Assignment endpoints
     path('assign-run/', api_views.assign_run_to_user, name='assign_run'),
 ]
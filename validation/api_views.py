@@ -1,27 +1,49 @@
+import io
+
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 
 from .models import (
-    Exam, Run, ModelVersion, Polygon, 
-    PredVertebra, PredSeverity, Validation, RunAssignment
+    Exam, Run, ModelVersion,
+    PredVertebra, PredSeverity, Validation, RunAssignment, IngestJob
 )
 from .serializers import (
-    ExamSerializer, ExamCreateSerializer, RunSerializer, 
+    ExamSerializer, ExamCreateSerializer, ExamBulkCreateSerializer, ExamResolveSerializer, RunSerializer,
     RunWithPredictionsSerializer, ModelVersionSerializer,
     PredVertebraSerializer, PredSeveritySerializer,
-    ValidationSerializer, RunAssignmentSerializer
+    ValidationSerializer, RunAssignmentSerializer, IngestJobSerializer
+)
+
+from .compression import accepts_compressed_body
+from .hub import HubUnavailable, get_available_versions, is_available_version
+from .images.sources import ImageNotFound, get_image_source
+from .ingest.exams import (
+    EXAM_CONFLICT_MODES, ExamsAlreadyExist, create_exams, import_exams, import_exams_from_revision,
+    resolve_external_ids,
 )
+from .ingest.jobs import enqueue_job
+from .ingest.payloads import validate_predictions_payload, validate_run_payload
+from .ingest.predictions import CONFLICT_ERROR, CONFLICT_MODES, add_exams_to_run, create_predictions
+from .ingest.stream import MAX_STREAM_BATCH_SIZE, ingest_prediction_stream
+from .parsers import LegacyMessagePackParser, MessagePackParser
 
 User = get_user_model()
 
+# Prediction uploads may also be sent as MessagePack (columnar layout)
+PREDICTION_PARSERS = api_settings.DEFAULT_PARSER_CLASSES + [MessagePackParser, LegacyMessagePackParser]
+
 
 # ============ AUTHENTICATION SERIALIZERS ============
 
@@ -129,6 +151,7 @@ class ExamListCreateView(generics.ListCreateAPIView):
     GET /api/exams/?page=2&page_size=10 - Get page 2 with 10 items per page
     POST /api/exams/ - Create a new exam
     """
+    accepts_compressed_body = True
     queryset = Exam.objects.all().order_by('-created_at')
     permission_classes = [IsAdminUser]
     
@@ -219,6 +242,7 @@ class ExamDetailView(generics.RetrieveUpdateDestroyAPIView):
     PUT /api/exams/{id}/ - Update exam
     DELETE /api/exams/{id}/ - Delete exam
     """
+    accepts_compressed_body = True
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
     permission_classes = [IsAdminUser]
@@ -243,6 +267,187 @@ def get_exam_by_external_id(request, external_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@accepts_compressed_body
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def bulk_create_exams(request):
+    """
+    Create many exams in one transaction.
+    
+    POST /api/exams/bulk/
+    POST /api/exams/bulk/?on_conflict=skip - return exams that already exist
+    instead of rejecting the request
+    
+    Expected JSON structure:
+    {
+        "version": "v1.0",
+        "exams": [
+            {"external_id": "EXAM-001", "image_path": "images/EXAM-001.png"},
+            {"external_id": "EXAM-002", "image_path": "images/EXAM-002.png", "version": "main"}
+        ]
+    }
+    
+    "version" is the default for exams without their own (defaults to "main").
+    Existing external_ids are looked up with a single query.
+    """
+    on_conflict = request.query_params.get('on_conflict', CONFLICT_ERROR)
+    if on_conflict not in EXAM_CONFLICT_MODES:
+        return Response({
+            'success': False,
+            'errors': {'on_conflict': [f"Must be one of: {', '.join(EXAM_CONFLICT_MODES)}."]}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ExamBulkCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        exams = create_exams(serializer.validated_data['exams'], on_conflict=on_conflict)
+    except ExamsAlreadyExist as e:
+        return Response({
+            'success': False,
+            'errors': {'exams': [str(e)]}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError as e:
+        # Another request created some of the same exams meanwhile; nothing was saved
+        return Response({
+            'success': False,
+            'message': f'Conflicting concurrent insert, retry the request: {str(e)}'
+        }, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Error creating exams: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    created = sum(exam['created'] for exam in exams)
+    return Response({
+        'success': True,
+        'message': f'{created} exams created, {len(exams) - created} already existed.',
+        'created': created,
+        'exams': exams
+    }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@accepts_compressed_body
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def resolve_exams(request):
+    """
+    Look up the ids of many exams by external_id in one query.
+    
+    POST /api/exams/resolve/
+    
+    Expected JSON structure:
+    {
+        "external_ids": ["EXAM-001", "EXAM-002", "EXAM-404"]
+    }
+    """
+    serializer = ExamResolveSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    external_ids = serializer.validated_data['external_ids']
+    stored = resolve_external_ids(external_ids)
+    return Response({
+        'success': True,
+        'exams': {external_id: {'id': id_, 'version': version} for external_id, (id_, version) in stored.items()},
+        'missing': [external_id for external_id in dict.fromkeys(external_ids) if external_id not in stored]
+    })
+
+
+@accepts_compressed_body
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_exams_from_manifest(request):
+    """
+    Create exams in bulk from the file listing of a dataset revision.
+
+    POST /api/exams/import/
+
+    Expected JSON structure:
+    {
+        "version": "v1.0",
+        "pattern": "^images/(?P<external_id>[^/]+)\\.png$",
+        "paths": ["images/EXAM-001.png", "images/EXAM-002.png"],
+        "dry_run": false
+    }
+
+    Only "version" is required; without "paths" the revision's files are
+    listed from its image source.
+    """
+    version = request.data.get('version') or 'main'
+    paths = request.data.get('paths')
+    if paths is not None and (not isinstance(paths, list) or not all(isinstance(p, str) for p in paths)):
+        return Response({
+            'success': False,
+            'errors': {'paths': ['Must be a list of file paths.']}
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Form bodies send booleans as strings such as "false"
+        dry_run = serializers.BooleanField().to_internal_value(request.data.get('dry_run', False))
+    except serializers.ValidationError as e:
+        return Response({
+            'success': False,
+            'errors': {'dry_run': e.detail}
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        options = {
+            'pattern': request.data.get('pattern') or None,
+            'dry_run': dry_run,
+        }
+        # Listing a revision checks it, except on sources that list the same files for any version
+        checked_by_source = paths is None and get_image_source(version).has_revisions
+        if not checked_by_source and not is_available_version(version):
+            return Response({
+                'success': False,
+                'errors': {'version': [
+                    f"Version '{version}' does not exist in the Hugging Face repository. "
+                    f"Available versions: {', '.join(get_available_versions())}"
+                ]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if paths is None:
+            report = import_exams_from_revision(version, **options)
+        else:
+            report = import_exams(paths, version, **options)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'errors': {'pattern': [str(e)]}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except ImageNotFound as e:
+        return Response({
+            'success': False,
+            'errors': {'version': [str(e)]}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except HubUnavailable as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Error importing exams: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'success': True,
+        'message': f'{report.created} exams created, {report.skipped} already existed, {report.invalid} invalid.',
+        'version': version,
+        'dry_run': options['dry_run'],
+        'report': report.as_dict()
+    }, status=status.HTTP_201_CREATED if report.created and not options['dry_run'] else status.HTTP_200_OK)
+
+
 # ============ MODEL VERSION API VIEWS ============
 class ModelVersionListCreateView(generics.ListCreateAPIView):
     """
@@ -320,13 +525,30 @@ class RunDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminUser]
 
 
+def _wants_async(request):
+    return request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def _job_accepted(request, job):
+    return Response({
+        'success': True,
+        'message': f'Ingestion job {job.id} queued.',
+        'job_id': job.id,
+        'status_url': request.build_absolute_uri(reverse('validation_api:get_ingest_job', args=[job.id]))
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@accepts_compressed_body
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
+@parser_classes(PREDICTION_PARSERS)
 def create_run_with_predictions(request):
     """
     Create a complete run with predictions in a single API call.
     
     POST /api/runs/with-predictions/
+    POST /api/runs/with-predictions/?async=true - queue the payload as an
+    ingestion job and return 202 with its id (see get_ingest_job)
     
     Expected JSON structure:
     {
@@ -364,12 +586,18 @@ def create_run_with_predictions(request):
         ]
     }
     """
-    serializer = RunWithPredictionsSerializer(data=request.data)
+    if _wants_async(request):
+        job = enqueue_job(IngestJob.RUN_WITH_PREDICTIONS, request.data, user=request.user)
+        return _job_accepted(request, job)
     
-    if serializer.is_valid():
+    run_data, exam_ids, vertebra_rows, severity_rows, errors = validate_run_payload(request.data)
+    
+    if not errors:
         try:
             with transaction.atomic():
-                run = serializer.save()
+                run = Run.objects.create(**run_data)
+                add_exams_to_run(run, exam_ids)
+                create_predictions(run, vertebra_rows, severity_rows)
                 return Response({
                     'success': True,
                     'message': f'Run "{run.name}" created successfully with predictions.',
@@ -384,17 +612,31 @@ def create_run_with_predictions(request):
     
     return Response({
         'success': False,
-        'errors': serializer.errors
+        'errors': errors
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _invalid_on_conflict():
+    return Response({
+        'success': False,
+        'errors': {'on_conflict': [f"Must be one of: {', '.join(CONFLICT_MODES)}."]}
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@accepts_compressed_body
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
+@parser_classes(PREDICTION_PARSERS)
 def add_predictions_to_run(request, run_id):
     """
     Add predictions to an existing run.
     
-    POST /api/runs/{run_id}/predictions/
+    POST /api/runs/{run_id}/predictions/?on_conflict=update
+    
+    on_conflict decides what happens to predictions that already exist in
+    the run: "error" (default) rejects the request, "update" overwrites them
+    in place and "skip" keeps the stored ones. With ?async=true the payload
+    is queued as an ingestion job instead (202, see get_ingest_job).
     
     Expected JSON structure:
     {
@@ -428,45 +670,32 @@ def add_predictions_to_run(request, run_id):
     """
     run = get_object_or_404(Run, id=run_id)
     
-    vertebra_predictions_data = request.data.get('vertebra_predictions', [])
-    severity_predictions_data = request.data.get('severity_predictions', [])
+    on_conflict = request.query_params.get('on_conflict', CONFLICT_ERROR)
+    if on_conflict not in CONFLICT_MODES:
+        return _invalid_on_conflict()
+    
+    if _wants_async(request):
+        job = enqueue_job(
+            IngestJob.ADD_PREDICTIONS, request.data, user=request.user, run=run,
+            run_id=run.id, on_conflict=on_conflict
+        )
+        return _job_accepted(request, job)
+    
+    vertebra_rows, severity_rows, errors = validate_predictions_payload(request.data)
+    if errors:
+        return Response({
+            'success': False,
+            'errors': errors
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         with transaction.atomic():
-            created_vertebrae = []
-            created_severities = []
-            
-            # Create vertebra predictions
-            for pred_data in vertebra_predictions_data:
-                serializer = PredVertebraSerializer(data=pred_data)
-                if serializer.is_valid():
-                    vertebra = serializer.save(run_id=run)
-                    created_vertebrae.append(vertebra)
-                else:
-                    return Response({
-                        'success': False,
-                        'errors': {'vertebra_predictions': serializer.errors}
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create severity predictions
-            for pred_data in severity_predictions_data:
-                serializer = PredSeveritySerializer(data=pred_data)
-                if serializer.is_valid():
-                    severity = serializer.save(run_id=run)
-                    created_severities.append(severity)
-                else:
-                    return Response({
-                        'success': False,
-                        'errors': {'severity_predictions': serializer.errors}
-                    }, status=status.HTTP_400_BAD_REQUEST)
+            counts = create_predictions(run, vertebra_rows, severity_rows, on_conflict=on_conflict)
             
             return Response({
                 'success': True,
-                'message': f'Added {len(created_vertebrae)} vertebra predictions and {len(created_severities)} severity predictions to run "{run.name}".',
-                'created': {
-                    'vertebrae_count': len(created_vertebrae),
-                    'severities_count': len(created_severities)
-                }
+                'message': f'Added {counts.vertebrae} vertebra predictions and {counts.severities} severity predictions to run "{run.name}".',
+                **counts.as_dict()
             }, status=status.HTTP_201_CREATED)
             
     except Exception as e:
@@ -476,6 +705,61 @@ def add_predictions_to_run(request, run_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@accepts_compressed_body
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def stream_predictions_to_run(request, run_id):
+    """
+    Add predictions to an existing run from a newline-delimited JSON body.
+    
+    POST /api/runs/{run_id}/predictions/stream/?batch_size=5000&on_conflict=update
+    Content-Type: application/x-ndjson
+    
+    One prediction per line, in the same format as add_predictions_to_run
+    plus a "type" of "vertebra" or "severity":
+    {"type": "vertebra", "name": "L1", "confidence": 0.95, "model_version_id": 1, "exam_id": 1, "polygon": {...}}
+    {"type": "severity", "severity_name": "Moderate", "vertebrae_level": "L1/L2", ..., "bounding_box": {...}}
+    
+    The body is read incrementally and committed every batch_size lines;
+    invalid lines are skipped and listed in the report.
+    """
+    run = get_object_or_404(Run, id=run_id)
+    
+    try:
+        batch_size = int(request.query_params.get('batch_size', settings.INGEST_BATCH_SIZE))
+    except ValueError:
+        batch_size = 0
+    if not 1 <= batch_size <= MAX_STREAM_BATCH_SIZE:
+        return Response({
+            'success': False,
+            'errors': {'batch_size': [f'Must be an integer between 1 and {MAX_STREAM_BATCH_SIZE}.']}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    on_conflict = request.query_params.get('on_conflict', CONFLICT_ERROR)
+    if on_conflict not in CONFLICT_MODES:
+        return _invalid_on_conflict()
+    
+    # Never touch request.data: it would read the whole body into memory
+    stream = request.stream or io.BytesIO()
+    try:
+        report = ingest_prediction_stream(run, stream, batch_size=batch_size, on_conflict=on_conflict)
+    except APIException:
+        # e.g. a corrupt or oversized compressed body: let DRF answer with its status code
+        raise
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Error streaming predictions: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        'success': report.ok,
+        'message': f'Added {report.counts.vertebrae} vertebra predictions and {report.counts.severities} severity predictions '
+                   f'to run "{run.name}"; {report.invalid} invalid lines.',
+        'report': report.as_dict()
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def get_run_predictions(request, run_id):
@@ -486,8 +770,8 @@ def get_run_predictions(request, run_id):
     """
     run = get_object_or_404(Run, id=run_id)
     
-    vertebrae = PredVertebra.objects.filter(run_id=run).select_related('polygon', 'model_version')
-    severities = PredSeverity.objects.filter(run_id=run).select_related('bounding_box', 'model_version')
+    vertebrae = PredVertebra.objects.filter(run_id=run).select_related('model_version')
+    severities = PredSeverity.objects.filter(run_id=run).select_related('model_version')
     
     return Response({
         'run_id': run.id,
@@ -497,6 +781,18 @@ def get_run_predictions(request, run_id):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_ingest_job(request, job_id):
+    """
+    Get the status and progress of an asynchronous ingestion job.
+    
+    GET /api/jobs/{job_id}/
+    """
+    job = get_object_or_404(IngestJob, id=job_id)
+    return Response(IngestJobSerializer(job).data)
+
+
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def assign_run_to_user(request):
@@ -0,0 +1,120 @@
+"""
+Compressed request bodies (``Content-Encoding: gzip`` or ``zstd``).
+
+Views opt in with ``accepts_compressed_body`` (or a class attribute of the
+same name), the way ``csrf_exempt`` marks views for ``CsrfViewMiddleware``.
+For those views ``DecompressRequestMiddleware`` replaces the request stream
+with one that decompresses as it is read, so parsers and the NDJSON stream
+endpoint see plain bytes without the body ever being inflated in one piece.
+Reading past ``INGEST_MAX_DECOMPRESSED_BYTES`` fails with 413.
+"""
+import gzip
+import io
+import zlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Decompressed bytes produced per read of the underlying decoder
+READ_SIZE = 64 * 1024
+
+IDENTITY = 'identity'
+
+DECODERS = {'gzip': lambda raw: gzip.GzipFile(fileobj=raw, mode='rb')}
+DECODE_ERRORS = (OSError, EOFError, zlib.error)
+if zstandard is not None:
+    DECODERS['zstd'] = lambda raw: zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+class DecompressedBodyTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Decompressed request body is too large.'
+    default_code = 'decompressed_body_too_large'
+
+
+class DecompressedStream(io.RawIOBase):
+    """Read-only stream of the decompressed bytes of ``source``, capped at ``limit`` bytes."""
+
+    def __init__(self, source, limit):
+        self._source = source
+        self._limit = limit
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            data = self._source.read(min(len(buffer), READ_SIZE))
+        except DECODE_ERRORS as e:
+            raise ParseError(f'Could not decompress the request body - {e}')
+        self.size += len(data)
+        if self.size > self._limit:
+            raise DecompressedBodyTooLarge(
+                f'Decompressed request body exceeds {self._limit} bytes.'
+            )
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def content_codings(request):
+    """Return the non-identity codings of the request body, in the order they were applied."""
+    header = request.META.get('HTTP_CONTENT_ENCODING', '')
+    codings = [coding.strip().lower() for coding in header.split(',')]
+    return [coding for coding in codings if coding and coding != IDENTITY]
+
+
+def decompressing_stream(raw, codings, limit=None):
+    """Wrap the readable ``raw`` so that reading it undoes ``codings``."""
+    for coding in reversed(codings):
+        raw = DECODERS[coding](raw)
+    limit = settings.INGEST_MAX_DECOMPRESSED_BYTES if limit is None else limit
+    return io.BufferedReader(DecompressedStream(raw, limit), buffer_size=READ_SIZE)
+
+
+def accepts_compressed_body(view):
+    """Mark a view as accepting request bodies sent with a Content-Encoding."""
+    view.accepts_compressed_body = True
+    return view
+
+
+def _accepts_compressed_body(view_func):
+    if getattr(view_func, 'accepts_compressed_body', False):
+        return True
+    # Class-based views set the attribute on the class
+    return getattr(getattr(view_func, 'view_class', None), 'accepts_compressed_body', False)
+
+
+class DecompressRequestMiddleware:
+    """Decompress the bodies of requests to views marked with ``accepts_compressed_body``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        codings = content_codings(request)
+        if not codings or not _accepts_compressed_body(view_func):
+            return None
+
+        unsupported = [coding for coding in codings if coding not in DECODERS]
+        if unsupported:
+            return JsonResponse({
+                'success': False,
+                'message': f"Unsupported Content-Encoding: {', '.join(unsupported)}. "
+                           f"Supported: {', '.join(DECODERS)}.",
+            }, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        # HttpRequest.read()/readline() and request.body all go through _stream
+        request._stream = decompressing_stream(request._stream, codings)
+        return None
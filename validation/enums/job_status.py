@@ -0,0 +1,7 @@
+from django.db import models
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'Queued'
+    RUNNING = 'Running'
+    SUCCEEDED = 'Succeeded'
+    FAILED = 'Failed'
@@ -5,4 +5,14 @@ class Severity(models.TextChoices):
     MODERATE = 'Moderate'
     SEVERE = 'Severe'
     NOTHING = 'Nothing'
-    UNKNOWN = 'Unkown'
\ No newline at end of file
+    UNKNOWN = 'Unkown'
+
+
+# Integer stored for each value (see ChoiceCodeField); append new codes, never renumber
+SEVERITY_CODES = {
+    Severity.NORMAL_MILD: 1,
+    Severity.MODERATE: 2,
+    Severity.SEVERE: 3,
+    Severity.NOTHING: 4,
+    Severity.UNKNOWN: 5,
+}
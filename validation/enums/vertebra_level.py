@@ -7,4 +7,15 @@ class VertebraLevel(models.TextChoices):
     L3_L4 = 'L3/L4'
     L4_L5 = 'L4/L5'
     L5_S1 = 'L5/S1'
-    UNKNOWN = 'Unknown'
\ No newline at end of file
+    UNKNOWN = 'Unknown'
+
+
+# Integer stored for each value (see ChoiceCodeField); append new codes, never renumber
+VERTEBRA_LEVEL_CODES = {
+    VertebraLevel.L1_L2: 1,
+    VertebraLevel.L2_L3: 2,
+    VertebraLevel.L3_L4: 3,
+    VertebraLevel.L4_L5: 4,
+    VertebraLevel.L5_S1: 5,
+    VertebraLevel.UNKNOWN: 6,
+}
@@ -12,4 +12,21 @@ class VertebraName(models.TextChoices):
     L4 = 'L4'
     L5 = 'L5'
     S1 = 'S1'
-    UNKNOWN = 'UNKNOWN'
\ No newline at end of file
+    UNKNOWN = 'UNKNOWN'
+
+
+# Integer stored for each value (see ChoiceCodeField); append new codes, never renumber
+VERTEBRA_NAME_CODES = {
+    VertebraName.T8: 1,
+    VertebraName.T9: 2,
+    VertebraName.T10: 3,
+    VertebraName.T11: 4,
+    VertebraName.T12: 5,
+    VertebraName.L1: 6,
+    VertebraName.L2: 7,
+    VertebraName.L3: 8,
+    VertebraName.L4: 9,
+    VertebraName.L5: 10,
+    VertebraName.S1: 11,
+    VertebraName.UNKNOWN: 12,
+}
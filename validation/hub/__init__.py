@@ -0,0 +1,3 @@
+# Hugging Face hub access: pooled fail-fast client and dataset version registry
+from .client import HubClient, HubUnavailable, get_hub_client
+from .versions import get_available_versions, is_available_version, refresh_versions
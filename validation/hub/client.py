@@ -0,0 +1,233 @@
+"""
+Shared, fail-fast access to the Hugging Face hub.
+
+All hub calls go through one ``HubClient`` which provides:
+
+* pooled keep-alive HTTP sessions with a default (connect, read) timeout,
+* bounded retries with exponential backoff and full jitter for transient
+  errors (connection problems, timeouts, 429 and 5xx responses),
+* a circuit breaker that rejects calls immediately with ``HubUnavailable``
+  after repeated transient failures, so callers can serve cached or degraded
+  results instead of tying up a worker thread,
+* per-operation latency and error counters (``stats()``).
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from huggingface_hub import HfApi, configure_http_backend
+from huggingface_hub.utils import (
+    EntryNotFoundError, GatedRepoError, HfHubHTTPError, LocalEntryNotFoundError, RepositoryNotFoundError,
+    RevisionNotFoundError,
+)
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Answers from a healthy hub: retrying them cannot help and they say nothing about its health
+PERMANENT_ERRORS = (EntryNotFoundError, RevisionNotFoundError, RepositoryNotFoundError, GatedRepoError)
+
+
+class HubUnavailable(Exception):
+    """Raised instead of calling the hub while the circuit breaker is open."""
+
+
+def is_transient_error(exc):
+    """Return whether ``exc`` is worth retrying and counts against the hub's health."""
+    if isinstance(exc, LocalEntryNotFoundError):
+        # Raised by hf_hub_download when the hub could not be reached at all
+        return True
+    if isinstance(exc, PERMANENT_ERRORS):
+        return False
+    if isinstance(exc, HfHubHTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return status is None or status == 429 or status >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds; then a single trial call
+    is let through, closing the circuit again if it succeeds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Return whether a call may be attempted now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logger.warning(f"Hugging Face hub circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state(), 'consecutive_failures': self._failures}
+
+
+class _TimeoutSession(requests.Session):
+    """Session that applies a default timeout to requests made without one."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+class HubClient:
+    """Pooled, instrumented and circuit-broken access to the hub (see module docstring)."""
+
+    def __init__(self, timeout, max_retries, failure_threshold, reset_timeout, pool_size):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.api = HfApi()
+
+    def session_factory(self):
+        """Build the HTTP session huggingface_hub uses (one per thread)."""
+        session = _TimeoutSession(self.timeout)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def call(self, operation, func, *args, **kwargs):
+        """
+        Call ``func`` under the retry policy and circuit breaker.
+
+        Raises HubUnavailable without calling ``func`` while the circuit is
+        open; otherwise returns its result or re-raises its last error.
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._record(operation, rejected=True)
+                raise HubUnavailable(f"Hugging Face hub is unavailable ({operation} rejected by circuit breaker)")
+
+            started = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                if not is_transient_error(e):
+                    self.breaker.record_success()
+                    self._record(operation, elapsed)
+                    raise
+                self.breaker.record_failure()
+                self._record(operation, elapsed, failed=True)
+                if attempt == self.max_retries:
+                    raise
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(settings.HF_HUB_RETRY_MAX_DELAY, 0.5 * 2 ** attempt))
+                logger.info(f"Retrying {operation} in {delay:.2f}s after: {e}")
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                self._record(operation, time.monotonic() - started)
+                return result
+
+    def list_repo_refs(self, repo_id, **kwargs):
+        return self.call('list_repo_refs', self.api.list_repo_refs, repo_id, **kwargs)
+
+    def _record(self, operation, elapsed=None, failed=False, rejected=False):
+        with self._lock:
+            metrics = self._metrics.setdefault(operation, {
+                'calls': 0, 'failures': 0, 'rejected': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+            })
+            if rejected:
+                metrics['rejected'] += 1
+                return
+            metrics['calls'] += 1
+            metrics['failures'] += int(failed)
+            metrics['total_seconds'] += elapsed
+            metrics['max_seconds'] = max(metrics['max_seconds'], elapsed)
+
+    def stats(self):
+        """Return the breaker state and per-operation latency/error counters."""
+        with self._lock:
+            operations = {
+                operation: {
+                    'calls': metrics['calls'],
+                    'failures': metrics['failures'],
+                    'rejected': metrics['rejected'],
+                    'avg_ms': round(metrics['total_seconds'] / metrics['calls'] * 1000, 1) if metrics['calls'] else 0,
+                    'max_ms': round(metrics['max_seconds'] * 1000, 1),
+                }
+                for operation, metrics in self._metrics.items()
+            }
+        return {'circuit': self.breaker.stats(), 'operations': operations}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_hub_client():
+    """Return the process-wide hub client, installing its pooled sessions on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = HubClient(
+                    timeout=(settings.HF_HUB_CONNECT_TIMEOUT, settings.HF_HUB_READ_TIMEOUT),
+                    max_retries=settings.HF_HUB_MAX_RETRIES,
+                    failure_threshold=settings.HF_HUB_CIRCUIT_FAILURES,
+                    reset_timeout=settings.HF_HUB_CIRCUIT_RESET_SECONDS,
+                    pool_size=settings.HF_HUB_POOL_SIZE,
+                )
+                configure_http_backend(backend_factory=client.session_factory)
+                _client = client
+    return _client
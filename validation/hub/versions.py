@@ -0,0 +1,149 @@
+"""
+Registry of the versions (tags) of the Hugging Face dataset repository.
+
+The list is stored in ``DatasetVersionRegistry`` so that all workers share it,
+and memoised for a short time in the Django cache so that most lookups do not
+even touch the database. Once the list is older than ``HF_VERSIONS_TTL`` it is
+still served (stale-while-revalidate) while one worker refreshes it from the
+hub in a background thread.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import DatasetVersionRegistry
+from .client import get_hub_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VERSION = 'main'
+
+# How long a worker may keep the list in its local cache before re-reading the database
+LOCAL_CACHE_SECONDS = 60
+
+# A refresh claimed longer ago than this is assumed to have died with its worker
+REFRESH_CLAIM_TIMEOUT = timedelta(minutes=2)
+
+
+class VersionSnapshot:
+    """Immutable view of the registry at one point in time."""
+
+    def __init__(self, versions, fetched_at=None, checked_at=None):
+        self.versions = tuple(versions) or (DEFAULT_VERSION,)
+        self.version_set = frozenset(self.versions)
+        self.fetched_at = fetched_at
+        self.checked_at = checked_at
+
+    @classmethod
+    def from_registry(cls, registry):
+        return cls(registry.versions, registry.fetched_at, registry.checked_at)
+
+
+def fetch_versions_from_hub(repo_id, token):
+    """Return the versions of ``repo_id``: 'main' followed by its tags."""
+    refs = get_hub_client().list_repo_refs(repo_id, repo_type="dataset", token=token or None)
+    versions = [DEFAULT_VERSION]
+    for tag in getattr(refs, 'tags', None) or []:
+        if tag.name not in versions:
+            versions.append(tag.name)
+    return versions
+
+
+def get_available_versions():
+    """Return the known dataset versions, 'main' first. Never blocks on the hub once populated."""
+    return list(_get_snapshot().versions)
+
+
+def is_available_version(version):
+    """
+    Return whether ``version`` is a known dataset version.
+
+    Lookups are answered from the registry. A version that is not there yet
+    (e.g. a tag pushed since the last refresh) triggers at most one
+    synchronous re-check per ``HF_VERSIONS_RETRY_INTERVAL``.
+    """
+    snapshot = _get_snapshot()
+    if version in snapshot.version_set:
+        return True
+    if _is_due(snapshot.checked_at, settings.HF_VERSIONS_RETRY_INTERVAL):
+        return version in refresh_versions().version_set
+    return False
+
+
+def refresh_versions():
+    """Fetch the versions from the hub into the registry and return the resulting snapshot."""
+    repo_id = settings.HF_REPO_ID
+    now = timezone.now()
+    registry, _ = DatasetVersionRegistry.objects.get_or_create(repo_id=repo_id)
+
+    # Only one worker queries the hub at a time; the others keep serving the current list.
+    claimed = DatasetVersionRegistry.objects.filter(pk=registry.pk).filter(
+        Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=now - REFRESH_CLAIM_TIMEOUT)
+    ).update(refresh_started_at=now)
+    if not claimed:
+        return _cache_snapshot(VersionSnapshot.from_registry(registry))
+
+    update = {'checked_at': timezone.now(), 'refresh_started_at': None}
+    try:
+        update['versions'] = fetch_versions_from_hub(repo_id, settings.HF_TOKEN)
+        update['fetched_at'] = update['checked_at']
+        update['last_error'] = ''
+    except Exception as e:
+        logger.error(f"Error fetching HF versions: {e}")
+        update['last_error'] = str(e)
+
+    DatasetVersionRegistry.objects.filter(pk=registry.pk).update(**update)
+    registry.refresh_from_db()
+    return _cache_snapshot(VersionSnapshot.from_registry(registry))
+
+
+def _cache_key():
+    return f'hf_versions:{settings.HF_REPO_ID}'
+
+
+def _cache_snapshot(snapshot):
+    cache.set(_cache_key(), snapshot, LOCAL_CACHE_SECONDS)
+    return snapshot
+
+
+def _is_due(timestamp, seconds):
+    return timestamp is None or timezone.now() - timestamp >= timedelta(seconds=seconds)
+
+
+def _get_snapshot():
+    snapshot = cache.get(_cache_key())
+    if snapshot is None:
+        registry = DatasetVersionRegistry.objects.filter(repo_id=settings.HF_REPO_ID).first()
+        if registry is None or (registry.fetched_at is None and _is_due(registry.checked_at, settings.HF_VERSIONS_RETRY_INTERVAL)):
+            # Nothing to serve yet: the very first lookup has to wait for the hub.
+            return refresh_versions()
+        snapshot = _cache_snapshot(VersionSnapshot.from_registry(registry))
+
+    if _is_due(snapshot.fetched_at, settings.HF_VERSIONS_TTL) and _is_due(snapshot.checked_at, settings.HF_VERSIONS_RETRY_INTERVAL):
+        _refresh_in_background()
+    return snapshot
+
+
+_background_refresh = threading.Lock()
+
+
+def _refresh_in_background():
+    if not _background_refresh.acquire(blocking=False):
+        return  # This process is already refreshing
+
+    def run():
+        try:
+            refresh_versions()
+        except Exception as e:
+            logger.error(f"Background refresh of HF versions failed: {e}")
+        finally:
+            connection.close()
+            _background_refresh.release()
+
+    threading.Thread(target=run, name='hf-versions-refresh', daemon=True).start()
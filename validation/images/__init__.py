@@ -0,0 +1,10 @@
+# Exam image storage, caching and serving helpers
+from .cache import ImageCache, get_image_cache, make_cache_key
+from .loader import fetch_image, get_exam_image, is_image_cached
+from .sources import ImageNotFound, ImageSource, get_image_source
+from .responses import serve_image_file
+from .derivatives import get_exam_preview, preview_bucket
+from .tiles import get_exam_tile, get_exam_tile_pyramid
+from .prefetch import prefetch_exam_images
+from .masks import get_mask_overlay
+from .metadata import ensure_exam_image_metadata, exam_image_metadata
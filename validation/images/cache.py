@@ -0,0 +1,275 @@
+"""
+Persistent on-disk LRU cache for exam images.
+
+Entries are content-addressed by (repo_id, revision, image_path) and stored
+under ``IMAGE_CACHE_DIR``. The total size of the cache is kept below
+``IMAGE_CACHE_MAX_BYTES`` by evicting the least recently used entries.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+
+from .locks import KeyedLock
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(repo_id, revision, image_path, variant=None):
+    """
+    Return the content address for an image in a dataset revision.
+
+    ``variant`` names a derivative of the image (e.g. ``'preview-256.jpg'``).
+    """
+    parts = [repo_id, revision or 'main', image_path]
+    if variant:
+        parts.append(variant)
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _entry_suffix(image_path, variant=None):
+    return Path(variant or image_path).suffix
+
+
+def _disk_usage(path):
+    """Return the size of a cache entry, which is either a file or a directory tree."""
+    if not path.is_dir():
+        return path.stat().st_size
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            total += os.path.getsize(os.path.join(dirpath, filename))
+    return total
+
+
+def _remove_entry(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink()
+
+
+class ImageCache:
+    """
+    Size-bounded LRU cache of image files on local disk.
+
+    Recency is tracked in memory and persisted through the file access time,
+    so the LRU order survives restarts and is shared with other processes
+    (e.g. management commands) writing to the same directory.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.tmp_dir = self.root / 'tmp'
+        self.locks = KeyedLock(self.root / 'locks')
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._index = None  # key -> (path, size), least recently used first
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    # ---- public API ----
+
+    def get(self, repo_id, revision, image_path, variant=None):
+        """Return the cached file path, or None if the image is not cached."""
+        key = make_cache_key(repo_id, revision, image_path, variant)
+        path = self._entry_path(key, _entry_suffix(image_path, variant))
+        with self._lock:
+            self._ensure_index()
+            if self._lookup(key, path):
+                self.hits += 1
+                return path
+            self.misses += 1
+            return None
+
+    def contains(self, repo_id, revision, image_path, variant=None):
+        """Return whether an entry exists, without counting a lookup or touching its recency."""
+        key = make_cache_key(repo_id, revision, image_path, variant)
+        return self._entry_path(key, _entry_suffix(image_path, variant)).exists()
+
+    def discard(self, repo_id, revision, image_path, variant=None):
+        """Remove an entry, e.g. because it failed an integrity check."""
+        key = make_cache_key(repo_id, revision, image_path, variant)
+        path = self._entry_path(key, _entry_suffix(image_path, variant))
+        with self._lock:
+            self._ensure_index()
+            entry = self._index.pop(key, None)
+            if entry:
+                self._total_bytes -= entry[1]
+            try:
+                _remove_entry(path)
+            except FileNotFoundError:
+                pass
+
+    def get_or_fetch(self, repo_id, revision, image_path, fetch, variant=None):
+        """
+        Return the cached file path, fetching it on a miss.
+
+        ``fetch`` is called with a scratch directory on the cache filesystem
+        and must return the path of the downloaded (or rendered) file inside
+        it. Derivatives made of many files (e.g. tile pyramids) may return a
+        directory, which is then cached and evicted as a single entry.
+
+        Concurrent misses on the same entry are coalesced: only one caller
+        (across threads and processes) runs ``fetch`` and the others wait
+        for its result.
+        """
+        cached = self.get(repo_id, revision, image_path, variant)
+        if cached is not None:
+            return cached
+
+        key = make_cache_key(repo_id, revision, image_path, variant)
+        with self.locks.hold(key):
+            # Another caller may have fetched the entry while we waited.
+            path = self._entry_path(key, _entry_suffix(image_path, variant))
+            with self._lock:
+                self._ensure_index()
+                if self._lookup(key, path):
+                    self.coalesced += 1
+                    return path
+
+            self.tmp_dir.mkdir(parents=True, exist_ok=True)
+            scratch_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+            try:
+                downloaded = fetch(scratch_dir)
+                return self.put(repo_id, revision, image_path, downloaded, variant)
+            finally:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def put(self, repo_id, revision, image_path, src_path, variant=None):
+        """Atomically move ``src_path`` into the cache and return its new path."""
+        key = make_cache_key(repo_id, revision, image_path, variant)
+        dest = self._entry_path(key, _entry_suffix(image_path, variant))
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        # Stage next to the destination so the final rename is atomic, even
+        # when the source lives on another filesystem.
+        staging_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        staged = os.path.join(staging_dir, 'entry')
+        try:
+            shutil.move(str(src_path), staged)
+            try:
+                os.replace(staged, dest)
+            except OSError:
+                # A directory entry built concurrently by another worker wins.
+                if not dest.is_dir():
+                    raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        size = _disk_usage(dest)
+        with self._lock:
+            self._ensure_index()
+            previous = self._index.pop(key, None)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._index[key] = (dest, size)
+            self._total_bytes += size
+            self._evict()
+        return dest
+
+    def stats(self):
+        """Return hit/miss counters and current usage."""
+        with self._lock:
+            self._ensure_index()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    # ---- internals (call with self._lock held) ----
+
+    def _entry_path(self, key, suffix=''):
+        return self.objects_dir / key[:2] / f'{key}{suffix.lower()}'
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+
+        entries = []
+        if self.objects_dir.exists():
+            for shard in self.objects_dir.iterdir():
+                if not shard.is_dir():
+                    continue
+                for path in shard.iterdir():
+                    try:
+                        st = path.stat()
+                        size = _disk_usage(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_atime, path.name.split('.', 1)[0], path, size))
+
+        entries.sort(key=lambda entry: entry[0])
+        self._index = OrderedDict((key, (path, size)) for _, key, path, size in entries)
+        self._total_bytes = sum(size for _, _, _, size in entries)
+        self._evict()
+
+    def _lookup(self, key, path):
+        entry = self._index.get(key)
+        if entry is None:
+            # Another process may have populated the entry since we indexed.
+            if not path.exists():
+                return False
+            entry = (path, _disk_usage(path))
+            self._index[key] = entry
+            self._total_bytes += entry[1]
+
+        try:
+            st = entry[0].stat()
+        except FileNotFoundError:
+            # Evicted by another process.
+            self._index.pop(key, None)
+            self._total_bytes -= entry[1]
+            return False
+
+        self._index.move_to_end(key)
+        # Record the access while keeping mtime stable for validators.
+        os.utime(entry[0], (time.time(), st.st_mtime))
+        return True
+
+    def _evict(self):
+        # Never evict the most recently used entry, even if it alone exceeds the budget.
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, (path, size) = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                _remove_entry(path)
+            except FileNotFoundError:
+                pass
+            logger.info(f"Evicted {path.name} ({size} bytes) from image cache")
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Return the process-wide image cache configured in settings."""
+    global _image_cache
+    if _image_cache is None:
+        with _image_cache_lock:
+            if _image_cache is None:
+                _image_cache = ImageCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES)
+    return _image_cache
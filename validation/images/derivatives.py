@@ -0,0 +1,70 @@
+"""
+Downscaled preview derivatives of exam images.
+
+Previews are rendered with Pillow on first request, bucketed by the length of
+their long edge (``IMAGE_PREVIEW_SIZES``) and stored in the image cache next to
+the originals.
+"""
+import os
+
+from django.conf import settings
+from PIL import Image
+
+from .loader import fetch_derived_image
+
+PREVIEW_QUALITY = 85
+
+
+def preview_bucket(size):
+    """Return the smallest configured preview size that covers ``size`` pixels."""
+    buckets = sorted(settings.IMAGE_PREVIEW_SIZES)
+    for bucket in buckets:
+        if size <= bucket:
+            return bucket
+    return buckets[-1]
+
+
+def _to_displayable(image):
+    """Convert ``image`` to a mode JPEG can store, stretching 16/32-bit data to 8 bits."""
+    if image.mode in ('RGB', 'L'):
+        return image
+    if image.mode in ('I', 'I;16', 'I;16B', 'I;16L', 'F'):
+        image = image.convert('F')
+        low, high = image.getextrema()
+        scale = 255.0 / (high - low) if high > low else 1.0
+        return image.point(lambda value: (value - low) * scale).convert('L')
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (0, 0, 0))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_preview(source_path, size, dest_dir):
+    """Write a JPEG of ``source_path`` whose long edge is at most ``size`` pixels."""
+    dest = os.path.join(dest_dir, f'preview-{size}.jpg')
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder downscale while decoding when it can.
+        image.draft('RGB', (size, size))
+        image = _to_displayable(image)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        image.save(dest, 'JPEG', quality=PREVIEW_QUALITY, optimize=True, progressive=True)
+    return dest
+
+
+def get_exam_preview(exam, size, on_original=None):
+    """
+    Return a local path for the preview of ``exam`` in the bucket covering ``size``.
+
+    ``on_original`` is called with the path of the original image when the
+    preview has to be rendered, i.e. only while the original is at hand.
+    """
+    bucket = preview_bucket(size)
+
+    def render(source_path, dest_dir):
+        if on_original is not None:
+            on_original(source_path)
+        return render_preview(source_path, bucket, dest_dir)
+
+    return fetch_derived_image(exam.image_path, exam.version, f'preview-{bucket}.jpg', render)
@@ -0,0 +1,58 @@
+"""
+Resolve exam images to local files through the configured image sources.
+"""
+import logging
+import os
+
+from .cache import get_image_cache
+from .sources import get_image_source
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_image(image_path, revision):
+    """Return a local path for ``image_path`` at ``revision`` of the dataset."""
+    revision = revision or 'main'
+    return get_image_source(revision).get_path(image_path, revision)
+
+
+def fetch_derived_image(image_path, revision, variant, render):
+    """
+    Return a local path for a derivative of an image, rendering it on first use.
+
+    ``render`` is called with the path of the original image and a scratch
+    directory, and must return the path of the rendered file (or directory of
+    files) inside it.
+    """
+    revision = revision or 'main'
+    source = get_image_source(revision)
+
+    def build(dest_dir):
+        return render(source.get_path(image_path, revision), dest_dir)
+
+    return get_image_cache().get_or_fetch(source.namespace, revision, image_path, build, variant=variant)
+
+
+def is_image_cached(image_path, revision, variant=None):
+    """Return whether an image (or its ``variant``) can be served without downloading it."""
+    revision = revision or 'main'
+    return get_image_source(revision).contains(image_path, revision, variant)
+
+
+def get_exam_image(exam):
+    """
+    Return a local path for the image of ``exam``.
+
+    When the exam records the image byte size, a cached copy of a different
+    size is treated as corrupt and downloaded again.
+    """
+    path = fetch_image(exam.image_path, exam.version)
+    if exam.image_size is not None and os.path.getsize(path) != exam.image_size:
+        revision = exam.version or 'main'
+        source = get_image_source(revision)
+        if source.is_local:
+            return path
+        logger.warning(f"Cached image for exam {exam.id} has an unexpected size; downloading it again")
+        get_image_cache().discard(source.namespace, revision, exam.image_path)
+        path = fetch_image(exam.image_path, exam.version)
+    return path
@@ -0,0 +1,68 @@
+"""
+Per-key locks used to coalesce concurrent downloads of the same image.
+
+A key is held by at most one thread per process (in-process lock) and one
+process per host (``fcntl`` lock on a file in the cache directory), so when
+several requests miss on the same image only the first one downloads it and
+the others wait for the result.
+
+Lock files are empty and are left in place after use: unlinking a lock file
+another process may be waiting on would let two processes hold the same key.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
+
+
+class KeyedLock:
+    """Mutual exclusion per key, within this process and across processes sharing ``lock_dir``."""
+
+    def __init__(self, lock_dir):
+        self.lock_dir = lock_dir
+        self._mutex = threading.Lock()
+        self._locks = {}  # key -> [threading.Lock, number of holders and waiters]
+
+    @contextmanager
+    def hold(self, key):
+        """Block until ``key`` is free, then hold it for the duration of the block."""
+        with self._mutex:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                with self._file_lock(key):
+                    yield
+        finally:
+            with self._mutex:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def waiting(self, key):
+        """Return how many threads of this process hold or wait for ``key``."""
+        with self._mutex:
+            entry = self._locks.get(key)
+            return entry[1] if entry else 0
+
+    @contextmanager
+    def _file_lock(self, key):
+        if fcntl is None:
+            yield
+            return
+        # One file per key: a thread building a derivative holds its key while
+        # fetching the original, so distinct keys must never share a file.
+        shard = os.path.join(self.lock_dir, key[:2])
+        os.makedirs(shard, exist_ok=True)
+        path = os.path.join(shard, f'{key}.lock')
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
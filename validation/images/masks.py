@@ -0,0 +1,92 @@
+"""
+Mask overlays of vertebra predictions.
+
+The run-length encoded masks of one exam in one run are painted into a
+single transparent PNG, one colour per vertebra, for viewers to lay over the
+exam image. The overlay is rendered on first request and kept in the image
+cache; its cache entry is addressed by a digest of the masks, so predictions
+rewritten by a later upload get a new overlay instead of a stale one.
+"""
+import hashlib
+import os
+
+import numpy as np
+from PIL import Image
+
+from ..enums.vertebra_name import VertebraName
+from ..models import PredVertebra
+from .cache import get_image_cache
+
+OVERLAY_NAMESPACE = 'masks'
+OVERLAY_ALPHA = 110
+
+# RGB per vertebra
+OVERLAY_COLOURS = {
+    VertebraName.T8: (166, 206, 227),
+    VertebraName.T9: (31, 120, 180),
+    VertebraName.T10: (178, 223, 138),
+    VertebraName.T11: (51, 160, 44),
+    VertebraName.T12: (141, 211, 199),
+    VertebraName.L1: (255, 255, 179),
+    VertebraName.L2: (190, 186, 218),
+    VertebraName.L3: (251, 128, 114),
+    VertebraName.L4: (128, 177, 211),
+    VertebraName.L5: (253, 180, 98),
+    VertebraName.S1: (179, 222, 105),
+    VertebraName.UNKNOWN: (217, 217, 217),
+}
+
+
+def masks_digest(masks):
+    """Return a digest identifying the (name, mask) pairs of an overlay."""
+    digest = hashlib.sha256()
+    for name, mask in masks:
+        digest.update(name.encode())
+        digest.update(mask.to_bytes())
+    return digest.hexdigest()[:16]
+
+
+def render_mask_overlay(masks, dest_dir):
+    """
+    Write an RGBA PNG of ``masks``, a list of (vertebra name, Mask), and return its path.
+
+    The overlay has the size of the largest mask; smaller masks are scaled up
+    to it without interpolation.
+    """
+    height = max(mask.size[0] for _, mask in masks)
+    width = max(mask.size[1] for _, mask in masks)
+    overlay = np.zeros((height, width, 4), dtype=np.uint8)
+    for name, mask in masks:
+        pixels = mask.decode()
+        if mask.size != (height, width):
+            scaled = Image.fromarray(pixels).resize((width, height), Image.Resampling.NEAREST)
+            pixels = np.asarray(scaled, dtype=bool)
+        overlay[pixels] = (*OVERLAY_COLOURS[name], OVERLAY_ALPHA)
+
+    dest = os.path.join(dest_dir, 'overlay.png')
+    Image.fromarray(overlay, 'RGBA').save(dest, 'PNG', optimize=True)
+    return dest
+
+
+def get_mask_overlay(run_id, exam_id):
+    """
+    Return a local path for the mask overlay of an exam in a run, or None if it has no masks.
+
+    Only the masks are read from the database; pixels are decoded only when
+    the overlay is not cached yet.
+    """
+    masks = list(
+        PredVertebra.objects
+        .filter(run_id=run_id, exam_id=exam_id, mask__isnull=False)
+        .order_by('name')
+        .values_list('name', 'mask')
+    )
+    if not masks:
+        return None
+    return get_image_cache().get_or_fetch(
+        OVERLAY_NAMESPACE,
+        f'run-{run_id}',
+        f'exam-{exam_id}',
+        lambda dest_dir: render_mask_overlay(masks, dest_dir),
+        variant=f'overlay-{masks_digest(masks)}.png',
+    )
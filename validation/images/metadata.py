@@ -0,0 +1,66 @@
+"""
+Image metadata (dimensions, format, byte size, checksum) recorded on Exam.
+
+Knowing the dimensions up front lets the viewer lay out pixel-coordinate
+overlays before the image arrives, and the recorded size lets cached copies be
+checked without re-reading them.
+"""
+import hashlib
+import logging
+import os
+
+from PIL import Image
+
+from .loader import get_exam_image
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ['image_width', 'image_height', 'image_format', 'image_size', 'image_sha256']
+
+
+def read_image_metadata(path):
+    """Return the metadata fields for the image file at ``path``."""
+    # Opening only parses the header; pixel data is never decoded here.
+    with Image.open(path) as image:
+        width, height = image.size
+        image_format = image.format or ''
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_format': image_format,
+        'image_size': os.path.getsize(path),
+        'image_sha256': digest.hexdigest(),
+    }
+
+
+def apply_image_metadata(exam, path):
+    """Set the metadata fields of ``exam`` from ``path`` without saving it."""
+    for field, value in read_image_metadata(path).items():
+        setattr(exam, field, value)
+    return exam
+
+
+def ensure_exam_image_metadata(exam, path=None):
+    """Record the image metadata of ``exam`` if it is missing. Returns True if it was updated."""
+    if exam.has_image_metadata and exam.image_sha256:
+        return False
+    apply_image_metadata(exam, path or get_exam_image(exam))
+    exam.save(update_fields=METADATA_FIELDS)
+    return True
+
+
+def exam_image_metadata(exam):
+    """Return the recorded metadata of ``exam`` for JSON payloads (None where unknown)."""
+    return {
+        'width': exam.image_width,
+        'height': exam.image_height,
+        'format': exam.image_format or None,
+        'size': exam.image_size,
+        'sha256': exam.image_sha256 or None,
+    }
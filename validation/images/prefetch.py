@@ -0,0 +1,107 @@
+"""
+Background prefetch of exam images into the image cache.
+
+When an expert opens an exam, the next few exams of the run are fetched on a
+small shared thread pool so that navigating to them is served from local disk.
+Each user may only have a bounded number of prefetches queued, which keeps a
+fast clicker from monopolising the pool.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .derivatives import get_exam_preview
+from .loader import is_image_cached
+from .metadata import ensure_exam_image_metadata
+from .sources import get_image_source
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePrefetcher:
+    """Warm the image cache for upcoming exams on a bounded thread pool."""
+
+    def __init__(self, max_workers, max_pending_per_user):
+        self.max_pending_per_user = max_pending_per_user
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-prefetch')
+        self._lock = threading.Lock()
+        self._pending = {}  # user_id -> number of queued or running prefetches
+        self._in_flight = set()  # (image_path, version) currently being prefetched
+
+    def prefetch(self, user_id, exams):
+        """
+        Queue ``exams`` for prefetching on behalf of ``user_id``.
+
+        Exams that are already cached or queued are skipped, as is anything
+        beyond the user's pending budget. Returns the number of exams queued.
+        """
+        # Same preview size the exam viewer opens with
+        size = max(settings.IMAGE_PREVIEW_SIZES)
+        queued = 0
+        for exam in exams:
+            if not exam.image_path or not get_image_source(exam.version).configured:
+                continue
+            if is_image_cached(exam.image_path, exam.version, f'preview-{size}.jpg'):
+                continue
+
+            key = (exam.image_path, exam.version)
+            with self._lock:
+                if key in self._in_flight or self._pending.get(user_id, 0) >= self.max_pending_per_user:
+                    continue
+                self._in_flight.add(key)
+                self._pending[user_id] = self._pending.get(user_id, 0) + 1
+
+            self._executor.submit(self._run, user_id, key, exam, size)
+            queued += 1
+        return queued
+
+    def _run(self, user_id, key, exam, size):
+        try:
+            # The viewer opens on the preview; rendering it caches the original as well. The
+            # viewer then gets a cache hit, so the metadata is recorded here while rendering.
+            record = None if exam.has_image_metadata else lambda original: self._record_metadata(exam, original)
+            get_exam_preview(exam, size, on_original=record)
+        except Exception as e:
+            logger.warning(f"Prefetch of image for exam {exam.id} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+                remaining = self._pending.get(user_id, 0) - 1
+                if remaining > 0:
+                    self._pending[user_id] = remaining
+                else:
+                    self._pending.pop(user_id, None)
+
+    @staticmethod
+    def _record_metadata(exam, original):
+        # A metadata failure must not cost the prefetched preview
+        try:
+            ensure_exam_image_metadata(exam, original)
+        except Exception as e:
+            logger.warning(f"Could not record image metadata for exam {exam.id}: {e}")
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_image_prefetcher():
+    """Return the process-wide prefetcher configured in settings."""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = ImagePrefetcher(
+                    settings.IMAGE_PREFETCH_WORKERS, settings.IMAGE_PREFETCH_MAX_PENDING_PER_USER
+                )
+    return _prefetcher
+
+
+def prefetch_exam_images(user_id, exams):
+    """Warm the cache for the first ``IMAGE_PREFETCH_COUNT`` of ``exams`` in the background."""
+    count = settings.IMAGE_PREFETCH_COUNT
+    if count <= 0:
+        return 0
+    return get_image_prefetcher().prefetch(user_id, list(exams)[:count])
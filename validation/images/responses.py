@@ -0,0 +1,151 @@
+"""
+HTTP responses for locally cached image files.
+
+Files are streamed with ``FileResponse`` (zero-copy sendfile under gunicorn) or
+handed to a fronting proxy through an internal redirect header. Conditional
+requests are answered with 304 and single byte ranges with 206, so repeat views
+cost neither bandwidth nor worker memory.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CACHE_CONTROL = 'private, max-age=3600'
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header does not overlap the file."""
+
+
+class _RangeFile:
+    """Read-only view of ``length`` bytes of an open file from its current position."""
+
+    def __init__(self, f, length):
+        self._f = f
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+def file_etag(path, st):
+    """Return a strong ETag for the current contents of ``path``."""
+    digest = hashlib.sha1(f'{Path(path).name}:{st.st_size}:{st.st_mtime_ns}'.encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end) offsets.
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges) and raises RangeNotSatisfiable when it does not overlap the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def _accel_redirect_path(path):
+    prefix = settings.IMAGE_ACCEL_REDIRECT_PREFIX
+    if not prefix:
+        return None
+    try:
+        relative = Path(path).resolve().relative_to(Path(settings.IMAGE_CACHE_DIR).resolve())
+    except ValueError:
+        return None
+    return prefix.rstrip('/') + '/' + relative.as_posix()
+
+
+def serve_image_file(request, path, content_type=None, etag=None):
+    """Return a response for the file at ``path`` honouring validators and ranges."""
+    st = os.stat(path)
+    etag = etag or file_etag(path, st)
+    last_modified = st.st_mtime
+    content_type = content_type or mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        not_modified['Cache-Control'] = CACHE_CONTROL
+        return not_modified
+
+    accel_path = _accel_redirect_path(path)
+    if accel_path:
+        # The proxy streams the file and handles Range itself.
+        response = HttpResponse(content_type=content_type)
+        response[settings.IMAGE_ACCEL_REDIRECT_HEADER] = accel_path
+    else:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, st.st_size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{st.st_size}'
+                return response
+
+        f = open(path, 'rb')
+        if byte_range is None:
+            response = FileResponse(f, content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            f.seek(start)
+            if end == st.st_size - 1:
+                # Open-ended range: keep the real file so sendfile can be used.
+                response = FileResponse(f, content_type=content_type, status=206)
+            else:
+                response = FileResponse(_RangeFile(f, length), content_type=content_type, status=206)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{st.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
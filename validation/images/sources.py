@@ -0,0 +1,228 @@
+"""
+Pluggable storage backends for exam images.
+
+Each dataset version is served by one of the sources configured in
+``IMAGE_SOURCES`` (``IMAGE_SOURCE_VERSIONS`` maps versions to source aliases,
+everything else uses ``IMAGE_SOURCE_DEFAULT``). Remote sources download into
+the image cache; local sources serve their files in place.
+"""
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from huggingface_hub import hf_hub_download
+from huggingface_hub.utils import EntryNotFoundError, LocalEntryNotFoundError, RevisionNotFoundError
+
+from ..hub.client import get_hub_client
+from .cache import get_image_cache
+
+
+class ImageNotFound(Exception):
+    """Raised when a source does not have the requested image."""
+
+
+class ImageSource:
+    """
+    Base class for image sources.
+
+    Subclasses either download images (``is_local = False``, implement
+    ``fetch``) or expose files that are already on local disk
+    (``is_local = True``, implement ``local_path``). Sources with
+    ``has_revisions = False`` serve the same files for every revision.
+    """
+
+    is_local = False
+    has_revisions = True
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def namespace(self):
+        """Identifier of the underlying dataset, used to address cache entries."""
+        raise NotImplementedError
+
+    @property
+    def configured(self):
+        """Whether the source has everything it needs to serve images."""
+        return True
+
+    def fetch(self, image_path, revision, dest_dir):
+        """Download ``image_path`` at ``revision`` into ``dest_dir`` and return its path."""
+        raise NotImplementedError
+
+    def local_path(self, image_path, revision):
+        """Return the path of ``image_path`` at ``revision`` on local disk."""
+        raise NotImplementedError
+
+    def list_files(self, revision):
+        """Return the paths of all files in ``revision``, relative to the dataset root."""
+        raise NotImplementedError
+
+    def get_path(self, image_path, revision):
+        """Return a local path for the image, downloading it into the cache if needed."""
+        if not self.configured:
+            raise ImproperlyConfigured(f"Image source '{self.alias}' is not configured")
+        if self.is_local:
+            return self.local_path(image_path, revision)
+        return get_image_cache().get_or_fetch(
+            self.namespace, revision, image_path,
+            lambda dest_dir: self.fetch(image_path, revision, dest_dir),
+        )
+
+    def contains(self, image_path, revision, variant=None):
+        """Return whether the image (or its ``variant``) can be served without a download."""
+        if variant is None and self.is_local:
+            try:
+                self.local_path(image_path, revision)
+            except ImageNotFound:
+                return False
+            return True
+        return get_image_cache().contains(self.namespace, revision, image_path, variant)
+
+
+class HuggingFaceSource(ImageSource):
+    """Images downloaded from a Hugging Face dataset repository."""
+
+    def __init__(self, alias, repo_id=None, token=None):
+        super().__init__(alias)
+        self._repo_id = repo_id
+        self._token = token
+
+    @property
+    def repo_id(self):
+        return self._repo_id or settings.HF_REPO_ID
+
+    @property
+    def token(self):
+        return self._token or settings.HF_TOKEN
+
+    @property
+    def namespace(self):
+        return self.repo_id
+
+    @property
+    def configured(self):
+        return bool(self.token)
+
+    def fetch(self, image_path, revision, dest_dir):
+        client = get_hub_client()
+        try:
+            return client.call(
+                'download',
+                hf_hub_download,
+                repo_id=self.repo_id,
+                filename=image_path,
+                token=self.token,
+                repo_type="dataset",
+                revision=revision,
+                local_dir=dest_dir,
+                etag_timeout=client.timeout[1],
+            )
+        except LocalEntryNotFoundError:
+            # The hub could not be reached; not evidence that the file is missing
+            raise
+        except (EntryNotFoundError, RevisionNotFoundError) as e:
+            raise ImageNotFound(f"{image_path}@{revision} not found in {self.repo_id}") from e
+
+    def list_files(self, revision):
+        client = get_hub_client()
+        try:
+            return client.call(
+                'list_repo_files',
+                client.api.list_repo_files,
+                self.repo_id,
+                repo_type="dataset",
+                revision=revision,
+                token=self.token,
+            )
+        except RevisionNotFoundError as e:
+            raise ImageNotFound(f"Revision {revision} not found in {self.repo_id}") from e
+
+
+class FilesystemSource(ImageSource):
+    """Images stored as plain files under ``root`` (``MEDIA_ROOT`` by default), regardless of version."""
+
+    is_local = True
+    has_revisions = False
+
+    def __init__(self, alias, root=None):
+        super().__init__(alias)
+        self._root = root
+
+    @property
+    def root(self):
+        return Path(self._root or settings.MEDIA_ROOT)
+
+    @property
+    def namespace(self):
+        return f'file:{self.root}'
+
+    @property
+    def configured(self):
+        return bool(self._root or settings.MEDIA_ROOT)
+
+    def _resolve(self, base, image_path):
+        base = base.resolve()
+        path = (base / image_path.lstrip('/')).resolve()
+        # Never serve files outside the source directory
+        if base not in path.parents or not path.is_file():
+            raise ImageNotFound(f"{image_path} not found in image source '{self.alias}'")
+        return path
+
+    def local_path(self, image_path, revision):
+        return self._resolve(self.root, image_path)
+
+    def _list_dir(self, base):
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(base):
+            # Skip VCS and hub metadata such as .git/ and .cache/huggingface/
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            for filename in filenames:
+                paths.append(Path(dirpath, filename).relative_to(base).as_posix())
+        return sorted(paths)
+
+    def list_files(self, revision):
+        return self._list_dir(self.root)
+
+
+class LocalMirrorSource(FilesystemSource):
+    """
+    Local copy of a dataset repository with one directory per revision.
+
+    The layout matches ``snapshot_download(repo_id, revision=rev,
+    local_dir=root / rev)``, i.e. ``<root>/<revision>/<image_path>``.
+    """
+
+    has_revisions = True
+
+    def __init__(self, alias, root=None):
+        if not root:
+            raise ImproperlyConfigured(f"Image source '{alias}' requires a root directory")
+        super().__init__(alias, root)
+
+    @property
+    def namespace(self):
+        return f'mirror:{self.root}'
+
+    def local_path(self, image_path, revision):
+        return self._resolve(self.root / (revision or 'main'), image_path)
+
+    def list_files(self, revision):
+        base = self.root / (revision or 'main')
+        if not base.is_dir():
+            raise ImageNotFound(f"Revision {revision} not found in image source '{self.alias}'")
+        return self._list_dir(base)
+
+
+def get_image_source(version=None):
+    """Return the image source that serves dataset ``version``."""
+    alias = settings.IMAGE_SOURCE_VERSIONS.get(version or 'main', settings.IMAGE_SOURCE_DEFAULT)
+    try:
+        config = settings.IMAGE_SOURCES[alias]
+    except KeyError:
+        raise ImproperlyConfigured(f"Image source '{alias}' is not defined in IMAGE_SOURCES")
+    backend = import_string(config['BACKEND'])
+    return backend(alias, **config.get('OPTIONS', {}))
@@ -0,0 +1,98 @@
+"""
+Deep Zoom (DZI) tile pyramids of exam images.
+
+A pyramid is rendered with Pillow the first time an exam is zoomed into and
+stored in the image cache as a single directory entry::
+
+    pyramid.dzi                         descriptor (image size, tile size)
+    pyramid_files/<level>/<col>_<row>.jpg
+
+Level ``max_level`` is the full resolution image and every level below halves
+both dimensions, down to a single pixel at level 0, following the layout used
+by OpenSeadragon and other Deep Zoom viewers.
+"""
+import math
+import os
+
+from PIL import Image
+
+from .derivatives import _to_displayable
+from .loader import fetch_derived_image
+
+TILE_SIZE = 256
+TILE_FORMAT = 'jpg'
+TILE_QUALITY = 85
+
+PYRAMID_VARIANT = f'tiles-{TILE_SIZE}'
+DESCRIPTOR_NAME = 'pyramid.dzi'
+TILES_DIR_NAME = 'pyramid_files'
+
+DZI_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+    'TileSize="{tile_size}" Overlap="0" Format="{format}">'
+    '<Size Width="{width}" Height="{height}"/>'
+    '</Image>\n'
+)
+
+
+def max_level(width, height):
+    """Return the index of the full resolution level for an image of the given size."""
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def level_size(width, height, level):
+    """Return the (width, height) of ``level`` in the pyramid of a ``width`` x ``height`` image."""
+    scale = 2 ** (max_level(width, height) - level)
+    return max(math.ceil(width / scale), 1), max(math.ceil(height / scale), 1)
+
+
+def render_pyramid(source_path, dest_dir):
+    """Write the DZI descriptor and all tiles of ``source_path`` into a new directory."""
+    root = os.path.join(dest_dir, PYRAMID_VARIANT)
+    tiles_root = os.path.join(root, TILES_DIR_NAME)
+    os.makedirs(tiles_root)
+
+    with Image.open(source_path) as image:
+        image = _to_displayable(image)
+        width, height = image.size
+        top = max_level(width, height)
+
+        level_image = image
+        for level in range(top, -1, -1):
+            size = level_size(width, height, level)
+            if level_image.size != size:
+                # Halve the previous level rather than the original to keep this linear.
+                level_image = level_image.resize(size, Image.Resampling.LANCZOS)
+            _write_level(level_image, os.path.join(tiles_root, str(level)))
+
+    with open(os.path.join(root, DESCRIPTOR_NAME), 'w') as f:
+        f.write(DZI_TEMPLATE.format(tile_size=TILE_SIZE, format=TILE_FORMAT, width=width, height=height))
+    return root
+
+
+def _write_level(image, level_dir):
+    os.makedirs(level_dir)
+    width, height = image.size
+    for col in range(math.ceil(width / TILE_SIZE)):
+        for row in range(math.ceil(height / TILE_SIZE)):
+            box = (
+                col * TILE_SIZE,
+                row * TILE_SIZE,
+                min((col + 1) * TILE_SIZE, width),
+                min((row + 1) * TILE_SIZE, height),
+            )
+            tile = image.crop(box)
+            tile.save(os.path.join(level_dir, f'{col}_{row}.{TILE_FORMAT}'), 'JPEG', quality=TILE_QUALITY)
+
+
+def get_exam_tile_pyramid(exam):
+    """Return the local directory holding the tile pyramid of ``exam``, rendering it on first use."""
+    return fetch_derived_image(exam.image_path, exam.version, PYRAMID_VARIANT, render_pyramid)
+
+
+def get_exam_tile(exam, level, col, row):
+    """Return the local path of a single tile, or None if it is outside the pyramid."""
+    root = get_exam_tile_pyramid(exam)
+    path = root / TILES_DIR_NAME / str(level) / f'{col}_{row}.{TILE_FORMAT}'
+    return path if path.is_file() else None
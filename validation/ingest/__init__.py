@@ -0,0 +1,2 @@
+# Bulk ingestion of exams and predictions
+from .exams import ExamImportReport, import_exams, import_exams_from_revision
@@ -0,0 +1,152 @@
+"""
+Columnar (struct-of-arrays) prediction payloads.
+
+Instead of a list of objects, ``vertebra_predictions`` and
+``severity_predictions`` may each be an object of equally long arrays, one
+per field, with the box flattened into ``x1``/``y1``/``x2``/``y2``::
+
+    {
+        "model_version_id": 1,
+        "vertebra_predictions": {
+            "exam_id": [1, 1, 2],
+            "name": ["L1", "L2", "L1"],
+            "confidence": [0.95, 0.91, 0.97],
+            "x1": [...], "y1": [...], "x2": [...], "y2": [...]
+        }
+    }
+
+``model_version_id`` and ``exam_id`` may instead be given once at the top
+level (the header, next to run fields such as ``name``), applying to every
+row. Columns are type-checked as whole arrays and turned into the row dicts
+used by ``create_predictions`` without instantiating a serializer per row.
+The same structure can be sent as MessagePack (see ``validation.parsers``).
+"""
+from ..enums.severity import Severity
+from ..enums.vertebra_level import VertebraLevel
+from ..enums.vertebra_name import VertebraName
+from ..models.box import BOX_FIELDS, Box
+from .predictions import DEFAULTS
+
+# Prediction fields that may be given once at the top level for all rows
+HEADER_FIELDS = ('model_version_id', 'exam_id')
+
+# Invalid values reported per column; the payload is rejected either way
+MAX_COLUMN_ERRORS = 5
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _one_of(choices):
+    allowed = frozenset(choices)
+    return lambda value: value in allowed, f"must be one of: {', '.join(choices)}"
+
+
+# field -> (check, error message, default or REQUIRED)
+REQUIRED = object()
+_INT = (_is_int, 'must be an integer')
+_NUMBER = (_is_number, 'must be a number')
+
+VERTEBRA_COLUMNS = {
+    'exam_id': (*_INT, REQUIRED),
+    'model_version_id': (*_INT, REQUIRED),
+    'name': (*_one_of(VertebraName.values), DEFAULTS['name']),
+    'confidence': (*_NUMBER, DEFAULTS['confidence']),
+    **{field: (*_NUMBER, REQUIRED) for field in BOX_FIELDS},
+}
+SEVERITY_COLUMNS = {
+    'exam_id': (*_INT, REQUIRED),
+    'model_version_id': (*_INT, REQUIRED),
+    'vertebrae_level': (*_one_of(VertebraLevel.values), REQUIRED),
+    'severity_name': (*_one_of(Severity.values), DEFAULTS['severity_name']),
+    'confidence': (*_NUMBER, DEFAULTS['confidence']),
+    **{field: (*_NUMBER, REQUIRED) for field in BOX_FIELDS},
+}
+
+
+def is_columnar(data):
+    """Return whether ``data`` uses the columnar layout for its predictions."""
+    return any(isinstance(data.get(field), dict) for field in ('vertebra_predictions', 'severity_predictions'))
+
+
+def _decode_block(block, header, columns, box_key):
+    """Return (rows, errors) for one columnar block."""
+    if not block:
+        return [], {}
+    if not isinstance(block, dict):
+        return [], {'non_field_errors': ['Expected an object of arrays.']}
+
+    errors = {}
+    unknown = sorted(set(block) - set(columns))
+    if unknown:
+        errors['non_field_errors'] = [f"Unknown columns: {', '.join(unknown)}"]
+
+    lengths = {field: len(values) for field, values in block.items() if isinstance(values, list)}
+    for field in set(block) - set(lengths) - set(unknown):
+        errors[field] = ['Must be an array.']
+    if len(set(lengths.values())) > 1:
+        errors.setdefault('non_field_errors', []).append(
+            'All columns must have the same length: ' + ', '.join(f'{f}={n}' for f, n in sorted(lengths.items()))
+        )
+    if errors:
+        return [], errors
+    count = next(iter(lengths.values()), 0)
+
+    resolved = {}
+    for field, (check, message, default) in columns.items():
+        if field in block:
+            values = block[field]
+            bad = [i for i, value in enumerate(values) if not check(value)]
+            if bad:
+                errors[field] = [f'Row {i}: {message}.' for i in bad[:MAX_COLUMN_ERRORS]]
+                if len(bad) > MAX_COLUMN_ERRORS:
+                    errors[field].append(f'... and {len(bad) - MAX_COLUMN_ERRORS} more rows.')
+            resolved[field] = values
+        elif field in header:
+            if not check(header[field]):
+                errors[field] = [f'Header value {message}.']
+            resolved[field] = [header[field]] * count
+        elif default is REQUIRED:
+            if count:
+                errors[field] = ['This column is required (or give it once at the top level).']
+        else:
+            resolved[field] = [default] * count
+    if errors:
+        return [], errors
+
+    fields = [field for field in resolved if field not in BOX_FIELDS]
+    rows = [
+        {**dict(zip(fields, values)), box_key: Box(*box)}
+        for values, box in zip(
+            zip(*(resolved[field] for field in fields)),
+            zip(*(resolved[field] for field in BOX_FIELDS)),
+        )
+    ]
+    return rows, {}
+
+
+def decode_columnar_predictions(data):
+    """
+    Decode the columnar ``vertebra_predictions`` / ``severity_predictions`` of ``data``.
+
+    Returns (vertebra rows, severity rows, errors); errors is an empty dict
+    when both blocks are valid.
+    """
+    header = {field: data[field] for field in HEADER_FIELDS if field in data}
+    vertebra_rows, vertebra_errors = _decode_block(
+        data.get('vertebra_predictions'), header, VERTEBRA_COLUMNS, 'polygon'
+    )
+    severity_rows, severity_errors = _decode_block(
+        data.get('severity_predictions'), header, SEVERITY_COLUMNS, 'bounding_box'
+    )
+    errors = {}
+    if vertebra_errors:
+        errors['vertebra_predictions'] = vertebra_errors
+    if severity_errors:
+        errors['severity_predictions'] = severity_errors
+    return vertebra_rows, severity_rows, errors
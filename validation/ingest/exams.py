@@ -0,0 +1,193 @@
+"""
+Bulk creation of exams, and lookup of their ids by external_id.
+
+Imports from the file listing (manifest) of a dataset revision match each
+file path against a regular expression whose named group ``external_id``
+gives the exam identifier; files that do not match are ignored. Rows are
+inserted with ``bulk_create(ignore_conflicts=True)`` in chunks, so re-running
+an import only adds the exams that are new.
+
+``create_exams`` and ``resolve_external_ids`` serve the batch API endpoints:
+each answers with a single indexed lookup on ``external_id`` instead of one
+request (and query) per exam.
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from ..images.sources import get_image_source
+from ..models import Exam
+from .predictions import CONFLICT_ERROR, CONFLICT_SKIP
+
+EXTERNAL_ID_MAX_LENGTH = Exam._meta.get_field('external_id').max_length
+IMAGE_PATH_MAX_LENGTH = Exam._meta.get_field('image_path').max_length
+
+# Invalid rows listed in a report; the count is always complete
+MAX_REPORTED_ERRORS = 100
+
+# Exams per batch API request; keeps the external_id IN (...) lookup to one query
+MAX_BULK_EXAMS = 10000
+
+# What to do with exams whose external_id already exists (see create_exams)
+EXAM_CONFLICT_MODES = (CONFLICT_ERROR, CONFLICT_SKIP)
+
+
+class ExamsAlreadyExist(Exception):
+    """Raised by create_exams when some external_ids are taken and conflicts are errors."""
+
+    def __init__(self, external_ids):
+        super().__init__(f"Exams already exist: {', '.join(external_ids)}")
+        self.external_ids = external_ids
+
+
+class ExamImportReport:
+    """Counts of what an import did, plus the first few invalid rows."""
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.ignored = 0
+        self.invalid = 0
+        self.errors = []
+
+    def add_invalid(self, image_path, error):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'image_path': image_path, 'error': error})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'ignored': self.ignored,
+            'invalid': self.invalid,
+            'errors': self.errors,
+        }
+
+
+def compile_manifest_pattern(pattern=None):
+    """Compile ``pattern`` (default ``EXAM_MANIFEST_PATTERN``), which must define an ``external_id`` group."""
+    try:
+        regex = re.compile(pattern or settings.EXAM_MANIFEST_PATTERN)
+    except re.error as e:
+        raise ValueError(f"Invalid pattern: {e}")
+    if 'external_id' not in regex.groupindex:
+        raise ValueError("Pattern must define a named group (?P<external_id>...)")
+    return regex
+
+
+def derive_exam_rows(paths, pattern, report):
+    """Yield (external_id, image_path) for the paths matching ``pattern``, recording the rest in ``report``."""
+    seen = set()
+    for image_path in paths:
+        match = pattern.search(image_path)
+        if not match:
+            report.ignored += 1
+            continue
+
+        external_id = match.group('external_id')
+        if not external_id:
+            report.add_invalid(image_path, 'Empty external_id')
+        elif len(external_id) > EXTERNAL_ID_MAX_LENGTH:
+            report.add_invalid(image_path, f'external_id longer than {EXTERNAL_ID_MAX_LENGTH} characters')
+        elif len(image_path) > IMAGE_PATH_MAX_LENGTH:
+            report.add_invalid(image_path, f'image_path longer than {IMAGE_PATH_MAX_LENGTH} characters')
+        elif external_id in seen:
+            report.add_invalid(image_path, f'Duplicate external_id {external_id!r} in manifest')
+        else:
+            seen.add(external_id)
+            yield external_id, image_path
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_exams(paths, version, pattern=None, chunk_size=None, dry_run=False):
+    """
+    Create an Exam for every path in ``paths`` that matches ``pattern``.
+
+    Exams whose external_id already exists are skipped, not updated. Returns
+    an ExamImportReport.
+    """
+    regex = compile_manifest_pattern(pattern)
+    chunk_size = chunk_size or settings.INGEST_BATCH_SIZE
+    report = ExamImportReport()
+
+    for chunk in _chunks(derive_exam_rows(paths, regex, report), chunk_size):
+        external_ids = [external_id for external_id, _ in chunk]
+        existing = set(
+            Exam.objects.filter(external_id__in=external_ids).order_by().values_list('external_id', flat=True)
+        )
+        new_rows = [
+            Exam(external_id=external_id, image_path=image_path, version=version)
+            for external_id, image_path in chunk
+            if external_id not in existing
+        ]
+
+        if new_rows and not dry_run:
+            # ignore_conflicts keeps concurrent imports of the same revision safe
+            Exam.objects.bulk_create(new_rows, ignore_conflicts=True)
+            stored = Exam.objects.filter(external_id__in=external_ids).count()
+            created = stored - len(existing)
+        else:
+            created = len(new_rows)
+
+        report.created += created
+        report.skipped += len(chunk) - created
+
+    return report
+
+
+def import_exams_from_revision(version, pattern=None, chunk_size=None, dry_run=False):
+    """List the files of dataset ``version`` once and import them as exams."""
+    paths = get_image_source(version).list_files(version)
+    return import_exams(paths, version, pattern=pattern, chunk_size=chunk_size, dry_run=dry_run)
+
+
+def resolve_external_ids(external_ids):
+    """Map each stored external_id of ``external_ids`` to its (id, version) with one query."""
+    stored = Exam.objects.filter(external_id__in=set(external_ids)).order_by()
+    return {external_id: (id_, version) for external_id, id_, version in
+            stored.values_list('external_id', 'id', 'version')}
+
+
+def create_exams(rows, on_conflict=CONFLICT_ERROR):
+    """
+    Create exams from validated rows of ``external_id``, ``image_path`` and ``version``.
+
+    Existing external_ids are found with one query. With CONFLICT_ERROR any of
+    them raises ExamsAlreadyExist and nothing is created; with CONFLICT_SKIP
+    they are left as stored. Everything happens in one transaction. Returns
+    one dict of ``id``, ``external_id``, ``version`` and ``created`` per row,
+    in input order.
+    """
+    if on_conflict not in EXAM_CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {', '.join(EXAM_CONFLICT_MODES)}")
+
+    with transaction.atomic():
+        existing = resolve_external_ids(row['external_id'] for row in rows)
+        if existing and on_conflict == CONFLICT_ERROR:
+            raise ExamsAlreadyExist(sorted(existing))
+
+        # Primary keys are returned by PostgreSQL and SQLite >= 3.35
+        new_exams = Exam.objects.bulk_create(
+            [Exam(**row) for row in rows if row['external_id'] not in existing],
+            batch_size=settings.INGEST_BATCH_SIZE,
+        )
+
+    created = {exam.external_id: (exam.id, exam.version) for exam in new_exams}
+    results = []
+    for row in rows:
+        external_id = row['external_id']
+        id_, version = created.get(external_id) or existing[external_id]
+        results.append({'id': id_, 'external_id': external_id, 'version': version, 'created': external_id in created})
+    return results
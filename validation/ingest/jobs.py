@@ -0,0 +1,176 @@
+"""
+Asynchronous ingestion jobs.
+
+The API stores large payloads as ``IngestJob`` rows and answers ``202``
+immediately; ``manage.py run_ingest_worker`` claims queued jobs one at a time
+and writes their predictions in committed chunks, recording progress on the
+job as it goes. Web threads therefore never spend minutes inside a bulk load.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..enums.job_status import JobStatus
+from ..models import IngestJob, Run
+from .payloads import validate_predictions_payload, validate_run_payload
+from .predictions import CONFLICT_ERROR, PredictionCounts, add_exams_to_run, create_predictions
+
+logger = logging.getLogger(__name__)
+
+
+class JobFailed(Exception):
+    """Raised by a job handler when the payload cannot be ingested; ``errors`` is stored on the job."""
+
+    def __init__(self, errors):
+        super().__init__(str(errors))
+        self.errors = errors
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue_job(kind, payload, user=None, run=None, **params):
+    """Store ``payload`` as a queued job of ``kind`` and return the job."""
+    return IngestJob.objects.create(kind=kind, payload=payload, params=params, run=run, created_by=user)
+
+
+def claim_next_job(worker=None):
+    """
+    Mark the oldest queued job as running and return it, or None if there is none.
+
+    The claim is a conditional UPDATE, so concurrent workers never run the
+    same job.
+    """
+    queued = IngestJob.objects.filter(status=JobStatus.QUEUED).order_by('created_at').values_list('id', flat=True)
+    for job_id in queued[:10]:
+        now = timezone.now()
+        claimed = IngestJob.objects.filter(id=job_id, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING, worker=worker or worker_name(), started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            return IngestJob.objects.get(id=job_id)
+    return None
+
+
+STALE_ERRORS = {
+    # A half-created run is deleted, as when the job fails in the worker
+    IngestJob.RUN_WITH_PREDICTIONS: 'The worker stopped before finishing; the partially created run was deleted.',
+    IngestJob.ADD_PREDICTIONS: 'The worker stopped before finishing; chunks already written were kept.',
+}
+
+
+def fail_stale_jobs():
+    """Fail running jobs whose worker stopped reporting progress; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.INGEST_JOB_STALE_SECONDS)
+    stale = IngestJob.objects.filter(status=JobStatus.RUNNING, heartbeat_at__lt=cutoff)
+    failed = 0
+    for job in stale.only('id', 'kind', 'run_id', 'worker'):
+        with transaction.atomic():
+            # Conditional, so a job that reported progress since the query is left alone
+            claimed = stale.filter(id=job.id, worker=job.worker).update(
+                status=JobStatus.FAILED,
+                finished_at=timezone.now(),
+                errors={'job': [STALE_ERRORS[job.kind]]},
+            )
+            if not claimed:
+                continue
+            if job.kind == IngestJob.RUN_WITH_PREDICTIONS and job.run_id is not None:
+                Run.objects.filter(id=job.run_id).delete()
+        failed += 1
+    return failed
+
+
+def _report_progress(job, processed):
+    IngestJob.objects.filter(id=job.id).update(processed=processed, heartbeat_at=timezone.now())
+
+
+def _write_in_chunks(job, run, vertebra_rows, severity_rows, on_conflict):
+    """Write the rows in committed chunks, updating the job's progress after each one."""
+    chunk_size = settings.INGEST_BATCH_SIZE
+    counts = PredictionCounts()
+    processed = 0
+    for rows, is_vertebra in ((vertebra_rows, True), (severity_rows, False)):
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            with transaction.atomic():
+                counts.add(create_predictions(
+                    run,
+                    chunk if is_vertebra else (),
+                    () if is_vertebra else chunk,
+                    chunk_size=chunk_size,
+                    on_conflict=on_conflict,
+                ))
+            processed += len(chunk)
+            _report_progress(job, processed)
+    return counts
+
+
+def _run_with_predictions(job):
+    data, exam_ids, vertebra_rows, severity_rows, errors = validate_run_payload(job.payload)
+    if errors:
+        raise JobFailed(errors)
+    IngestJob.objects.filter(id=job.id).update(total=len(vertebra_rows) + len(severity_rows))
+
+    with transaction.atomic():
+        run = Run.objects.create(**data)
+        add_exams_to_run(run, exam_ids)
+    IngestJob.objects.filter(id=job.id).update(run=run)
+
+    try:
+        counts = _write_in_chunks(job, run, vertebra_rows, severity_rows, CONFLICT_ERROR)
+    except Exception:
+        # A half-created run is worse than none: the client resubmits the whole payload
+        run.delete()
+        raise
+    return {'run_id': run.id, **counts.as_dict()}
+
+
+def _add_predictions(job):
+    run = Run.objects.filter(id=job.params.get('run_id')).first()
+    if run is None:
+        raise JobFailed({'run_id': [f"Run {job.params.get('run_id')} not found"]})
+
+    vertebra_rows, severity_rows, errors = validate_predictions_payload(job.payload)
+    if errors:
+        raise JobFailed(errors)
+    IngestJob.objects.filter(id=job.id).update(total=len(vertebra_rows) + len(severity_rows))
+
+    counts = _write_in_chunks(job, run, vertebra_rows, severity_rows, job.params.get('on_conflict', CONFLICT_ERROR))
+    return {'run_id': run.id, **counts.as_dict()}
+
+
+HANDLERS = {
+    IngestJob.RUN_WITH_PREDICTIONS: _run_with_predictions,
+    IngestJob.ADD_PREDICTIONS: _add_predictions,
+}
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome on the row."""
+    try:
+        result = HANDLERS[job.kind](job)
+    except JobFailed as e:
+        update = {'status': JobStatus.FAILED, 'errors': e.errors}
+    except Exception as e:
+        logger.exception(f"Ingest job {job.id} failed")
+        update = {'status': JobStatus.FAILED, 'errors': {'job': [str(e)]}}
+    else:
+        # The payload can be very large and is not needed any more
+        update = {'status': JobStatus.SUCCEEDED, 'result': result, 'payload': None}
+    # A job failed as stale keeps that outcome even if its slow worker finishes afterwards
+    recorded = IngestJob.objects.filter(id=job.id, status=JobStatus.RUNNING, worker=job.worker).update(
+        finished_at=timezone.now(), **update
+    )
+    if not recorded:
+        logger.warning(f"Ingest job {job.id} was failed as stale before its worker finished; outcome discarded")
+        if job.kind == IngestJob.RUN_WITH_PREDICTIONS and update['status'] == JobStatus.SUCCEEDED:
+            # The sweep could not delete a run created after it; the job is failed, so is the run
+            Run.objects.filter(id=update['result']['run_id']).delete()
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,65 @@
+"""Validation of the payloads accepted by the prediction endpoints, in row or columnar layout."""
+from ..serializers import PredSeveritySerializer, PredVertebraSerializer, RunSerializer, RunWithPredictionsSerializer
+from .columnar import decode_columnar_predictions, is_columnar
+from .predictions import validate_prediction_references
+
+
+def _validate_rows(data):
+    vertebra_serializer = PredVertebraSerializer(data=data.get('vertebra_predictions', []), many=True)
+    if not vertebra_serializer.is_valid():
+        return [], [], {'vertebra_predictions': vertebra_serializer.errors}
+
+    severity_serializer = PredSeveritySerializer(data=data.get('severity_predictions', []), many=True)
+    if not severity_serializer.is_valid():
+        return [], [], {'severity_predictions': severity_serializer.errors}
+
+    return vertebra_serializer.validated_data, severity_serializer.validated_data, {}
+
+
+def validate_predictions_payload(data):
+    """
+    Validate the ``vertebra_predictions`` / ``severity_predictions`` of an
+    add-predictions payload, given as lists of objects or in the columnar
+    layout.
+
+    Returns (vertebra rows, severity rows, errors); errors is an empty dict
+    when the payload is valid.
+    """
+    decode = decode_columnar_predictions if is_columnar(data) else _validate_rows
+    vertebra_rows, severity_rows, errors = decode(data)
+    if errors:
+        return [], [], errors
+
+    # Exams and model versions are checked with one query each
+    return vertebra_rows, severity_rows, validate_prediction_references(vertebra_rows, severity_rows)
+
+
+def validate_run_payload(data):
+    """
+    Validate a create-run-with-predictions payload in either layout.
+
+    Returns (run fields, exam ids, vertebra rows, severity rows, errors).
+    """
+    if not is_columnar(data):
+        serializer = RunWithPredictionsSerializer(data=data)
+        if not serializer.is_valid():
+            return {}, [], [], [], serializer.errors
+        run_data = dict(serializer.validated_data)
+        return (
+            run_data, run_data.pop('exam_ids'),
+            run_data.pop('vertebra_predictions', []), run_data.pop('severity_predictions', []), {}
+        )
+
+    run_serializer = RunSerializer(data={key: data[key] for key in ('name', 'description', 'exam_ids') if key in data})
+    run_serializer.is_valid()
+    vertebra_rows, severity_rows, errors = decode_columnar_predictions(data)
+    errors = {**run_serializer.errors, **errors}
+    if 'exam_ids' not in data:
+        errors['exam_ids'] = ['This field is required.']
+    if errors:
+        return {}, [], [], [], errors
+
+    run_data = dict(run_serializer.validated_data)
+    exam_ids = run_data.pop('exam_ids')
+    errors = validate_prediction_references(vertebra_rows, severity_rows, exam_ids=exam_ids)
+    return run_data, exam_ids, vertebra_rows, severity_rows, errors
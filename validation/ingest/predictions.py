@@ -0,0 +1,227 @@
+"""
+Set-based insertion of vertebra and severity predictions.
+
+Rows are the validated data of ``PredVertebraSerializer`` /
+``PredSeveritySerializer``: plain dicts with ``exam_id`` and
+``model_version_id`` integers and a nested ``polygon`` / ``bounding_box``
+(a Box or a mapping), whose coordinates are stored on the prediction row.
+Vertebra rows may also carry a ``contour`` and a run-length encoded ``mask``,
+each written as one packed column.
+References are checked with one query per table and the rows are written
+with ``bulk_create`` in chunks, so a run costs a handful of queries instead
+of several per prediction. Predictions that already exist in the run can be
+updated in place or skipped with one ``INSERT ... ON CONFLICT`` per chunk.
+"""
+from django.conf import settings
+
+from ..enums.severity import Severity
+from ..enums.vertebra_name import VertebraName
+from ..models import Exam, ModelVersion, PredSeverity, PredVertebra, Run, RunAssignment
+from ..models.box import BOX_FIELDS
+
+# Keys that identify a prediction within a run (the models' unique_together)
+VERTEBRA_KEY = 'name'
+SEVERITY_KEY = 'vertebrae_level'
+
+# Model defaults for fields the serializers leave out when not given
+DEFAULTS = {'name': VertebraName.UNKNOWN, 'severity_name': Severity.UNKNOWN, 'confidence': 0.0}
+
+# Points accepted in one vertebra contour (8 bytes each once packed)
+MAX_CONTOUR_POINTS = 4096
+
+# Longest side of a vertebra mask, in pixels
+MAX_MASK_SIDE = 8192
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def missing_ids(model, ids):
+    """Return the sorted ``ids`` that have no ``model`` row."""
+    ids = sorted(set(ids))
+    found = set()
+    for chunk in _chunks(ids, settings.INGEST_BATCH_SIZE):
+        found.update(model.objects.filter(id__in=chunk).order_by().values_list('id', flat=True))
+    return [id_ for id_ in ids if id_ not in found]
+
+
+def prediction_key(row, key):
+    """Return the (exam, name/level) pair that identifies a prediction within its run."""
+    return row['exam_id'], row.get(key, DEFAULTS.get(key))
+
+
+def _duplicates(rows, key):
+    seen, duplicates = set(), set()
+    for row in rows:
+        identity = prediction_key(row, key)
+        if identity in seen:
+            duplicates.add(identity)
+        seen.add(identity)
+    return sorted(duplicates)
+
+
+def validate_prediction_references(vertebra_rows, severity_rows, exam_ids=()):
+    """
+    Check that every referenced exam and model version exists, and that no
+    prediction is given twice. Returns a dict of error lists (empty if valid).
+    """
+    errors = {}
+    all_rows = list(vertebra_rows) + list(severity_rows)
+
+    missing_exams = missing_ids(Exam, {row['exam_id'] for row in all_rows} | set(exam_ids))
+    if missing_exams:
+        errors['exam_ids'] = [f"Exams not found: {', '.join(map(str, missing_exams))}"]
+
+    missing_versions = missing_ids(ModelVersion, {row['model_version_id'] for row in all_rows})
+    if missing_versions:
+        errors['model_version_ids'] = [f"Model versions not found: {', '.join(map(str, missing_versions))}"]
+
+    for field, rows, key in (
+        ('vertebra_predictions', vertebra_rows, VERTEBRA_KEY),
+        ('severity_predictions', severity_rows, SEVERITY_KEY),
+    ):
+        duplicates = _duplicates(rows, key)
+        if duplicates:
+            errors[field] = [
+                f"Duplicate {key} {value!r} for exam {exam_id}" for exam_id, value in duplicates[:20]
+            ]
+    return errors
+
+
+# What to do with a prediction whose (run, exam, name/level) already exists
+CONFLICT_ERROR = 'error'    # fail with IntegrityError
+CONFLICT_UPDATE = 'update'  # overwrite it in place, keeping its id and validations
+CONFLICT_SKIP = 'skip'      # keep the stored prediction
+CONFLICT_MODES = (CONFLICT_ERROR, CONFLICT_UPDATE, CONFLICT_SKIP)
+
+
+class PredictionCounts:
+    """Predictions created, updated and skipped by a write, per prediction type."""
+
+    def __init__(self):
+        self.created = {PredVertebra: 0, PredSeverity: 0}
+        self.updated = {PredVertebra: 0, PredSeverity: 0}
+        self.skipped = {PredVertebra: 0, PredSeverity: 0}
+
+    @property
+    def vertebrae(self):
+        """Vertebra predictions written (created or updated)."""
+        return self.created[PredVertebra] + self.updated[PredVertebra]
+
+    @property
+    def severities(self):
+        """Severity predictions written (created or updated)."""
+        return self.created[PredSeverity] + self.updated[PredSeverity]
+
+    def add(self, other):
+        for counts, other_counts in ((self.created, other.created), (self.updated, other.updated),
+                                     (self.skipped, other.skipped)):
+            for model, value in other_counts.items():
+                counts[model] += value
+
+    def as_dict(self):
+        return {
+            name: {'vertebrae_count': counts[PredVertebra], 'severities_count': counts[PredSeverity]}
+            for name, counts in (('created', self.created), ('updated', self.updated), ('skipped', self.skipped))
+        }
+
+
+def _vertebra(run, row):
+    return PredVertebra(
+        run_id=run,
+        exam_id_id=row['exam_id'],
+        model_version_id=row['model_version_id'],
+        name=row.get('name', DEFAULTS['name']),
+        confidence=row.get('confidence', DEFAULTS['confidence']),
+        polygon=row['polygon'],
+        contour=row.get('contour'),
+        mask=row.get('mask'),
+    )
+
+
+def _severity(run, row):
+    return PredSeverity(
+        run_id=run,
+        exam_id_id=row['exam_id'],
+        model_version_id=row['model_version_id'],
+        severity_name=row.get('severity_name', DEFAULTS['severity_name']),
+        vertebrae_level=row['vertebrae_level'],
+        confidence=row.get('confidence', DEFAULTS['confidence']),
+        bounding_box=row['bounding_box'],
+    )
+
+
+# model -> (key field, builder, fields overwritten on update)
+PREDICTION_TYPES = {
+    PredVertebra: (VERTEBRA_KEY, _vertebra,
+                   ['confidence', 'model_version', 'predicted_at', *BOX_FIELDS, 'contour', 'mask']),
+    PredSeverity: (SEVERITY_KEY, _severity,
+                   ['severity_name', 'confidence', 'model_version', 'predicted_at', *BOX_FIELDS]),
+}
+
+
+def _existing_predictions(model, run, rows):
+    """Return the (exam, name/level) keys of the predictions of ``rows`` already stored in ``run``."""
+    key = PREDICTION_TYPES[model][0]
+    stored = model.objects.filter(
+        run_id=run, exam_id__in={row['exam_id'] for row in rows}
+    ).order_by().values_list('exam_id', key)
+    return set(stored)
+
+
+def _write_chunk(model, run, rows, on_conflict, counts):
+    key, build, update_fields = PREDICTION_TYPES[model]
+    existing = set() if on_conflict == CONFLICT_ERROR else _existing_predictions(model, run, rows)
+
+    predictions, stored = [], 0
+    for row in rows:
+        if prediction_key(row, key) in existing:
+            if on_conflict == CONFLICT_SKIP:
+                counts.skipped[model] += 1
+                continue
+            stored += 1
+        predictions.append(build(run, row))
+    if not predictions:
+        return
+
+    if on_conflict == CONFLICT_UPDATE:
+        # One INSERT ... ON CONFLICT DO UPDATE for the whole chunk, boxes included
+        model.objects.bulk_create(
+            predictions, update_conflicts=True,
+            unique_fields=['run_id', 'exam_id', key], update_fields=update_fields,
+        )
+    else:
+        model.objects.bulk_create(predictions, ignore_conflicts=on_conflict == CONFLICT_SKIP)
+    counts.created[model] += len(predictions) - stored
+    counts.updated[model] += stored
+
+
+def create_predictions(run, vertebra_rows=(), severity_rows=(), chunk_size=None, on_conflict=CONFLICT_ERROR):
+    """
+    Write predictions for ``run`` with bulk queries and return PredictionCounts.
+
+    ``on_conflict`` decides what happens to predictions that already exist in
+    the run (see CONFLICT_MODES). Callers validate the rows first and wrap the
+    call in a transaction.
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_MODES)}")
+    chunk_size = chunk_size or settings.INGEST_BATCH_SIZE
+    counts = PredictionCounts()
+    for model, rows in ((PredVertebra, list(vertebra_rows)), (PredSeverity, list(severity_rows))):
+        for chunk in _chunks(rows, chunk_size):
+            _write_chunk(model, run, chunk, on_conflict, counts)
+    # Assignments count the severities left to validate
+    RunAssignment.objects.filter(run=run).add_progress(total=counts.created[PredSeverity])
+    return counts
+
+
+def add_exams_to_run(run, exam_ids, chunk_size=None):
+    """Link ``exam_ids`` to ``run`` with bulk inserts into the M2M table, skipping existing links."""
+    chunk_size = chunk_size or settings.INGEST_BATCH_SIZE
+    Through = Run.exams.through
+    links = [Through(run_id=run.id, exam_id=exam_id) for exam_id in dict.fromkeys(exam_ids)]
+    for chunk in _chunks(links, chunk_size):
+        Through.objects.bulk_create(chunk, ignore_conflicts=True)
@@ -0,0 +1,197 @@
+"""
+Streaming ingestion of predictions sent as newline-delimited JSON (NDJSON).
+
+Each line is one prediction in the format accepted by
+``PredVertebraSerializer`` or ``PredSeveritySerializer``, with a ``type`` of
+``"vertebra"`` or ``"severity"``. The body is read line by line and valid rows
+are committed every ``batch_size`` lines, so memory stays flat however many
+predictions are sent. Invalid lines are skipped and reported; they never
+abort the rest of the stream.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from ..models import Exam, ModelVersion
+from ..serializers import PredSeveritySerializer, PredVertebraSerializer
+from .exams import MAX_REPORTED_ERRORS
+from .predictions import (
+    CONFLICT_ERROR, SEVERITY_KEY, VERTEBRA_KEY, PredictionCounts, create_predictions, missing_ids, prediction_key,
+)
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_TYPES = ('vertebra', 'severity')
+
+# Upper bound for the rows held in memory between commits
+MAX_STREAM_BATCH_SIZE = 50000
+
+
+class PredictionStreamReport:
+    """Counts of what a stream did, plus the first few errors."""
+
+    def __init__(self):
+        self.lines = 0
+        self.counts = PredictionCounts()
+        self.invalid = 0
+        self.failed_batches = 0
+        self.errors = []
+
+    def add_error(self, line, error):
+        self.invalid += 1
+        self._report({'line': line, 'error': error})
+
+    def add_batch_error(self, first_line, last_line, error):
+        self.failed_batches += 1
+        self._report({'lines': f'{first_line}-{last_line}', 'error': error})
+
+    def _report(self, error):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+    @property
+    def ok(self):
+        return not self.invalid and not self.failed_batches
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            **self.counts.as_dict(),
+            'invalid': self.invalid,
+            'failed_batches': self.failed_batches,
+            'errors': self.errors,
+        }
+
+
+def iter_ndjson(stream):
+    """Yield (line number, object or None, error or None) for each non-blank line of ``stream``."""
+    for lineno, raw in enumerate(iter(stream.readline, b''), start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            obj = json.loads(raw)
+        except (UnicodeDecodeError, ValueError) as e:
+            yield lineno, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(obj, dict):
+            yield lineno, None, 'Each line must be a JSON object'
+            continue
+        yield lineno, obj, None
+
+
+def _format_errors(errors):
+    """Flatten (possibly nested) serializer errors to one compact string."""
+    if isinstance(errors, dict):
+        return '; '.join(f'{field}: {_format_errors(messages)}' for field, messages in errors.items())
+    if isinstance(errors, list):
+        return ' '.join(_format_errors(message) for message in errors)
+    return str(errors)
+
+
+class _Batch:
+    def __init__(self):
+        self.first_line = None
+        self.last_line = None
+        self.rows = {'vertebra': [], 'severity': []}  # lists of (line, validated row)
+
+    def add(self, lineno, prediction_type, row):
+        if self.first_line is None:
+            self.first_line = lineno
+        self.last_line = lineno
+        self.rows[prediction_type].append((lineno, row))
+
+    def __len__(self):
+        return len(self.rows['vertebra']) + len(self.rows['severity'])
+
+
+class PredictionStreamIngestor:
+    """Validate NDJSON prediction lines for one run and commit them in batches."""
+
+    def __init__(self, run, batch_size=None, on_conflict=CONFLICT_ERROR):
+        self.run = run
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.on_conflict = on_conflict
+        # One serializer per type validates every line, as ListSerializer does with its child
+        self.serializers = {'vertebra': PredVertebraSerializer(), 'severity': PredSeveritySerializer()}
+        self.report = PredictionStreamReport()
+        # Referenced ids already confirmed to exist, so each is looked up once per stream
+        self._known = {Exam: set(), ModelVersion: set()}
+
+    def ingest(self, stream):
+        batch = _Batch()
+        for lineno, obj, error in iter_ndjson(stream):
+            self.report.lines += 1
+            if error:
+                self.report.add_error(lineno, error)
+                continue
+
+            prediction_type = obj.pop('type', None)
+            if prediction_type not in PREDICTION_TYPES:
+                self.report.add_error(lineno, f"type: must be one of {', '.join(PREDICTION_TYPES)}")
+                continue
+
+            try:
+                row = self.serializers[prediction_type].run_validation(obj)
+            except serializers.ValidationError as e:
+                self.report.add_error(lineno, _format_errors(e.detail))
+                continue
+
+            batch.add(lineno, prediction_type, row)
+            if len(batch) >= self.batch_size:
+                self._commit(batch)
+                batch = _Batch()
+
+        if len(batch):
+            self._commit(batch)
+        return self.report
+
+    def _resolve(self, model, ids):
+        unknown = set(ids) - self._known[model]
+        missing = set(missing_ids(model, unknown))
+        self._known[model].update(unknown - missing)
+        return missing
+
+    def _check_rows(self, batch):
+        """Drop rows with missing references or duplicate keys, reporting each by line."""
+        rows = [row for rows in batch.rows.values() for _, row in rows]
+        missing_exams = self._resolve(Exam, {row['exam_id'] for row in rows})
+        missing_versions = self._resolve(ModelVersion, {row['model_version_id'] for row in rows})
+
+        checked = {}
+        for prediction_type, key in (('vertebra', VERTEBRA_KEY), ('severity', SEVERITY_KEY)):
+            seen, kept = set(), []
+            for lineno, row in batch.rows[prediction_type]:
+                identity = prediction_key(row, key)
+                if row['exam_id'] in missing_exams:
+                    self.report.add_error(lineno, f"exam_id: Exam {row['exam_id']} not found")
+                elif row['model_version_id'] in missing_versions:
+                    self.report.add_error(lineno, f"model_version_id: Model version {row['model_version_id']} not found")
+                elif identity in seen:
+                    self.report.add_error(lineno, f"Duplicate {key} {identity[1]!r} for exam {identity[0]}")
+                else:
+                    seen.add(identity)
+                    kept.append(row)
+            checked[prediction_type] = kept
+        return checked
+
+    def _commit(self, batch):
+        rows = self._check_rows(batch)
+        try:
+            with transaction.atomic():
+                counts = create_predictions(
+                    self.run, rows['vertebra'], rows['severity'], on_conflict=self.on_conflict
+                )
+        except IntegrityError as e:
+            logger.warning(f"Prediction batch {batch.first_line}-{batch.last_line} for run {self.run.id} failed: {e}")
+            self.report.add_batch_error(batch.first_line, batch.last_line, f'Not saved: {e}')
+            return
+        self.report.counts.add(counts)
+
+
+def ingest_prediction_stream(run, stream, batch_size=None, on_conflict=CONFLICT_ERROR):
+    """Ingest the NDJSON predictions read from ``stream`` into ``run`` and return the report."""
+    return PredictionStreamIngestor(run, batch_size, on_conflict).ingest(stream)
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from validation.images.loader import fetch_image
+from validation.images.metadata import METADATA_FIELDS, apply_image_metadata
+from validation.images.sources import ImageNotFound
+from validation.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Record image dimensions, format, byte size and checksum for exams that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--run',
+            type=int,
+            help='Only exams of this run'
+        )
+
+        parser.add_argument(
+            '--dataset-version',
+            type=str,
+            help='Only exams of this dataset version'
+        )
+
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute metadata for exams that already have it'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of images fetched and read concurrently (default: 4)'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of exams saved per query (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1.')
+
+        exams = Exam.objects.exclude(image_path='').order_by('id')
+        if options['run']:
+            exams = exams.filter(runs__id=options['run'])
+        if options['dataset_version']:
+            exams = exams.filter(version=options['dataset_version'])
+        if not options['force']:
+            exams = exams.filter(image_sha256='')
+
+        exams = list(exams)
+        total = len(exams)
+        if total == 0:
+            self.stdout.write(self.style.SUCCESS('All selected exams already have image metadata.'))
+            return
+
+        self.stdout.write(f'Reading image metadata for {total} exams...')
+
+        pending, updated, missing, failed = [], 0, [], []
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(self._read, exam): exam for exam in exams}
+            for done, future in enumerate(as_completed(futures), start=1):
+                exam = futures[future]
+                try:
+                    pending.append(future.result())
+                except ImageNotFound:
+                    missing.append(exam)
+                except Exception as e:
+                    failed.append(exam)
+                    self.stdout.write(self.style.ERROR(f'  exam {exam.id} ({exam.image_path}): {e}'))
+
+                # Database writes stay on this thread
+                if len(pending) >= options['batch_size']:
+                    updated += self._save(pending)
+                    pending = []
+                    self.stdout.write(f'  [{done}/{total}] saved')
+
+        if pending:
+            updated += self._save(pending)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} exams; {len(missing)} images missing, {len(failed)} failed.'
+        ))
+        for exam in missing:
+            self.stdout.write(f'  missing: exam {exam.id} ({exam.external_id}): {exam.image_path}@{exam.version}')
+
+        if failed:
+            raise CommandError(f'{len(failed)} exam(s) could not be processed; re-run to retry them.')
+
+    def _read(self, exam):
+        return apply_image_metadata(exam, fetch_image(exam.image_path, exam.version))
+
+    def _save(self, exams):
+        Exam.objects.bulk_update(exams, METADATA_FIELDS)
+        return len(exams)
@@ -4,7 +4,7 @@ from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.utils import timezone
 from validation.models import (
-    Exam, ModelVersion, Run, Polygon, 
+    Box, Exam, ModelVersion, Run,
     PredVertebra, PredSeverity, Validation, RunAssignment
 )
 from validation.enums.vertebra_name import VertebraName
@@ -31,7 +31,6 @@ class Command(BaseCommand):
             Validation.objects.all().delete()
             PredSeverity.objects.all().delete()
             PredVertebra.objects.all().delete()
-            Polygon.objects.all().delete()
             RunAssignment.objects.all().delete()
             Run.objects.all().delete()
             Exam.objects.all().delete()
@@ -159,7 +158,7 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(f'Using existing assignment: {run.name} → {user.email}')
         
-        # For each run, create vertebrae predictions with polygons
+        # For each run, create vertebrae predictions with boxes
         vertebra_choices = list(VertebraName.choices)
         severity_choices = list(Severity.choices)
         
@@ -173,7 +172,7 @@ class Command(BaseCommand):
             predictions_for_exam = []
             
             for i in range(num_vertebrae):
-                # Create polygon first
+                # Vertebra box
                 x1 = random.uniform(0.1, 0.8)
                 y1 = random.uniform(0.1, 0.8)
                 x2 = x1 + random.uniform(0.05, 0.15)
@@ -183,9 +182,7 @@ class Command(BaseCommand):
                 x2 = min(x2, 1.0)
                 y2 = min(y2, 1.0)
                 
-                polygon = Polygon.objects.create(
-                    x1=x1, y1=y1, x2=x2, y2=y2
-                )
+                polygon = Box(x1=x1, y1=y1, x2=x2, y2=y2)
                 
                 # Choose vertebra name (avoid duplicates within same exam)
                 available_vertebrae = [v[0] for v in vertebra_choices if v[0] not in [p['vertebra_name'] for p in predictions_for_exam]]
@@ -203,9 +200,7 @@ class Command(BaseCommand):
                 x2_sev = min(x2_sev, 1.0)
                 y2_sev = min(y2_sev, 1.0)
                 
-                severity_polygon = Polygon.objects.create(
-                    x1=x1_sev, y1=y1_sev, x2=x2_sev, y2=y2_sev
-                )
+                severity_polygon = Box(x1=x1_sev, y1=y1_sev, x2=x2_sev, y2=y2_sev)
                 
                 # Choose random severity
                 severity_name = random.choice(severity_choices)[0]
@@ -261,4 +256,7 @@ class Command(BaseCommand):
                         )
                         self.stdout.write(self.style.SUCCESS(f'Created validation for {exam.external_id} - {severity.severity_name}'))
         
+        # The assignments were created before their runs had predictions
+        RunAssignment.objects.filter(run__in=runs).refresh_progress()
+        
         self.stdout.write(self.style.SUCCESS('Successfully created sample validation data!'))
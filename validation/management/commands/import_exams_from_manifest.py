@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from validation.images.sources import ImageNotFound, get_image_source
+from validation.ingest.exams import import_exams
+
+
+class Command(BaseCommand):
+    help = 'Create exams for every image of a dataset revision, using a single listing of its files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset-version',
+            type=str,
+            default='main',
+            help='Dataset revision to import (default: main)'
+        )
+
+        parser.add_argument(
+            '--pattern',
+            type=str,
+            help='Regular expression matched against each file path; must define (?P<external_id>...) '
+                 '(default: EXAM_MANIFEST_PATTERN setting)'
+        )
+
+        parser.add_argument(
+            '--from-file',
+            type=str,
+            help='Read file paths (one per line) from this manifest instead of listing the revision'
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Number of exams inserted per query (default: INGEST_BATCH_SIZE setting)'
+        )
+
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be imported without creating any exams'
+        )
+
+    def handle(self, *args, **options):
+        version = options['dataset_version']
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        if options['from_file']:
+            try:
+                with open(options['from_file']) as f:
+                    paths = [line.strip() for line in f if line.strip()]
+            except OSError as e:
+                raise CommandError(f'Cannot read manifest: {e}')
+        else:
+            self.stdout.write(f'Listing files of dataset version {version}...')
+            try:
+                paths = get_image_source(version).list_files(version)
+            except ImageNotFound as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(f'Importing exams from {len(paths)} files...')
+        try:
+            report = import_exams(
+                paths, version,
+                pattern=options['pattern'],
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{report.created} created, {report.skipped} already existed, '
+            f'{report.invalid} invalid, {report.ignored} files ignored.'
+        ))
+        for error in report.errors:
+            self.stdout.write(self.style.WARNING(f'  invalid: {error["image_path"]}: {error["error"]}'))
+        if report.invalid > len(report.errors):
+            self.stdout.write(self.style.WARNING(f'  ... and {report.invalid - len(report.errors)} more'))
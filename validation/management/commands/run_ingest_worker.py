@@ -0,0 +1,66 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from validation.enums.job_status import JobStatus
+from validation.ingest.jobs import claim_next_job, fail_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Process queued ingestion jobs (bulk prediction uploads submitted with ?async=true)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs that are queued now, then exit'
+        )
+
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds to wait between checks for new jobs (default: INGEST_WORKER_POLL_SECONDS setting)'
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval'] or settings.INGEST_WORKER_POLL_SECONDS
+        name = worker_name()
+        self._stopping = False
+        if not options['once']:
+            # Finish the current job before exiting on docker stop / Ctrl+C
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(f'Ingest worker {name} started.')
+        while not self._stopping:
+            close_old_connections()
+            stale = fail_stale_jobs()
+            if stale:
+                self.stdout.write(self.style.WARNING(f'Marked {stale} stalled job(s) as failed.'))
+
+            job = claim_next_job(name)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f'Running job {job.id} ({job.get_kind_display()})...')
+            started = time.monotonic()
+            job = run_job(job)
+            elapsed = time.monotonic() - started
+            if job.status == JobStatus.SUCCEEDED:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Job {job.id} succeeded: {job.processed} predictions in {elapsed:.1f}s.'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job {job.id} failed after {elapsed:.1f}s: {job.errors}'))
+
+        self.stdout.write('Ingest worker stopped.')
+
+    def _stop(self, signum, frame):
+        self.stdout.write('Stopping after the current job...')
+        self._stopping = True
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from validation.models import RunAssignment
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the progress counters and completion status of run assignments, e.g. after '
+        'predictions or validations were changed outside the application'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--run',
+            type=int,
+            help='Only assignments of this run'
+        )
+
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Only assignments of this user ID'
+        )
+
+    def handle(self, *args, **options):
+        assignments = RunAssignment.objects.all()
+        if options['run']:
+            assignments = assignments.filter(run_id=options['run'])
+        if options['user']:
+            assignments = assignments.filter(user_id=options['user'])
+
+        updated = assignments.refresh_progress()
+        completed = assignments.filter(is_completed=True).count()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {updated} assignments; {completed} completed.'))
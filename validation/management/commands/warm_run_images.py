@@ -0,0 +1,127 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from validation.images.derivatives import get_exam_preview
+from validation.images.loader import fetch_image, is_image_cached
+from validation.images.sources import ImageNotFound, get_image_source
+from validation.models import Run
+
+
+class Command(BaseCommand):
+    help = 'Download the images of every exam in one or more runs into the local image cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'run_ids',
+            nargs='+',
+            type=int,
+            help='IDs of the runs whose exam images should be downloaded'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of concurrent downloads (default: 8)'
+        )
+
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=3,
+            help='Attempts per image before giving up (default: 3)'
+        )
+
+        parser.add_argument(
+            '--previews',
+            action='store_true',
+            help='Also render the preview shown when an exam is opened'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['retries'] < 1:
+            raise CommandError('--workers and --retries must be at least 1.')
+
+        runs = list(Run.objects.filter(id__in=options['run_ids']))
+        unknown = set(options['run_ids']) - {run.id for run in runs}
+        if unknown:
+            raise CommandError(f'Run(s) not found: {", ".join(str(i) for i in sorted(unknown))}')
+
+        # The same image may appear in several runs; download it once.
+        images = {}
+        for run in runs:
+            for exam in run.exams.exclude(image_path='').order_by('id'):
+                images.setdefault((exam.image_path, exam.version or 'main'), exam)
+
+        total = len(images)
+        if total == 0:
+            self.stdout.write(self.style.WARNING('No exam images found for the selected runs.'))
+            return
+
+        for version in sorted({version for _, version in images}):
+            source = get_image_source(version)
+            if not source.configured:
+                raise CommandError(f"Image source '{source.alias}' for version {version} is not configured.")
+
+        self.stdout.write(f'Warming {total} images with {options["workers"]} workers...')
+        variant = f'preview-{max(settings.IMAGE_PREVIEW_SIZES)}.jpg' if options['previews'] else None
+
+        cached, downloaded, missing, failed = 0, 0, [], []
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {}
+            for (image_path, version), exam in images.items():
+                if is_image_cached(image_path, version, variant):
+                    cached += 1
+                    continue
+                future = executor.submit(self._warm, exam, options['retries'], options['previews'])
+                futures[future] = exam
+
+            done = cached
+            for future in as_completed(futures):
+                exam = futures[future]
+                done += 1
+                try:
+                    future.result()
+                    downloaded += 1
+                except ImageNotFound:
+                    missing.append(exam)
+                except Exception as e:
+                    failed.append((exam, e))
+                    self.stdout.write(self.style.ERROR(f'  {exam.image_path}@{exam.version}: {e}'))
+
+                if done % 25 == 0 or done == total:
+                    self.stdout.write(f'  [{done}/{total}] {time.monotonic() - started:.1f}s elapsed')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {time.monotonic() - started:.1f}s: '
+            f'{downloaded} fetched, {cached} already cached, '
+            f'{len(missing)} missing, {len(failed)} failed.'
+        ))
+
+        if missing:
+            self.stdout.write(self.style.WARNING('Missing from the image source:'))
+            for exam in sorted(missing, key=lambda e: e.id):
+                self.stdout.write(f'  exam {exam.id} ({exam.external_id}): {exam.image_path}@{exam.version}')
+
+        if failed:
+            raise CommandError(f'{len(failed)} image(s) could not be downloaded; re-run to retry them.')
+
+    def _warm(self, exam, retries, previews):
+        """Fetch one image into the cache, retrying transient errors with exponential backoff."""
+        for attempt in range(1, retries + 1):
+            try:
+                fetch_image(exam.image_path, exam.version)
+                if previews:
+                    get_exam_preview(exam, max(settings.IMAGE_PREVIEW_SIZES))
+                return
+            except ImageNotFound:
+                raise
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(2 ** (attempt - 1))
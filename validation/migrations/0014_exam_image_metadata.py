@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0013_add_assignments_locked_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='image_format',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='image_size',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Image file size in bytes', null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='image_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
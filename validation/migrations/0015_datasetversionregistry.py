@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0014_exam_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersionRegistry',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('repo_id', models.CharField(help_text='Hugging Face dataset repository', max_length=200, unique=True)),
+                ('versions', models.JSONField(default=list, help_text="Available versions, 'main' first")),
+                ('fetched_at', models.DateTimeField(blank=True, help_text='Last successful fetch from the hub', null=True)),
+                ('checked_at', models.DateTimeField(blank=True, help_text='Last fetch attempt, successful or not', null=True)),
+                ('refresh_started_at', models.DateTimeField(blank=True, help_text='Set while a worker is refreshing the list, so only one of them queries the hub', null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Dataset version registry',
+                'verbose_name_plural': 'Dataset version registries',
+            },
+        ),
+    ]
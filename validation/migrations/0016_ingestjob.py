@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0015_datasetversionregistry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('run_with_predictions', 'Create run with predictions'), ('add_predictions', 'Add predictions to run')], max_length=50)),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Succeeded', 'Succeeded'), ('Failed', 'Failed')], db_index=True, default='Queued', max_length=20)),
+                ('payload', models.JSONField(blank=True, help_text='Request body, cleared once the job succeeds', null=True)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Options such as run_id and on_conflict')),
+                ('processed', models.PositiveIntegerField(default=0, help_text='Predictions written so far')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Predictions in the payload')),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('errors', models.JSONField(blank=True, default=dict)),
+                ('worker', models.CharField(blank=True, default='', help_text='Worker that claimed the job', max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Last progress update from the worker', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingest_jobs', to=settings.AUTH_USER_MODEL)),
+                ('run', models.ForeignKey(blank=True, help_text='Run created or extended by this job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingest_jobs', to='validation.run')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
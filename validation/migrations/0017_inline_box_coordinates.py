@@ -0,0 +1,123 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BOX_FIELDS = ('x1', 'y1', 'x2', 'y2')
+
+# model -> foreign key to the Polygon holding its box
+BOX_RELATIONS = (
+    ('PredVertebra', 'polygon'),
+    ('PredSeverity', 'bounding_box'),
+    ('Validation', 'bounding_box'),
+)
+
+
+def copy_boxes_inline(apps, schema_editor):
+    """Copy each Polygon's coordinates onto the rows pointing at it, with one UPDATE per table"""
+    Polygon = apps.get_model('validation', 'Polygon')
+    for model_name, relation in BOX_RELATIONS:
+        model = apps.get_model('validation', model_name)
+        box = Polygon.objects.filter(id=OuterRef(f'{relation}_id'))
+        model.objects.filter(**{f'{relation}__isnull': False}).update(
+            **{field: Subquery(box.values(field)[:1]) for field in BOX_FIELDS}
+        )
+
+
+def restore_polygons(apps, schema_editor):
+    """Recreate one Polygon per row with a box and point the row at it"""
+    Polygon = apps.get_model('validation', 'Polygon')
+    for model_name, relation in BOX_RELATIONS:
+        model = apps.get_model('validation', model_name)
+        rows = list(model.objects.filter(x1__isnull=False).only('id', *BOX_FIELDS).order_by('id'))
+        for start in range(0, len(rows), 1000):
+            chunk = rows[start:start + 1000]
+            polygons = Polygon.objects.bulk_create(
+                [Polygon(**{field: getattr(row, field) for field in BOX_FIELDS}) for row in chunk]
+            )
+            for row, polygon in zip(chunk, polygons):
+                setattr(row, f'{relation}_id', polygon.id)
+            model.objects.bulk_update(chunk, [relation])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0016_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predseverity',
+            name='x1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predseverity',
+            name='x2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predseverity',
+            name='y1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predseverity',
+            name='y2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predvertebra',
+            name='x1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predvertebra',
+            name='x2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predvertebra',
+            name='y1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predvertebra',
+            name='y2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='validation',
+            name='x1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='validation',
+            name='x2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='validation',
+            name='y1',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='validation',
+            name='y2',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        # Nullable while the data moves, so the copy can be reversed
+        migrations.AlterField(
+            model_name='predvertebra',
+            name='polygon',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='predicted_vertebrae', to='validation.polygon'),
+        ),
+        migrations.AlterField(
+            model_name='predseverity',
+            name='bounding_box',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='predicted_severities', to='validation.polygon'),
+        ),
+        migrations.RunPython(copy_boxes_inline, restore_polygons),
+    ]
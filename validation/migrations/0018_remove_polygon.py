@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0017_inline_box_coordinates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='predseverity',
+            name='x1',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predseverity',
+            name='x2',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predseverity',
+            name='y1',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predseverity',
+            name='y2',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predvertebra',
+            name='x1',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predvertebra',
+            name='x2',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predvertebra',
+            name='y1',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='predvertebra',
+            name='y2',
+            field=models.FloatField(),
+        ),
+        migrations.RemoveField(
+            model_name='predvertebra',
+            name='polygon',
+        ),
+        migrations.RemoveField(
+            model_name='predseverity',
+            name='bounding_box',
+        ),
+        migrations.RemoveField(
+            model_name='validation',
+            name='bounding_box',
+        ),
+        migrations.DeleteModel(
+            name='Polygon',
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:00
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# Codes as of this migration (see validation.enums); values not listed become the Unknown code
+NAME_CODES = {
+    'T8': 1, 'T9': 2, 'T10': 3, 'T11': 4, 'T12': 5, 'L1': 6, 'L2': 7, 'L3': 8, 'L4': 9, 'L5': 10, 'S1': 11,
+    'UNKNOWN': 12,
+}
+SEVERITY_CODES = {'Normal/Mild': 1, 'Moderate': 2, 'Severe': 3, 'Nothing': 4, 'Unkown': 5}
+LEVEL_CODES = {'L1/L2': 1, 'L2/L3': 2, 'L3/L4': 3, 'L4/L5': 4, 'L5/S1': 5, 'Unknown': 6}
+
+# (model, text field, codes, unknown value)
+CODED_FIELDS = (
+    ('PredVertebra', 'name', NAME_CODES, 'UNKNOWN'),
+    ('PredSeverity', 'severity_name', SEVERITY_CODES, 'Unkown'),
+    ('PredSeverity', 'vertebrae_level', LEVEL_CODES, 'Unknown'),
+    ('Validation', 'severity_name', SEVERITY_CODES, 'Unkown'),
+)
+
+
+def encode_choices(apps, schema_editor):
+    """Fill the code columns from the text columns, with one UPDATE per field"""
+    for model_name, field, codes, unknown in CODED_FIELDS:
+        model = apps.get_model('validation', model_name)
+        model.objects.filter(**{f'{field}__isnull': False}).update(**{f'{field}_code': Case(
+            *[When(**{field: value}, then=Value(code)) for value, code in codes.items()],
+            default=Value(codes[unknown]),
+        )})
+
+
+def decode_choices(apps, schema_editor):
+    """Fill the text columns back from the code columns"""
+    for model_name, field, codes, unknown in CODED_FIELDS:
+        model = apps.get_model('validation', model_name)
+        model.objects.filter(**{f'{field}_code__isnull': False}).update(**{field: Case(
+            *[When(**{f'{field}_code': code}, then=Value(value)) for value, code in codes.items()],
+            default=Value(unknown),
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0018_remove_polygon'),
+    ]
+
+    operations = [
+        # Dropped while the columns are swapped; restored by 0020
+        migrations.AlterUniqueTogether(
+            name='predseverity',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='predvertebra',
+            unique_together=set(),
+        ),
+        # Nullable so that the text column can be re-added and refilled when reversing
+        migrations.AlterField(
+            model_name='predseverity',
+            name='vertebrae_level',
+            field=models.CharField(choices=[('L1/L2', 'L1 L2'), ('L2/L3', 'L2 L3'), ('L3/L4', 'L3 L4'), ('L4/L5', 'L4 L5'), ('L5/S1', 'L5 S1'), ('Unknown', 'Unknown')], max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='predseverity',
+            name='severity_name_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='predseverity',
+            name='vertebrae_level_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='predvertebra',
+            name='name_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='validation',
+            name='severity_name_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(encode_choices, decode_choices),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:01
+
+import validation.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0019_enum_code_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='predseverity',
+            name='severity_name',
+        ),
+        migrations.RemoveField(
+            model_name='predseverity',
+            name='vertebrae_level',
+        ),
+        migrations.RemoveField(
+            model_name='predvertebra',
+            name='name',
+        ),
+        migrations.RemoveField(
+            model_name='validation',
+            name='severity_name',
+        ),
+        migrations.RenameField(
+            model_name='predseverity',
+            old_name='severity_name_code',
+            new_name='severity_name',
+        ),
+        migrations.RenameField(
+            model_name='predseverity',
+            old_name='vertebrae_level_code',
+            new_name='vertebrae_level',
+        ),
+        migrations.RenameField(
+            model_name='predvertebra',
+            old_name='name_code',
+            new_name='name',
+        ),
+        migrations.RenameField(
+            model_name='validation',
+            old_name='severity_name_code',
+            new_name='severity_name',
+        ),
+        migrations.AlterField(
+            model_name='predseverity',
+            name='severity_name',
+            field=validation.models.fields.ChoiceCodeField(choices=[('Normal/Mild', 'Normal Mild'), ('Moderate', 'Moderate'), ('Severe', 'Severe'), ('Nothing', 'Nothing'), ('Unkown', 'Unknown')], codes={'Moderate': 2, 'Normal/Mild': 1, 'Nothing': 4, 'Severe': 3, 'Unkown': 5}, default='Unkown'),
+        ),
+        migrations.AlterField(
+            model_name='predseverity',
+            name='vertebrae_level',
+            field=validation.models.fields.ChoiceCodeField(choices=[('L1/L2', 'L1 L2'), ('L2/L3', 'L2 L3'), ('L3/L4', 'L3 L4'), ('L4/L5', 'L4 L5'), ('L5/S1', 'L5 S1'), ('Unknown', 'Unknown')], codes={'L1/L2': 1, 'L2/L3': 2, 'L3/L4': 3, 'L4/L5': 4, 'L5/S1': 5, 'Unknown': 6}),
+        ),
+        migrations.AlterField(
+            model_name='predvertebra',
+            name='name',
+            field=validation.models.fields.ChoiceCodeField(choices=[('T8', 'T8'), ('T9', 'T9'), ('T10', 'T10'), ('T11', 'T11'), ('T12', 'T12'), ('L1', 'L1'), ('L2', 'L2'), ('L3', 'L3'), ('L4', 'L4'), ('L5', 'L5'), ('S1', 'S1'), ('UNKNOWN', 'Unknown')], codes={'L1': 6, 'L2': 7, 'L3': 8, 'L4': 9, 'L5': 10, 'S1': 11, 'T10': 3, 'T11': 4, 'T12': 5, 'T8': 1, 'T9': 2, 'UNKNOWN': 12}, default='UNKNOWN'),
+        ),
+        migrations.AlterField(
+            model_name='validation',
+            name='severity_name',
+            field=validation.models.fields.ChoiceCodeField(blank=True, choices=[('Normal/Mild', 'Normal Mild'), ('Moderate', 'Moderate'), ('Severe', 'Severe'), ('Nothing', 'Nothing'), ('Unkown', 'Unknown')], codes={'Moderate': 2, 'Normal/Mild': 1, 'Nothing': 4, 'Severe': 3, 'Unkown': 5}, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='predseverity',
+            unique_together={('run_id', 'exam_id', 'vertebrae_level')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='predvertebra',
+            unique_together={('run_id', 'exam_id', 'name')},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+import validation.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0020_enum_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predvertebra',
+            name='contour',
+            field=validation.models.fields.ContourField(blank=True, null=True),
+        ),
+    ]
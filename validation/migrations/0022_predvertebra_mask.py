@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:00
+
+import validation.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0021_predvertebra_contour'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predvertebra',
+            name='mask',
+            field=validation.models.fields.MaskField(blank=True, null=True),
+        ),
+    ]
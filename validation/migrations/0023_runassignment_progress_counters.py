@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_progress(apps, schema_editor):
+    """Fill the counters of existing assignments with one UPDATE"""
+    RunAssignment = apps.get_model('validation', 'RunAssignment')
+    PredSeverity = apps.get_model('validation', 'PredSeverity')
+    Validation = apps.get_model('validation', 'Validation')
+
+    total = PredSeverity.objects.filter(run_id=OuterRef('run_id')).order_by().values('run_id')
+    validated = Validation.objects.filter(
+        pred_severity_id__run_id=OuterRef('run_id'), user_id=OuterRef('user_id'), validated_at__isnull=False,
+    ).order_by().values('user_id')
+    RunAssignment.objects.update(
+        total_predictions=Coalesce(Subquery(total.annotate(n=Count('*')).values('n')), 0),
+        validated_predictions=Coalesce(Subquery(validated.annotate(n=Count('*')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validation', '0022_predvertebra_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='runassignment',
+            name='total_predictions',
+            field=models.PositiveIntegerField(default=0, help_text='Severity predictions in the run'),
+        ),
+        migrations.AddField(
+            model_name='runassignment',
+            name='validated_predictions',
+            field=models.PositiveIntegerField(default=0, help_text='Severity predictions with a submitted validation by this user'),
+        ),
+        migrations.RunPython(count_progress, migrations.RunPython.noop),
+    ]
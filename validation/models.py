@@ -1,7 +1,9 @@
 from django.db import models
 
 # Import all models from the models directory
-from .models.polygon import Polygon
+from .models.box import Box
+from .models.contour import Contour
+from .models.mask import Mask
 from .models.pred_severity import PredSeverity
 from .models.pred_vertebra import PredVertebra
 from .models.model_version import ModelVersion
@@ -1,9 +1,13 @@
 # Import all models here to make them available to Django's migration system
-from .polygon import Polygon
+from .box import Box
+from .contour import Contour
+from .mask import Mask
 from .pred_severity import PredSeverity
 from .pred_vertebra import PredVertebra
 from .model_version import ModelVersion
 from .run import Run
 from .exam import Exam
 from .validation import Validation
-from .run_assignment import RunAssignment
\ No newline at end of file
+from .run_assignment import RunAssignment
+from .dataset_version_registry import DatasetVersionRegistry
+from .ingest_job import IngestJob
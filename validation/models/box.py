@@ -0,0 +1,37 @@
+from collections.abc import Mapping
+from typing import NamedTuple
+
+# Columns holding a box on PredVertebra, PredSeverity and Validation
+BOX_FIELDS = ('x1', 'y1', 'x2', 'y2')
+
+
+class Box(NamedTuple):
+    """Axis-aligned box (normalized or pixel coordinates), read like the former Polygon rows."""
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+
+
+def box_property(doc=None):
+    """
+    Expose a model's ``x1``/``y1``/``x2``/``y2`` columns as one Box.
+
+    Reads give None when the columns are empty. A Box, a mapping with the four
+    keys or None can be assigned, also as a keyword argument to the model.
+    """
+    def get_box(instance):
+        values = [getattr(instance, field) for field in BOX_FIELDS]
+        return None if values[0] is None else Box(*values)
+
+    def set_box(instance, box):
+        if box is None:
+            values = (None,) * len(BOX_FIELDS)
+        elif isinstance(box, Mapping):
+            values = [box[field] for field in BOX_FIELDS]
+        else:
+            values = [getattr(box, field) for field in BOX_FIELDS]
+        for field, value in zip(BOX_FIELDS, values):
+            setattr(instance, field, value)
+
+    return property(get_box, set_box, doc=doc)
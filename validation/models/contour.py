@@ -0,0 +1,42 @@
+import numpy as np
+from django.utils.functional import cached_property
+
+from validation.models.box import Box
+
+# Points are stored as little-endian float32 (x, y) pairs, 8 bytes per point
+CONTOUR_DTYPE = np.dtype('<f4')
+
+
+class Contour:
+    """Closed outline of (x, y) points, held as an (N, 2) float32 array."""
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=CONTOUR_DTYPE)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ValueError('A contour is a list of [x, y] points.')
+        self.points = points
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(np.frombuffer(data, dtype=CONTOUR_DTYPE).reshape(-1, 2))
+
+    def to_bytes(self):
+        return self.points.tobytes()
+
+    @cached_property
+    def bounding_box(self):
+        """Smallest Box containing every point, computed once."""
+        (x1, y1), (x2, y2) = self.points.min(axis=0), self.points.max(axis=0)
+        return Box(float(x1), float(y1), float(x2), float(y2))
+
+    def tolist(self):
+        return self.points.tolist()
+
+    def __len__(self):
+        return len(self.points)
+
+    def __eq__(self, other):
+        return isinstance(other, Contour) and np.array_equal(self.points, other.points)
+
+    def __repr__(self):
+        return f'<Contour: {len(self)} points>'
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class DatasetVersionRegistry(models.Model):
+    """
+    Cached list of versions (branches and tags) of a Hugging Face dataset repository.
+
+    Shared by all workers so that forms and API validation do not query the
+    hub on every request. See ``validation.hub.versions``.
+    """
+    id = models.AutoField(primary_key=True)
+    repo_id = models.CharField(max_length=200, unique=True, help_text="Hugging Face dataset repository")
+    versions = models.JSONField(default=list, help_text="Available versions, 'main' first")
+    fetched_at = models.DateTimeField(null=True, blank=True, help_text="Last successful fetch from the hub")
+    checked_at = models.DateTimeField(null=True, blank=True, help_text="Last fetch attempt, successful or not")
+    refresh_started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while a worker is refreshing the list, so only one of them queries the hub"
+    )
+    last_error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f"{self.repo_id} ({len(self.versions)} versions)"
+
+    class Meta:
+        verbose_name = "Dataset version registry"
+        verbose_name_plural = "Dataset version registries"
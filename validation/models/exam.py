@@ -1,6 +1,4 @@
 from django.db import models
-from huggingface_hub import HfApi, HfFolder
-from django.conf import settings
 import logging
 import random
 from django.db import transaction
@@ -16,42 +14,20 @@ class Exam(models.Model):
         default="main",
         help_text="Dataset version/tag from Hugging Face repository"
     )
+    # Recorded the first time the image is fetched (or by backfill_exam_image_metadata)
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_format = models.CharField(max_length=16, blank=True, default='')
+    image_size = models.PositiveBigIntegerField(null=True, blank=True, help_text="Image file size in bytes")
+    image_sha256 = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     @classmethod
     def get_available_versions(cls):
-        """Get available versions/tags from Hugging Face repository"""
-        try:
-            hf_api = HfApi()
-            token = settings.HF_TOKEN
-            HfFolder.save_token(token)
-            # You'll need to set your actual dataset repository ID in settings
-            repo_id = getattr(settings, 'HF_REPO_ID', 'sieben-ips/l3net')
-            
-            # Get repository references
-            refs = hf_api.list_repo_refs(repo_id, repo_type="dataset", token=token)
-
-            # Start with 'main' as default
-            versions = ['main']
-            
-            # Add tags if available
-            if hasattr(refs, 'tags') and refs.tags:
-                versions.extend([tag.name for tag in refs.tags])
-            
-            # Remove duplicates while preserving order
-            seen = set()
-            unique_versions = []
-            for version in versions:
-                if version not in seen:
-                    seen.add(version)
-                    unique_versions.append(version)
-            
-            return unique_versions
-            
-        except Exception as e:
-            logger.error(f"Error fetching HF versions: {e}")
-            return ['main']  # Fallback to main only
+        """Get available versions/tags of the Hugging Face dataset repository (cached, see validation.hub)"""
+        from ..hub import get_available_versions
+        return get_available_versions()
     
     @classmethod
     def shuffle_all(cls, seed=None):
@@ -178,6 +154,21 @@ class Exam(models.Model):
             logger.info(f"Successfully shuffled image paths for {len(image_paths)} exams")
             return len(image_paths)
     
+    def delete(self, *args, **kwargs):
+        """Override delete to recount the assignments of runs that lose this exam's predictions"""
+        from validation.models.pred_severity import PredSeverity
+        from validation.models.run_assignment import RunAssignment
+        # The cascade bypasses Validation.delete, so the affected runs are collected beforehand
+        run_ids = set(PredSeverity.objects.filter(exam_id=self).values_list('run_id', flat=True).distinct())
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            RunAssignment.objects.filter(run_id__in=run_ids).refresh_progress()
+        return result
+
+    @property
+    def has_image_metadata(self):
+        return self.image_width is not None and self.image_height is not None
+
     def __str__(self):
         return f"Exam {self.external_id} (v{self.version})"
     
@@ -0,0 +1,133 @@
+import base64
+
+from django.core import exceptions
+from django.db import models
+from django.utils.functional import cached_property
+
+from validation.models.contour import Contour
+from validation.models.mask import Mask
+
+
+class ChoiceCodeField(models.PositiveSmallIntegerField):
+    """
+    Store a TextChoices value as a small integer code.
+
+    ``codes`` maps each text value to its code. Python code, querysets and
+    serializers keep working with the text values: they are converted to the
+    code when written or used in a lookup, and back when read. Lookups also
+    accept the integer codes, which analytics can group on directly.
+    """
+    description = 'Text choice stored as a small integer code'
+
+    def __init__(self, *args, codes=None, **kwargs):
+        self.codes = {getattr(value, 'value', value): code for value, code in (codes or {}).items()}
+        self.values_by_code = {code: value for value, code in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['codes'] = self.codes
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # The integer range validators do not apply to the text values
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.values_by_code[value]
+
+    def to_python(self, value):
+        if value is None or value in self.codes:
+            return getattr(value, 'value', value)
+        if value in self.values_by_code:
+            return self.values_by_code[value]
+        raise exceptions.ValidationError(
+            self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+        )
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        value = getattr(value, 'value', value)
+        try:
+            return self.codes[value]
+        except KeyError:
+            raise ValueError(f"Field '{self.name}' expected one of {', '.join(self.codes)} but got {value!r}.")
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+
+class ContourField(models.BinaryField):
+    """
+    Store a Contour as one packed float32 array (see ``validation.models.contour``).
+
+    Lists of [x, y] pairs and raw bytes are accepted on assignment; reads give a
+    Contour decoded with NumPy without copying the column.
+    """
+    description = 'Contour stored as packed float32 (x, y) pairs'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Contour.from_bytes(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Contour):
+            return value
+        if isinstance(value, str):
+            # Serialized form (see value_to_string)
+            value = base64.b64decode(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return Contour.from_bytes(value)
+        try:
+            return Contour(value)
+        except (TypeError, ValueError) as e:
+            raise exceptions.ValidationError(str(e), code='invalid')
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        return None if value is None else value.to_bytes()
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return None if value is None else base64.b64encode(value.to_bytes()).decode('ascii')
+
+
+class MaskField(models.BinaryField):
+    """
+    Store a Mask as its packed run lengths (see ``validation.models.mask``).
+
+    ``{"size": [h, w], "counts": [...]}`` mappings and raw bytes are accepted
+    on assignment; reads give a Mask without decoding the pixels.
+    """
+    description = 'Binary mask stored as packed run lengths'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Mask.from_bytes(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Mask):
+            return value
+        if isinstance(value, str):
+            # Serialized form (see value_to_string)
+            value = base64.b64decode(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return Mask.from_bytes(value)
+        try:
+            return Mask(value['size'], value['counts'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise exceptions.ValidationError(str(e), code='invalid')
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        return None if value is None else value.to_bytes()
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return None if value is None else base64.b64encode(value.to_bytes()).decode('ascii')
@@ -0,0 +1,59 @@
+from django.db import models
+
+from validation.enums.job_status import JobStatus
+
+
+class IngestJob(models.Model):
+    """
+    Bulk load queued by the API and executed by ``manage.py run_ingest_worker``.
+
+    The request payload is stored as-is and cleared once the job succeeds.
+    Progress is written as the worker goes, so clients can poll
+    ``GET /api/jobs/{id}/``. See ``validation.ingest.jobs``.
+    """
+    RUN_WITH_PREDICTIONS = 'run_with_predictions'
+    ADD_PREDICTIONS = 'add_predictions'
+    KIND_CHOICES = [
+        (RUN_WITH_PREDICTIONS, 'Create run with predictions'),
+        (ADD_PREDICTIONS, 'Add predictions to run'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    status = models.CharField(choices=JobStatus.choices, max_length=20, default=JobStatus.QUEUED, db_index=True)
+    payload = models.JSONField(null=True, blank=True, help_text="Request body, cleared once the job succeeds")
+    params = models.JSONField(default=dict, blank=True, help_text="Options such as run_id and on_conflict")
+    run = models.ForeignKey(
+        'validation.Run',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ingest_jobs',
+        help_text="Run created or extended by this job"
+    )
+    created_by = models.ForeignKey(
+        'users.CustomUser',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ingest_jobs'
+    )
+    processed = models.PositiveIntegerField(default=0, help_text="Predictions written so far")
+    total = models.PositiveIntegerField(default=0, help_text="Predictions in the payload")
+    result = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=dict, blank=True)
+    worker = models.CharField(max_length=200, blank=True, default='', help_text="Worker that claimed the job")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress update from the worker")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
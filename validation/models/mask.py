@@ -0,0 +1,76 @@
+import numpy as np
+from django.utils.functional import cached_property
+
+from validation.models.box import Box
+
+# Stored as little-endian uint32: height, width, then the run lengths
+MASK_DTYPE = np.dtype('<u4')
+
+
+class Mask:
+    """
+    Binary segmentation mask held as run lengths.
+
+    Runs follow the COCO uncompressed RLE layout: pixels are read column by
+    column (Fortran order) and ``counts`` alternates background and
+    foreground runs, starting with background (so it starts with 0 when the
+    first pixel is set).
+    """
+
+    def __init__(self, size, counts):
+        height, width = (int(side) for side in size)
+        counts = np.asarray(counts, dtype=MASK_DTYPE)
+        if counts.ndim != 1 or int(counts.sum(dtype=np.uint64)) != height * width:
+            raise ValueError(f'Mask run lengths must add up to {height}x{width} pixels.')
+        self.size = (height, width)
+        self.counts = counts
+
+    @classmethod
+    def encode(cls, array):
+        """Return the mask of a 2D array, whose non-zero pixels are foreground."""
+        array = np.asarray(array, dtype=bool)
+        if array.ndim != 2:
+            raise ValueError('A mask is a 2D array.')
+        flat = array.ravel(order='F')
+        changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        counts = np.diff(np.concatenate(([0], changes, [flat.size])))
+        if flat.size and flat[0]:
+            counts = np.concatenate(([0], counts))
+        return cls(array.shape, counts)
+
+    def decode(self):
+        """Return the mask as a 2D boolean array."""
+        values = np.arange(len(self.counts)) % 2 == 1
+        return np.repeat(values, self.counts).reshape(self.size, order='F')
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = np.frombuffer(data, dtype=MASK_DTYPE)
+        return cls(values[:2], values[2:])
+
+    def to_bytes(self):
+        return np.concatenate((np.array(self.size, dtype=MASK_DTYPE), self.counts)).tobytes()
+
+    @property
+    def area(self):
+        """Number of foreground pixels."""
+        return int(self.counts[1::2].sum(dtype=np.uint64))
+
+    @cached_property
+    def bounding_box(self):
+        """Smallest Box around the foreground in normalized coordinates, or None if it is empty."""
+        array = self.decode()
+        rows, cols = np.flatnonzero(array.any(axis=1)), np.flatnonzero(array.any(axis=0))
+        if not len(rows):
+            return None
+        height, width = self.size
+        return Box(cols[0] / width, rows[0] / height, (cols[-1] + 1) / width, (rows[-1] + 1) / height)
+
+    def as_dict(self):
+        return {'size': list(self.size), 'counts': self.counts.tolist()}
+
+    def __eq__(self, other):
+        return isinstance(other, Mask) and self.size == other.size and np.array_equal(self.counts, other.counts)
+
+    def __repr__(self):
+        return f'<Mask: {self.size[0]}x{self.size[1]}, {self.area} pixels>'
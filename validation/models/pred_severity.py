@@ -1,19 +1,21 @@
 from django.db import models
 
-from validation.enums.severity import Severity
-from validation.enums.vertebra_level import VertebraLevel
+from validation.enums.severity import SEVERITY_CODES, Severity
+from validation.enums.vertebra_level import VERTEBRA_LEVEL_CODES, VertebraLevel
+from validation.models.box import box_property
+from validation.models.fields import ChoiceCodeField
 
 class PredSeverity(models.Model):
     """
     Model to store predicted severity data.
     """
     id = models.AutoField(primary_key=True)
-    severity_name = models.CharField(choices=Severity.choices, max_length=20, default=Severity.UNKNOWN)
+    severity_name = ChoiceCodeField(choices=Severity.choices, codes=SEVERITY_CODES, default=Severity.UNKNOWN)
     predicted_at = models.DateTimeField(auto_now_add=True)
     confidence = models.FloatField(default=0.0)
-    vertebrae_level = models.CharField(
+    vertebrae_level = ChoiceCodeField(
         choices=VertebraLevel.choices,
-        max_length=20,
+        codes=VERTEBRA_LEVEL_CODES,
         null=False,
         blank=False,
     )
@@ -34,11 +36,12 @@ class PredSeverity(models.Model):
         on_delete=models.CASCADE,
         related_name='predicted_severities'
     )
-    bounding_box = models.ForeignKey(
-        'validation.Polygon',
-        on_delete=models.CASCADE,
-        related_name='predicted_severities'
-    )
+    # Bounding box, stored inline so reads and writes need no extra row
+    x1 = models.FloatField()
+    y1 = models.FloatField()
+    x2 = models.FloatField()
+    y2 = models.FloatField()
+    bounding_box = box_property('The bounding box as a Box.')
 
     class Meta:
         # Ensure one prediction per severity level per exam per run
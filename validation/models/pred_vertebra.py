@@ -1,15 +1,17 @@
 from django.db import models
 
-from validation.enums.vertebra_name import VertebraName
+from validation.enums.vertebra_name import VERTEBRA_NAME_CODES, VertebraName
+from validation.models.box import box_property
+from validation.models.fields import ChoiceCodeField, ContourField, MaskField
 
 class PredVertebra(models.Model):
     """
     Model to store predicted vertebra data.
     """
     id = models.AutoField(primary_key=True)
-    name = models.CharField(
-        max_length=20,
+    name = ChoiceCodeField(
         choices=VertebraName.choices,
+        codes=VERTEBRA_NAME_CODES,
         default=VertebraName.UNKNOWN
     )
     predicted_at = models.DateTimeField(auto_now_add=True)
@@ -31,11 +33,16 @@ class PredVertebra(models.Model):
         on_delete=models.CASCADE,
         related_name='predicted_vertebrae'
     )
-    polygon = models.ForeignKey(
-        'validation.Polygon',
-        on_delete=models.CASCADE,
-        related_name='predicted_vertebrae'
-    )
+    # Vertebra box, stored inline so reads and writes need no extra row
+    x1 = models.FloatField()
+    y1 = models.FloatField()
+    x2 = models.FloatField()
+    y2 = models.FloatField()
+    polygon = box_property('The vertebra box as a Box.')
+    # Optional full outline from segmentation models; the box above holds its bounds
+    contour = ContourField(null=True, blank=True)
+    # Optional segmentation mask, run-length encoded at the model's output resolution
+    mask = MaskField(null=True, blank=True)
 
     class Meta:
         # Ensure one prediction per vertebra per exam per run
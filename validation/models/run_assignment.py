@@ -1,6 +1,60 @@
 from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
 from django.utils import timezone
 
+from validation.models.pred_severity import PredSeverity
+from validation.models.validation import Validation
+
+
+def _count(queryset, outer_field):
+    """Correlated COUNT(*) of ``queryset`` rows matching the assignment's ``outer_field``."""
+    counted = queryset.order_by().values(outer_field).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted), 0)
+
+
+def _completion(validated, total):
+    """UPDATE values for is_completed/completed_at given counter expressions."""
+    complete = Q(GreaterThan(total, 0), GreaterThanOrEqual(validated, total))
+    return {
+        'is_completed': Case(When(complete, then=Value(True)), default=Value(False)),
+        'completed_at': Case(When(complete, then=Coalesce(F('completed_at'), Value(timezone.now()))), default=None),
+    }
+
+
+class RunAssignmentQuerySet(models.QuerySet):
+    """
+    Maintenance of the materialized progress counters.
+
+    Each method is a single UPDATE that also sets ``is_completed`` and
+    ``completed_at`` from the new counts.
+    """
+
+    def add_progress(self, validated=0, total=0):
+        """Shift the counters by the given deltas, e.g. after validations are submitted."""
+        if not validated and not total:
+            return 0
+        validated = F('validated_predictions') + validated
+        total = F('total_predictions') + total
+        return self.update(validated_predictions=validated, total_predictions=total, **_completion(validated, total))
+
+    def refresh_progress(self):
+        """Recount both counters from the predictions and validations; returns the rows updated."""
+        total = _count(PredSeverity.objects.filter(run_id=OuterRef('run_id')), 'run_id')
+        validated = _count(
+            Validation.objects.filter(
+                pred_severity_id__run_id=OuterRef('run_id'),
+                user_id=OuterRef('user_id'),
+                validated_at__isnull=False,
+            ),
+            'user_id',
+        )
+        updated = self.update(total_predictions=total, validated_predictions=validated)
+        # The flags are derived in a second pass so the subqueries run once per row
+        self.update(**_completion(F('validated_predictions'), F('total_predictions')))
+        return updated
+
 
 class RunAssignment(models.Model):
     """
@@ -43,6 +97,17 @@ class RunAssignment(models.Model):
         help_text="Timestamp when validation was completed"
     )
     
+    # Materialized progress, kept current by the prediction and validation write
+    # paths (see RunAssignmentQuerySet); rebuild with `manage.py update_assignment_completion`
+    total_predictions = models.PositiveIntegerField(
+        default=0,
+        help_text="Severity predictions in the run"
+    )
+    validated_predictions = models.PositiveIntegerField(
+        default=0,
+        help_text="Severity predictions with a submitted validation by this user"
+    )
+    
     # Optional fields
     notes = models.TextField(
         blank=True,
@@ -50,6 +115,8 @@ class RunAssignment(models.Model):
         help_text="Optional notes about this assignment"
     )
     
+    objects = RunAssignmentQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['run', 'user']  # One assignment per run per user
         indexes = [
@@ -63,27 +130,33 @@ class RunAssignment(models.Model):
         return f"Run {self.run.id} → {self.user.email} ({status})"
     
     def save(self, *args, **kwargs):
-        """Override save to automatically set completed_at when is_completed changes to True"""
+        """Override save to count progress for new assignments and set completed_at when is_completed changes to True"""
+        if self._state.adding:
+            self._count_progress()
+            self.is_completed = self.validated_predictions >= self.total_predictions > 0
         if self.is_completed and not self.completed_at:
             self.completed_at = timezone.now()
         elif not self.is_completed:
             self.completed_at = None
         super().save(*args, **kwargs)
     
+    def _count_progress(self):
+        """Set the counters from the database; validations may predate the assignment."""
+        self.total_predictions = PredSeverity.objects.filter(run_id=self.run_id).count()
+        # One validation per prediction and user, so no DISTINCT is needed
+        self.validated_predictions = Validation.objects.filter(
+            pred_severity_id__run_id=self.run_id,
+            user_id=self.user_id,
+            validated_at__isnull=False  # Only count submitted validations
+        ).count()
+    
     def get_validation_progress(self):
         """
-        Calculate validation progress for this assignment.
-        Returns a dictionary with progress information.
-        Only counts validations that have been submitted (have validated_at timestamp).
+        Return the validation progress of this assignment from its counters.
+        Only submitted validations (those with a validated_at timestamp) count.
         """
-        # Get all severity predictions for this run
-        total_predictions = self.run.predicted_severities.count()
-        
-        # Count how many have been validated AND submitted by this user
-        validated_predictions = self.run.predicted_severities.filter(
-            validations__user_id=self.user,
-            validations__validated_at__isnull=False  # Only count submitted validations
-        ).distinct().count()
+        total_predictions = self.total_predictions
+        validated_predictions = self.validated_predictions
         
         if total_predictions == 0:
             percentage = 0
@@ -104,8 +177,8 @@ class RunAssignment(models.Model):
     
     def update_completion_status(self):
         """
-        Update the is_completed status based on validation progress.
-        Call this method after a validation is added or removed.
+        Update the is_completed status based on the progress counters.
+        The write paths already keep it current; this saves only if it drifted.
         """
         progress = self.get_validation_progress()
         old_status = self.is_completed
@@ -1,6 +1,8 @@
 from django.db import models
 
-from validation.enums.severity import Severity
+from validation.enums.severity import SEVERITY_CODES, Severity
+from validation.models.box import box_property
+from validation.models.fields import ChoiceCodeField
 
 class Validation(models.Model):
     id = models.AutoField(primary_key=True)
@@ -19,14 +21,13 @@ class Validation(models.Model):
 
     is_correct = models.BooleanField(default=False)
     comment = models.TextField(blank=True, null=True)
-    bounding_box = models.ForeignKey(
-        'validation.Polygon',
-        on_delete=models.SET_NULL,
-        related_name='validations',
-        null=True,
-        blank=True
-    )
-    severity_name = models.CharField(choices=Severity.choices, max_length=20, null=True, blank=True)
+    # Corrected bounding box, if the user drew one
+    x1 = models.FloatField(null=True, blank=True)
+    y1 = models.FloatField(null=True, blank=True)
+    x2 = models.FloatField(null=True, blank=True)
+    y2 = models.FloatField(null=True, blank=True)
+    bounding_box = box_property('The corrected bounding box as a Box, or None.')
+    severity_name = ChoiceCodeField(choices=Severity.choices, codes=SEVERITY_CODES, null=True, blank=True)
     
     class Meta:
         unique_together = ['pred_severity_id', 'user_id']  # One validation per prediction per user
@@ -34,33 +35,36 @@ class Validation(models.Model):
     def __str__(self):
         return f"Validation by {self.user_id.email} for {self.pred_severity_id}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Whether the stored row is submitted, to count transitions on save/delete (None if deferred)
+        instance._submitted_in_db = instance.validated_at is not None if 'validated_at' in field_names else None
+        return instance
+    
     def save(self, *args, **kwargs):
-        """Override save to update assignment completion status"""
+        """Override save to keep the progress counters of the related run assignments current"""
+        submitted_before = False if self._state.adding else getattr(self, '_submitted_in_db', None)
         super().save(*args, **kwargs)
-        self._update_assignment_status()
+        submitted = self.validated_at is not None
+        self._update_assignment_progress(submitted_before, submitted)
+        self._submitted_in_db = submitted
     
     def delete(self, *args, **kwargs):
-        """Override delete to update assignment completion status"""
-        super().delete(*args, **kwargs)
-        self._update_assignment_status()
+        """Override delete to keep the progress counters of the related run assignments current"""
+        submitted_before = getattr(self, '_submitted_in_db', None)
+        result = super().delete(*args, **kwargs)
+        self._update_assignment_progress(submitted_before, False)
+        return result
     
-    def _update_assignment_status(self):
-        """Update the completion status of related run assignments"""
-        try:
-            # Get the run from the prediction
-            run = self.pred_severity_id.run_id
-            
-            # Find any assignments for this run and user
-            from validation.models.run_assignment import RunAssignment
-            assignments = RunAssignment.objects.filter(
-                run=run,
-                user=self.user_id
-            )
-            
-            # Update completion status for each assignment
-            for assignment in assignments:
-                assignment.update_completion_status()
-                
-        except Exception:
-            # Don't fail the save/delete if assignment update fails
-            pass
\ No newline at end of file
+    def _update_assignment_progress(self, submitted_before, submitted):
+        """Shift the validated counter of the assignment for this run and user by the change in submission."""
+        from validation.models.run_assignment import RunAssignment
+        assignments = RunAssignment.objects.filter(
+            user_id=self.user_id_id, run__predicted_severities=self.pred_severity_id_id
+        )
+        if submitted_before is None:
+            # Not loaded from the database with validated_at: recount instead of guessing
+            assignments.refresh_progress()
+        else:
+            assignments.add_progress(validated=int(submitted) - int(submitted_before))
@@ -0,0 +1,31 @@
+"""Extra request body parsers for the API."""
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parse MessagePack bodies into the same structures as JSON.
+
+    Used for columnar prediction uploads, where numeric arrays are much
+    smaller and faster to decode than their JSON text.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if msgpack is None:
+            raise UnsupportedMediaType(media_type, detail='MessagePack support requires the msgpack package.')
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except ValueError as e:  # msgpack's unpack errors all derive from ValueError
+            raise ParseError(f'MessagePack parse error - {e}')
+
+
+class LegacyMessagePackParser(MessagePackParser):
+    """Accept the unregistered ``application/x-msgpack`` type many clients still send."""
+    media_type = 'application/x-msgpack'
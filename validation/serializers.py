@@ -1,18 +1,27 @@
+import numpy as np
 from rest_framework import serializers
 from .models import (
-    Exam, Run, ModelVersion, Polygon, 
-    PredVertebra, PredSeverity, Validation, RunAssignment
+    Box, Contour, Exam, Mask, Run, ModelVersion,
+    PredVertebra, PredSeverity, Validation, RunAssignment, IngestJob
 )
 from .enums.vertebra_name import VertebraName
 from .enums.severity import Severity
+from .hub import get_available_versions, is_available_version
+from .ingest.exams import EXTERNAL_ID_MAX_LENGTH, IMAGE_PATH_MAX_LENGTH, MAX_BULK_EXAMS
+from .ingest.predictions import (
+    MAX_CONTOUR_POINTS, MAX_MASK_SIDE, add_exams_to_run, create_predictions, validate_prediction_references,
+)
 
 
-class PolygonSerializer(serializers.ModelSerializer):
-    """Serializer for polygon/bounding box data."""
+class PolygonSerializer(serializers.Serializer):
+    """Serializer for polygon/bounding box data, stored inline on its row as a Box."""
+    x1 = serializers.FloatField()
+    y1 = serializers.FloatField()
+    x2 = serializers.FloatField()
+    y2 = serializers.FloatField()
     
-    class Meta:
-        model = Polygon
-        fields = ['x1', 'y1', 'x2', 'y2']
+    def to_internal_value(self, data):
+        return Box(**super().to_internal_value(data))
 
 
 class ModelVersionSerializer(serializers.ModelSerializer):
@@ -31,8 +40,14 @@ class ExamSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Exam
-        fields = ['id', 'external_id', 'image_path', 'version', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = [
+            'id', 'external_id', 'image_path', 'version',
+            'image_width', 'image_height', 'image_format', 'image_size', 'image_sha256',
+            'created_at',
+        ]
+        read_only_fields = [
+            'id', 'image_width', 'image_height', 'image_format', 'image_size', 'image_sha256', 'created_at',
+        ]
 
 
 class ExamCreateSerializer(serializers.ModelSerializer):
@@ -48,24 +63,13 @@ class ExamCreateSerializer(serializers.ModelSerializer):
         if not value:
             return 'main'
         
-        try:
-            # Get available versions from Hugging Face
-            available_versions = Exam.get_available_versions()
-            if value not in available_versions:
-                raise serializers.ValidationError(
-                    f"Version '{value}' does not exist in the Hugging Face repository. "
-                    f"Available versions: {', '.join(available_versions)}"
-                )
-            return value
-        except Exception as e:
-            # If we can't validate against HF, allow 'main' but reject others
-            if value == 'main':
-                return value
-            else:
-                raise serializers.ValidationError(
-                    f"Unable to validate version against Hugging Face repository. "
-                    f"Error: {str(e)}. Please use 'main' as default."
-                )
+        # Answered from the cached version registry; 'main' is always available
+        if not is_available_version(value):
+            raise serializers.ValidationError(
+                f"Version '{value}' does not exist in the Hugging Face repository. "
+                f"Available versions: {', '.join(get_available_versions())}"
+            )
+        return value
     
     def create(self, validated_data):
         # Ensure the external_id is unique
@@ -79,9 +83,121 @@ class ExamCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ExamBulkItemSerializer(serializers.Serializer):
+    """One exam of a bulk request; uniqueness is checked for the whole batch at once."""
+    external_id = serializers.CharField(max_length=EXTERNAL_ID_MAX_LENGTH)
+    image_path = serializers.CharField(max_length=IMAGE_PATH_MAX_LENGTH)
+    version = serializers.CharField(required=False, allow_blank=True)
+
+
+class ExamBulkCreateSerializer(serializers.Serializer):
+    """Serializer for creating many exams in one request (see ingest.exams.create_exams)."""
+    version = serializers.CharField(required=False, default='main')
+    exams = ExamBulkItemSerializer(many=True, allow_empty=False, max_length=MAX_BULK_EXAMS)
+    
+    def validate(self, attrs):
+        rows = attrs['exams']
+        for row in rows:
+            # Exams without their own version take the request's
+            row['version'] = row.get('version') or attrs['version']
+        
+        errors = {}
+        seen, duplicates = set(), set()
+        for row in rows:
+            if row['external_id'] in seen:
+                duplicates.add(row['external_id'])
+            seen.add(row['external_id'])
+        if duplicates:
+            errors['exams'] = [f"Duplicate external_ids: {', '.join(sorted(duplicates)[:20])}"]
+        
+        # Each distinct version is checked once against the cached registry
+        unknown = sorted(version for version in {row['version'] for row in rows} if not is_available_version(version))
+        if unknown:
+            errors['version'] = [
+                f"Versions not in the Hugging Face repository: {', '.join(unknown)}. "
+                f"Available versions: {', '.join(get_available_versions())}"
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class ExamResolveSerializer(serializers.Serializer):
+    """Serializer for looking up many exams by external_id."""
+    external_ids = serializers.ListField(
+        child=serializers.CharField(max_length=EXTERNAL_ID_MAX_LENGTH), allow_empty=False, max_length=MAX_BULK_EXAMS
+    )
+
+
+class ContourPointsField(serializers.Field):
+    """A contour as a list of [x, y] points, stored packed (see ContourField)."""
+    default_error_messages = {
+        'invalid': 'Expected a list of [x, y] number pairs.',
+        'min_points': 'Ensure the contour has at least {min_points} points.',
+        'max_points': 'Ensure the contour has no more than {max_points} points.',
+    }
+    
+    def __init__(self, min_points=3, max_points=MAX_CONTOUR_POINTS, **kwargs):
+        self.min_points = min_points
+        self.max_points = max_points
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            self.fail('invalid')
+        try:
+            contour = Contour(data)
+        except (TypeError, ValueError):
+            self.fail('invalid')
+        if not np.isfinite(contour.points).all():
+            self.fail('invalid')
+        if len(contour) < self.min_points:
+            self.fail('min_points', min_points=self.min_points)
+        if len(contour) > self.max_points:
+            self.fail('max_points', max_points=self.max_points)
+        return contour
+    
+    def to_representation(self, value):
+        return value.tolist()
+
+
+class RunLengthMaskField(serializers.Field):
+    """A mask as COCO uncompressed RLE: ``{"size": [h, w], "counts": [...]}`` (see Mask)."""
+    default_error_messages = {
+        'invalid': 'Expected an object with "size": [height, width] and "counts": a list of run lengths.',
+        'max_side': 'Ensure the mask is at most {max_side} pixels on each side.',
+        'counts': 'Run lengths must add up to height x width pixels.',
+    }
+    
+    def __init__(self, max_side=MAX_MASK_SIDE, **kwargs):
+        self.max_side = max_side
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        if not isinstance(data, dict) or not isinstance(data.get('counts'), list):
+            self.fail('invalid')
+        size = data.get('size')
+        if not isinstance(size, list) or len(size) != 2 or not all(type(side) is int and side > 0 for side in size):
+            self.fail('invalid')
+        if max(size) > self.max_side:
+            self.fail('max_side', max_side=self.max_side)
+        counts = np.asarray(data['counts'])
+        # Checked as one array: integer dtype rules out floats, booleans and strings
+        if counts.ndim != 1 or counts.dtype.kind not in 'iu' or (counts < 0).any():
+            self.fail('invalid')
+        if counts.sum() != size[0] * size[1]:
+            self.fail('counts')
+        return Mask(size, counts)
+    
+    def to_representation(self, value):
+        return value.as_dict()
+
+
 class PredVertebraSerializer(serializers.ModelSerializer):
-    """Serializer for vertebra predictions."""
-    polygon = PolygonSerializer()
+    """Serializer for vertebra predictions; the box may be left out when a contour or mask is given."""
+    polygon = PolygonSerializer(required=False)
+    contour = ContourPointsField(required=False, allow_null=True)
+    mask = RunLengthMaskField(required=False, allow_null=True)
     model_version = ModelVersionSerializer(read_only=True)
     model_version_id = serializers.IntegerField(write_only=True)
     exam_id = serializers.IntegerField(write_only=True)
@@ -90,15 +206,22 @@ class PredVertebraSerializer(serializers.ModelSerializer):
         model = PredVertebra
         fields = [
             'id', 'name', 'confidence', 'predicted_at',
-            'polygon', 'model_version', 'model_version_id', 'exam_id'
+            'polygon', 'contour', 'mask', 'model_version', 'model_version_id', 'exam_id'
         ]
         read_only_fields = ['id', 'predicted_at']
     
-    def create(self, validated_data):
-        polygon_data = validated_data.pop('polygon')
-        polygon = Polygon.objects.create(**polygon_data)
-        validated_data['polygon'] = polygon
-        return super().create(validated_data)
+    def validate(self, attrs):
+        if attrs.get('polygon') is None:
+            # The box columns cache the outline's bounds, so box reads never decode it
+            if attrs.get('contour') is not None:
+                attrs['polygon'] = attrs['contour'].bounding_box
+            elif attrs.get('mask') is not None and attrs['mask'].area:
+                attrs['polygon'] = attrs['mask'].bounding_box
+            else:
+                raise serializers.ValidationError(
+                    {'polygon': ['This field is required unless a contour or non-empty mask is given.']}
+                )
+        return attrs
 
 
 class PredSeveritySerializer(serializers.ModelSerializer):
@@ -115,12 +238,6 @@ class PredSeveritySerializer(serializers.ModelSerializer):
             'bounding_box', 'model_version', 'model_version_id', 'exam_id'
         ]
         read_only_fields = ['id', 'predicted_at']
-    
-    def create(self, validated_data):
-        bounding_box_data = validated_data.pop('bounding_box')
-        bounding_box = Polygon.objects.create(**bounding_box_data)
-        validated_data['bounding_box'] = bounding_box
-        return super().create(validated_data)
 
 
 class RunSerializer(serializers.ModelSerializer):
@@ -181,6 +298,17 @@ class RunWithPredictionsSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'run_date']
     
+    def validate(self, attrs):
+        # One query per referenced table, however many predictions there are
+        errors = validate_prediction_references(
+            attrs.get('vertebra_predictions', []),
+            attrs.get('severity_predictions', []),
+            exam_ids=attrs.get('exam_ids', []),
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+    
     def create(self, validated_data):
         exam_ids = validated_data.pop('exam_ids')
         vertebra_predictions_data = validated_data.pop('vertebra_predictions', [])
@@ -190,40 +318,10 @@ class RunWithPredictionsSerializer(serializers.ModelSerializer):
         run = Run.objects.create(**validated_data)
         
         # Add exams to the run
-        exams = Exam.objects.filter(id__in=exam_ids)
-        run.exams.set(exams)
+        add_exams_to_run(run, exam_ids)
         
-        # Create vertebra predictions
-        for pred_data in vertebra_predictions_data:
-            polygon_data = pred_data.pop('polygon')
-            polygon = Polygon.objects.create(**polygon_data)
-            
-            # Get the exam_id and convert to Exam instance
-            exam_id = pred_data.pop('exam_id')
-            exam = Exam.objects.get(id=exam_id)
-            
-            PredVertebra.objects.create(
-                run_id=run,
-                exam_id=exam,
-                polygon=polygon,
-                **pred_data
-            )
-        
-        # Create severity predictions
-        for pred_data in severity_predictions_data:
-            bounding_box_data = pred_data.pop('bounding_box')
-            bounding_box = Polygon.objects.create(**bounding_box_data)
-            
-            # Get the exam_id and convert to Exam instance
-            exam_id = pred_data.pop('exam_id')
-            exam = Exam.objects.get(id=exam_id)
-            
-            PredSeverity.objects.create(
-                run_id=run,
-                exam_id=exam,
-                bounding_box=bounding_box,
-                **pred_data
-            )
+        # Create predictions with bulk inserts
+        create_predictions(run, vertebra_predictions_data, severity_predictions_data)
         
         return run
 
@@ -239,16 +337,6 @@ class ValidationSerializer(serializers.ModelSerializer):
             'bounding_box', 'validated_at'
         ]
         read_only_fields = ['id', 'validated_at']
-    
-    def create(self, validated_data):
-        bounding_box_data = validated_data.pop('bounding_box', None)
-        bounding_box = None
-        
-        if bounding_box_data:
-            bounding_box = Polygon.objects.create(**bounding_box_data)
-            validated_data['bounding_box'] = bounding_box
-        
-        return super().create(validated_data)
 
 
 class RunAssignmentSerializer(serializers.ModelSerializer):
@@ -260,6 +348,25 @@ class RunAssignmentSerializer(serializers.ModelSerializer):
         model = RunAssignment
         fields = [
             'id', 'run', 'run_id', 'assigned_at', 'is_completed',
-            'completed_at', 'notes'
+            'completed_at', 'total_predictions', 'validated_predictions', 'notes'
         ]
-        read_only_fields = ['id', 'assigned_at', 'completed_at']
+        read_only_fields = ['id', 'assigned_at', 'completed_at', 'total_predictions', 'validated_predictions']
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of asynchronous ingestion jobs."""
+    progress = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = IngestJob
+        fields = [
+            'id', 'kind', 'status', 'run', 'processed', 'total', 'progress',
+            'result', 'errors', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+    
+    def get_progress(self, obj):
+        """Fraction of predictions written, from 0.0 to 1.0."""
+        if obj.total:
+            return round(obj.processed / obj.total, 4)
+        return 1.0 if obj.is_finished else 0.0
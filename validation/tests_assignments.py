@@ -0,0 +1,179 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from users.models import CustomUser
+from validation.ingest.predictions import create_predictions
+from validation.models import Box, Exam, ModelVersion, PredSeverity, Run, RunAssignment, Validation
+
+
+class AssignmentProgressTestCase(TestCase):
+    LEVELS = ['L1/L2', 'L2/L3', 'L3/L4']
+
+    def setUp(self):
+        """Create a run with three severity predictions on one exam"""
+        self.user = CustomUser.objects.create_user('reader@example.com', 'pw')
+        self.run = Run.objects.create(name='Run')
+        self.exam = Exam.objects.create(external_id='EX-1', image_path='1.png')
+        self.run.exams.add(self.exam)
+        self.model_version = ModelVersion.objects.create(version_number='1.0', model_name='m', model_type='detection')
+        self.predictions = [self._prediction(self.exam, level) for level in self.LEVELS]
+
+    def _prediction(self, exam, level):
+        return PredSeverity.objects.create(
+            run_id=self.run, exam_id=exam, model_version=self.model_version, vertebrae_level=level,
+            severity_name='Moderate', bounding_box=Box(0.1, 0.2, 0.3, 0.4),
+        )
+
+    def _submit(self, exam):
+        self.client.force_login(self.user)
+        response = self.client.post('/validation/api/validation/submit-all/', json.dumps(
+            {'run_id': self.run.id, 'exam_id': exam.id}
+        ), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def _progress(self, assignment):
+        assignment.refresh_from_db()
+        return assignment.validated_predictions, assignment.total_predictions, assignment.is_completed
+
+    def test_new_assignment_counts_existing_progress(self):
+        """Test that an assignment starts from the predictions and submitted validations already stored"""
+        Validation.objects.create(pred_severity_id=self.predictions[0], user_id=self.user, validated_at=timezone.now())
+
+        assignment = RunAssignment.objects.create(run=self.run, user=self.user)
+
+        self.assertEqual(self._progress(assignment), (1, 3, False))
+        with self.assertNumQueries(0):
+            self.assertEqual(assignment.completion_percentage, 33.3)
+            self.assertEqual(assignment.get_validation_progress()['remaining_predictions'], 2)
+
+    def test_validation_writes_move_the_counters(self):
+        """Test that saves, bulk submissions and deletes keep the counters and completion current"""
+        assignment = RunAssignment.objects.create(run=self.run, user=self.user)
+        edited = Validation.objects.create(pred_severity_id=self.predictions[0], user_id=self.user, severity_name='Severe')
+        self.assertEqual(self._progress(assignment), (0, 3, False))
+
+        # One edited validation is submitted in bulk together with two created ones
+        self._submit(self.exam)
+        self.assertEqual(self._progress(assignment), (3, 3, True))
+        self.assertIsNotNone(assignment.completed_at)
+
+        # Submitting again only re-stamps the validations
+        self._submit(self.exam)
+        self.assertEqual(self._progress(assignment), (3, 3, True))
+
+        Validation.objects.get(id=edited.id).delete()
+        self.assertEqual(self._progress(assignment), (2, 3, False))
+        self.assertIsNone(assignment.completed_at)
+
+        # Saving a loaded validation without changing its submission leaves the counter alone
+        validation = Validation.objects.filter(user_id=self.user).first()
+        validation.comment = 'checked'
+        validation.save()
+        self.assertEqual(self._progress(assignment), (2, 3, False))
+
+    def test_ingested_predictions_reopen_the_assignment(self):
+        """Test that predictions added to a run raise the total of its assignments"""
+        assignment = RunAssignment.objects.create(run=self.run, user=self.user)
+        self._submit(self.exam)
+        self.assertEqual(self._progress(assignment), (3, 3, True))
+
+        other = Exam.objects.create(external_id='EX-2', image_path='2.png')
+        create_predictions(self.run, severity_rows=[
+            {'exam_id': other.id, 'model_version_id': self.model_version.id, 'vertebrae_level': 'L1/L2',
+             'severity_name': 'Moderate', 'confidence': 0.5, 'bounding_box': Box(0.1, 0.2, 0.3, 0.4)},
+        ])
+
+        self.assertEqual(self._progress(assignment), (3, 4, False))
+
+    def test_command_recounts_drifted_counters(self):
+        """Test that update_assignment_completion rebuilds counters changed behind the models' back"""
+        assignment = RunAssignment.objects.create(run=self.run, user=self.user)
+        # Deleting predictions in bulk bypasses the write paths
+        self._submit(self.exam)
+        PredSeverity.objects.filter(id=self.predictions[0].id).delete()
+        RunAssignment.objects.filter(id=assignment.id).update(is_completed=False)
+
+        out = StringIO()
+        call_command('update_assignment_completion', run=self.run.id, stdout=out)
+
+        self.assertEqual(self._progress(assignment), (2, 2, True))
+        self.assertIn('Recounted 1 assignments; 1 completed.', out.getvalue())
+
+    def test_deleting_an_exam_recounts_its_runs(self):
+        """Test that deleting an exam through the admin view drops its predictions and validations from the counters"""
+        other = Exam.objects.create(external_id='EX-2', image_path='2.png')
+        self.run.exams.add(other)
+        self._prediction(other, 'L1/L2')
+        assignment = RunAssignment.objects.create(run=self.run, user=self.user)
+        self._submit(self.exam)
+        self.assertEqual(self._progress(assignment), (3, 4, False))
+        self.client.force_login(CustomUser.objects.create_superuser('admin@example.com', 'pw'))
+
+        response = self.client.post(f'/validation/admin/exam/{self.exam.id}/delete/')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._progress(assignment), (0, 1, False))
+
+    def test_duplicated_run_assignments_count_the_copied_predictions(self):
+        """Test that assignments copied to an intra-operator round start with the copied severities"""
+        RunAssignment.objects.create(run=self.run, user=self.user)
+        self._submit(self.exam)
+        admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.client.force_login(admin)
+
+        response = self.client.post(f'/validation/admin/run/{self.run.id}/duplicate/', {'round_number': '2'})
+
+        self.assertEqual(response.status_code, 302)
+        duplicate = Run.objects.get(original_run=self.run)
+        self.assertEqual(duplicate.predicted_severities.count(), 3)
+        self.assertEqual(self._progress(RunAssignment.objects.get(run=duplicate, user=self.user)), (0, 3, False))
+
+
+class AssignmentListViewTestCase(TestCase):
+    def setUp(self):
+        """Assign runs with one exam each to a reader, one of them completed and one cancelled"""
+        self.user = CustomUser.objects.create_user('reader@example.com', 'pw')
+        self.client.force_login(self.user)
+        self.assignments = []
+        for i in range(25):
+            run = Run.objects.create(name=f'Run {i}', status='Cancelled' if i == 0 else 'In Progress')
+            run.exams.add(Exam.objects.create(external_id=f'EX-{i}', image_path=f'{i}.png'))
+            self.assignments.append(RunAssignment.objects.create(run=run, user=self.user))
+        RunAssignment.objects.filter(id=self.assignments[1].id).update(is_completed=True)
+        # The newest run has more exams than the list shows
+        self.assignments[-1].run.exams.add(*[
+            Exam.objects.create(external_id=f'EX-24-{i:02}', image_path=f'24-{i}.png') for i in range(12)
+        ])
+
+    def _get(self, **params):
+        response = self.client.get('/validation/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_page_query_count_does_not_grow_with_assignments(self):
+        """Test that summary stats come from one aggregate and rows need no per-assignment queries"""
+        with CaptureQueriesContext(connection) as first_page:
+            response = self._get()
+        with CaptureQueriesContext(connection) as last_page:
+            self._get(page=2)
+
+        self.assertEqual(len(first_page), len(last_page))
+        self.assertFalse([q for q in first_page.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(len(response.context['assignments']), 20)
+        self.assertEqual(
+            (response.context['total_assignments'], response.context['completed_assignments']), (24, 1)
+        )
+        self.assertContains(response, 'EX-24')
+        self.assertContains(response, '1 exam<')
+        self.assertNotIn(self.assignments[0], response.context['paginator'].object_list)
+        newest = response.context['assignments'][0]
+        self.assertEqual((newest.exam_count, len(newest.run.shown_exams)), (13, 10))
+        self.assertContains(response, '13 exams')
+        self.assertNotContains(response, 'EX-24-11')
+
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from huggingface_hub.utils import EntryNotFoundError
+
+from validation.hub import HubClient, HubUnavailable, get_available_versions, is_available_version
+from validation.hub.client import CircuitBreaker
+from validation.models import DatasetVersionRegistry
+
+
+@override_settings(HF_REPO_ID='org/dataset', HF_VERSIONS_TTL=300, HF_VERSIONS_RETRY_INTERVAL=60)
+class VersionRegistryTestCase(TestCase):
+    def setUp(self):
+        """Start with an empty registry and a fake hub"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch('validation.hub.versions.fetch_versions_from_hub', return_value=['main', 'v1.0'])
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _age_registry(self, seconds):
+        """Pretend the registry was last fetched and checked ``seconds`` ago"""
+        past = timezone.now() - timedelta(seconds=seconds)
+        DatasetVersionRegistry.objects.update(fetched_at=past, checked_at=past)
+        cache.clear()
+
+    def test_versions_are_fetched_once_and_shared(self):
+        """Test that only the first lookup queries the hub, even across worker caches"""
+        self.assertEqual(get_available_versions(), ['main', 'v1.0'])
+
+        cache.clear()  # another worker: nothing in its local cache
+        self.assertEqual(get_available_versions(), ['main', 'v1.0'])
+        self.assertTrue(is_available_version('v1.0'))
+
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(DatasetVersionRegistry.objects.get(repo_id='org/dataset').versions, ['main', 'v1.0'])
+
+    @mock.patch('validation.hub.versions._refresh_in_background')
+    def test_stale_versions_are_served_while_refreshing(self, refresh_in_background):
+        """Test that an expired list is returned immediately and refreshed in the background"""
+        get_available_versions()
+        self._age_registry(600)
+        self.fetch.return_value = ['main', 'v1.0', 'v2.0']
+
+        self.assertEqual(get_available_versions(), ['main', 'v1.0'])
+        refresh_in_background.assert_called_once_with()
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_unknown_version_is_rechecked_at_most_once_per_interval(self):
+        """Test that a newly pushed tag is found, but misses do not hammer the hub"""
+        get_available_versions()
+        self._age_registry(120)
+        self.fetch.return_value = ['main', 'v1.0', 'v2.0']
+
+        self.assertTrue(is_available_version('v2.0'))
+        self.assertFalse(is_available_version('v3.0'))
+        self.assertFalse(is_available_version('v3.0'))
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_hub_errors_keep_the_last_known_versions(self):
+        """Test that a failed refresh keeps serving the previous list"""
+        get_available_versions()
+        self._age_registry(120)
+        self.fetch.side_effect = ConnectionError('hub unavailable')
+
+        self.assertFalse(is_available_version('v2.0'))
+        self.assertEqual(get_available_versions(), ['main', 'v1.0'])
+        self.assertEqual(DatasetVersionRegistry.objects.get().last_error, 'hub unavailable')
+
+    def test_main_is_available_when_the_hub_was_never_reached(self):
+        """Test that 'main' is always accepted"""
+        self.fetch.side_effect = ConnectionError('hub unavailable')
+
+        self.assertEqual(get_available_versions(), ['main'])
+        self.assertTrue(is_available_version('main'))
+
+
+@mock.patch('validation.hub.client.time.sleep')
+class HubClientTestCase(TestCase):
+    def setUp(self):
+        self.client = HubClient(timeout=(1, 1), max_retries=2, failure_threshold=3, reset_timeout=60, pool_size=2)
+
+    def _flaky(self, failures, exc=ConnectionError('reset')):
+        """Return a callable that raises ``exc`` ``failures`` times before succeeding"""
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise exc
+            return 'ok'
+
+        return func, calls
+
+    def test_transient_errors_are_retried(self, sleep):
+        """Test that connection errors are retried with a bounded, jittered backoff"""
+        func, calls = self._flaky(2)
+
+        self.assertEqual(self.client.call('download', func), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(all(0 <= c.args[0] <= 1.0 for c in sleep.call_args_list))
+
+        stats = self.client.stats()
+        self.assertEqual(stats['operations']['download']['calls'], 3)
+        self.assertEqual(stats['operations']['download']['failures'], 2)
+        self.assertEqual(stats['circuit']['state'], CircuitBreaker.CLOSED)
+
+    def test_permanent_errors_are_not_retried(self, sleep):
+        """Test that a missing file is raised at once and does not count against the hub"""
+        func, calls = self._flaky(5, EntryNotFoundError('missing'))
+
+        with self.assertRaises(EntryNotFoundError):
+            self.client.call('download', func)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.client.stats()['circuit']['consecutive_failures'], 0)
+
+    def test_circuit_opens_and_fails_fast(self, sleep):
+        """Test that repeated failures open the circuit and later calls are rejected without a request"""
+        func, calls = self._flaky(100)
+        with self.assertRaises(ConnectionError):
+            self.client.call('list_repo_refs', func)
+        self.assertEqual(len(calls), 3)
+
+        with self.assertRaises(HubUnavailable):
+            self.client.call('list_repo_refs', func)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.client.stats()['operations']['list_repo_refs']['rejected'], 1)
+        self.assertEqual(self.client.stats()['circuit']['state'], CircuitBreaker.OPEN)
+
+    def test_half_open_trial_closes_the_circuit(self, sleep):
+        """Test that one successful trial call after the reset timeout closes the circuit"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # only one trial at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
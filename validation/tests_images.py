@@ -0,0 +1,645 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from huggingface_hub.utils import EntryNotFoundError
+
+import numpy as np
+from PIL import Image
+
+from validation.images.cache import ImageCache, make_cache_key
+from validation.images.derivatives import preview_bucket, render_preview
+from validation.images.prefetch import ImagePrefetcher
+from validation.images.masks import render_mask_overlay
+from validation.images.loader import fetch_image, get_exam_image, is_image_cached
+from validation.images.metadata import read_image_metadata
+from validation.images.responses import serve_image_file
+from validation.images.sources import ImageNotFound, get_image_source
+from validation.images.tiles import level_size, max_level, render_pyramid
+from validation.models import Box, Contour, Exam, Mask, ModelVersion, PredVertebra, Run
+from users.models import CustomUser
+
+
+class ImageCacheTestCase(TestCase):
+    def setUp(self):
+        """Create an empty cache in a scratch directory"""
+        self.root = tempfile.mkdtemp()
+        self.cache = ImageCache(os.path.join(self.root, 'cache'), max_bytes=250)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _fetcher(self, payload):
+        """Return a fetch callable that writes ``payload`` and counts its calls"""
+        calls = []
+
+        def fetch(dest_dir):
+            calls.append(dest_dir)
+            path = os.path.join(dest_dir, 'download.jpg')
+            with open(path, 'wb') as f:
+                f.write(payload)
+            return path
+
+        return fetch, calls
+
+    def test_get_or_fetch_downloads_once(self):
+        """Test that a cached image is served without fetching it again"""
+        fetch, calls = self._fetcher(b'x' * 100)
+
+        first = self.cache.get_or_fetch('repo', 'main', 'images/a.jpg', fetch)
+        second = self.cache.get_or_fetch('repo', 'main', 'images/a.jpg', fetch)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first.read_bytes(), b'x' * 100)
+        self.assertEqual(first.suffix, '.jpg')
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['bytes'], 100)
+
+    def test_revisions_are_cached_separately(self):
+        """Test that the same path at different revisions gets different entries"""
+        fetch, calls = self._fetcher(b'x' * 10)
+
+        main = self.cache.get_or_fetch('repo', 'main', 'images/a.jpg', fetch)
+        tagged = self.cache.get_or_fetch('repo', 'v1.0', 'images/a.jpg', fetch)
+
+        self.assertNotEqual(main, tagged)
+        self.assertEqual(len(calls), 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that going over the byte budget evicts the least recently used entry"""
+        fetch, _ = self._fetcher(b'x' * 100)
+
+        a = self.cache.get_or_fetch('repo', 'main', 'a.jpg', fetch)
+        b = self.cache.get_or_fetch('repo', 'main', 'b.jpg', fetch)
+        self.cache.get('repo', 'main', 'a.jpg')  # a is now more recent than b
+        c = self.cache.get_or_fetch('repo', 'main', 'c.jpg', fetch)
+
+        self.assertTrue(a.exists())
+        self.assertFalse(b.exists())
+        self.assertTrue(c.exists())
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(self.cache.stats()['bytes'], 200)
+
+    def test_index_is_rebuilt_from_disk(self):
+        """Test that a new cache instance picks up entries written by another one"""
+        fetch, calls = self._fetcher(b'x' * 100)
+        self.cache.get_or_fetch('repo', 'main', 'a.jpg', fetch)
+
+        reopened = ImageCache(self.cache.root, max_bytes=250)
+        self.assertIsNotNone(reopened.get('repo', 'main', 'a.jpg'))
+        self.assertEqual(reopened.stats()['entries'], 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_fetch_leaves_no_entry(self):
+        """Test that an exception during fetch does not leave partial files behind"""
+        def fetch(dest_dir):
+            with open(os.path.join(dest_dir, 'partial.jpg'), 'wb') as f:
+                f.write(b'xx')
+            raise IOError('connection reset')
+
+        with self.assertRaises(IOError):
+            self.cache.get_or_fetch('repo', 'main', 'a.jpg', fetch)
+
+        self.assertIsNone(self.cache.get('repo', 'main', 'a.jpg'))
+        self.assertEqual(os.listdir(self.cache.tmp_dir), [])
+
+    def test_concurrent_misses_fetch_once(self):
+        """Test that simultaneous requests for the same image share a single download"""
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch(dest_dir):
+            calls.append(dest_dir)
+            started.set()
+            release.wait(5)
+            path = os.path.join(dest_dir, 'download.jpg')
+            with open(path, 'wb') as f:
+                f.write(b'x' * 10)
+            return path
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.get_or_fetch('repo', 'main', 'a.jpg', slow_fetch)
+            ))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        # Release the download only once every request is queued behind it
+        key = make_cache_key('repo', 'main', 'a.jpg')
+        for _ in range(500):
+            if self.cache.locks.waiting(key) == len(threads):
+                break
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.cache.stats()['coalesced'], 3)
+
+    def test_directory_entries_are_sized_and_evicted(self):
+        """Test that a derivative made of several files is cached as one entry"""
+        def fetch(dest_dir):
+            root = os.path.join(dest_dir, 'tiles')
+            os.makedirs(os.path.join(root, '0'))
+            for name in ('0/0_0.jpg', '0/1_0.jpg'):
+                with open(os.path.join(root, name), 'wb') as f:
+                    f.write(b'x' * 100)
+            return root
+
+        tiles = self.cache.get_or_fetch('repo', 'main', 'a.jpg', fetch, variant='tiles-256')
+        self.assertTrue((tiles / '0' / '1_0.jpg').is_file())
+        self.assertEqual(self.cache.stats()['bytes'], 200)
+
+        other, _ = self._fetcher(b'x' * 100)
+        self.cache.get_or_fetch('repo', 'main', 'b.jpg', other)
+
+        self.assertFalse(tiles.exists())
+        self.assertEqual(self.cache.stats()['bytes'], 100)
+
+
+@override_settings(IMAGE_ACCEL_REDIRECT_PREFIX='')
+class ImageResponseTestCase(TestCase):
+    def setUp(self):
+        """Write a small image file to serve"""
+        self.factory = RequestFactory()
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'scan.jpg')
+        with open(self.path, 'wb') as f:
+            f.write(bytes(range(100)))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _content(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_full_response_has_validators(self):
+        """Test that the whole file is streamed with ETag and Last-Modified"""
+        response = serve_image_file(self.factory.get('/'), self.path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self._content(response), bytes(range(100)))
+
+    def test_if_none_match_returns_304(self):
+        """Test that a matching ETag is answered without a body"""
+        etag = serve_image_file(self.factory.get('/'), self.path)['ETag']
+
+        response = serve_image_file(self.factory.get('/', HTTP_IF_NONE_MATCH=etag), self.path)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_byte_range_returns_206(self):
+        """Test that bounded, open-ended and suffix ranges return only the requested bytes"""
+        cases = [('bytes=10-19', 10, 19), ('bytes=90-', 90, 99), ('bytes=-5', 95, 99)]
+        for header, start, end in cases:
+            response = serve_image_file(self.factory.get('/', HTTP_RANGE=header), self.path)
+
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/100')
+            self.assertEqual(response['Content-Length'], str(end - start + 1))
+            self.assertEqual(self._content(response), bytes(range(start, end + 1)))
+
+    def test_unsatisfiable_range_returns_416(self):
+        """Test that a range past the end of the file is rejected"""
+        response = serve_image_file(self.factory.get('/', HTTP_RANGE='bytes=200-300'), self.path)
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_stale_if_range_serves_full_file(self):
+        """Test that a range is ignored when If-Range no longer matches"""
+        request = self.factory.get('/', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        response = serve_image_file(request, self.path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._content(response)), 100)
+
+    def test_accel_redirect_hands_off_to_proxy(self):
+        """Test that cached files are delegated to the proxy when configured"""
+        with self.settings(IMAGE_CACHE_DIR=self.root, IMAGE_ACCEL_REDIRECT_PREFIX='/protected-images/'):
+            response = serve_image_file(self.factory.get('/'), self.path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-images/scan.jpg')
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(IMAGE_PREVIEW_SIZES=[256, 1024])
+class ImagePreviewTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_preview_bucket(self):
+        """Test that requested sizes snap to the smallest covering bucket"""
+        self.assertEqual(preview_bucket(100), 256)
+        self.assertEqual(preview_bucket(256), 256)
+        self.assertEqual(preview_bucket(800), 1024)
+        self.assertEqual(preview_bucket(5000), 1024)
+
+    def test_render_preview_limits_long_edge(self):
+        """Test that previews keep the aspect ratio and fit the bucket"""
+        source = os.path.join(self.root, 'scan.png')
+        Image.new('I;16', (600, 1200), 4000).save(source)
+
+        preview = render_preview(source, 256, self.root)
+
+        with Image.open(preview) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (128, 256))
+
+
+class TilePyramidTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_level_sizes(self):
+        """Test that each level halves the one above it, rounding up"""
+        self.assertEqual(max_level(600, 300), 10)
+        self.assertEqual(level_size(600, 300, 10), (600, 300))
+        self.assertEqual(level_size(600, 300, 9), (300, 150))
+        self.assertEqual(level_size(600, 300, 1), (2, 1))
+        self.assertEqual(level_size(600, 300, 0), (1, 1))
+
+    def test_render_pyramid_writes_descriptor_and_tiles(self):
+        """Test that every level is cut into 256px tiles next to a DZI descriptor"""
+        source = os.path.join(self.root, 'scan.png')
+        Image.new('L', (600, 300), 128).save(source)
+
+        pyramid = render_pyramid(source, self.root)
+
+        with open(os.path.join(pyramid, 'pyramid.dzi')) as f:
+            descriptor = f.read()
+        self.assertIn('TileSize="256"', descriptor)
+        self.assertIn('<Size Width="600" Height="300"/>', descriptor)
+
+        tiles_root = os.path.join(pyramid, 'pyramid_files')
+        self.assertEqual(sorted(int(level) for level in os.listdir(tiles_root)), list(range(11)))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(tiles_root, '10'))),
+            ['0_0.jpg', '0_1.jpg', '1_0.jpg', '1_1.jpg', '2_0.jpg', '2_1.jpg'],
+        )
+        with Image.open(os.path.join(tiles_root, '10', '2_1.jpg')) as tile:
+            self.assertEqual(tile.size, (88, 44))
+        self.assertEqual(os.listdir(os.path.join(tiles_root, '0')), ['0_0.jpg'])
+
+
+@override_settings(IMAGE_PREVIEW_SIZES=[256, 1024])
+class ImagePrefetchTestCase(TestCase):
+    def setUp(self):
+        """Point the image cache at a scratch directory and block prefetch workers until released"""
+        self.root = tempfile.mkdtemp()
+        overrides = self.settings(IMAGE_CACHE_DIR=self.root, HF_TOKEN='token')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache_patch = mock.patch('validation.images.cache._image_cache', None)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+        self.release = threading.Event()
+        self.fetched = []
+
+        def fake_preview(exam, size, on_original=None):
+            self.release.wait(5)
+            self.fetched.append((exam.id, size))
+
+        preview_patch = mock.patch('validation.images.prefetch.get_exam_preview', side_effect=fake_preview)
+        preview_patch.start()
+        self.addCleanup(preview_patch.stop)
+
+        self.prefetcher = ImagePrefetcher(max_workers=2, max_pending_per_user=2)
+        self.addCleanup(self.prefetcher._executor.shutdown)
+
+    def tearDown(self):
+        self.release.set()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _exams(self, *ids):
+        return [
+            SimpleNamespace(id=i, image_path=f'images/{i}.jpg', version='main', has_image_metadata=True) for i in ids
+        ]
+
+    def test_pending_prefetches_are_bounded_per_user(self):
+        """Test that a user cannot queue more than their budget while others still can"""
+        self.assertEqual(self.prefetcher.prefetch(1, self._exams(1, 2, 3)), 2)
+        self.assertEqual(self.prefetcher.prefetch(2, self._exams(4)), 1)
+
+        self.release.set()
+        self.prefetcher._executor.shutdown(wait=True)
+
+        self.assertEqual(sorted(self.fetched), [(1, 1024), (2, 1024), (4, 1024)])
+        self.assertEqual(self.prefetcher._pending, {})
+
+    def test_in_flight_images_are_not_queued_twice(self):
+        """Test that an exam already being prefetched for one user is skipped for another"""
+        self.prefetcher.prefetch(1, self._exams(1))
+
+        self.assertEqual(self.prefetcher.prefetch(2, self._exams(1)), 0)
+
+
+class WarmRunImagesCommandTestCase(TestCase):
+    def setUp(self):
+        """Create a run with three exams and an empty image cache"""
+        self.root = tempfile.mkdtemp()
+        # Leave retries to the command rather than the hub client
+        overrides = self.settings(IMAGE_CACHE_DIR=self.root, HF_TOKEN='token', HF_HUB_MAX_RETRIES=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for target in ('validation.images.cache._image_cache', 'validation.hub.client._client'):
+            patcher = mock.patch(target, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.run = Run.objects.create(name='Warm run')
+        self.run.exams.set([
+            Exam.objects.create(external_id=f'exam_{i}', image_path=f'images/{i}.jpg', version='v1.0')
+            for i in range(3)
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fake_download(self, repo_id, filename, local_dir, **kwargs):
+        if filename == 'images/1.jpg':
+            raise EntryNotFoundError(f'{filename} not found')
+        if filename == 'images/2.jpg' and not self.flaky_failed:
+            self.flaky_failed = True
+            raise ConnectionError('connection reset')
+        path = os.path.join(local_dir, 'download.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+        return path
+
+    @mock.patch('validation.management.commands.warm_run_images.time.sleep')
+    def test_downloads_retries_and_reports_missing(self, sleep):
+        """Test that transient errors are retried and missing files are listed, not retried"""
+        self.flaky_failed = False
+        out = StringIO()
+
+        with mock.patch('validation.images.sources.hf_hub_download', side_effect=self.fake_download) as download:
+            call_command('warm_run_images', self.run.id, workers=2, stdout=out)
+            self.assertEqual(download.call_count, 4)
+
+            # Only the missing image is looked up again
+            call_command('warm_run_images', self.run.id, stdout=out)
+            self.assertEqual(download.call_count, 5)
+
+        output = out.getvalue()
+        self.assertIn('2 fetched, 0 already cached, 1 missing, 0 failed', output)
+        self.assertIn('0 fetched, 2 already cached, 1 missing, 0 failed', output)
+        self.assertIn('exam_1', output)
+        sleep.assert_called_once_with(1)
+
+
+class ImageSourceTestCase(TestCase):
+    def setUp(self):
+        """Lay out a two-revision mirror and route v1.0 to it"""
+        self.root = tempfile.mkdtemp()
+        self.mirror = os.path.join(self.root, 'mirror')
+        for revision in ('main', 'v1.0'):
+            os.makedirs(os.path.join(self.mirror, revision, 'images'))
+            with open(os.path.join(self.mirror, revision, 'images', 'a.jpg'), 'wb') as f:
+                f.write(revision.encode())
+
+        overrides = self.settings(
+            IMAGE_CACHE_DIR=os.path.join(self.root, 'cache'),
+            IMAGE_SOURCES={
+                'huggingface': {'BACKEND': 'validation.images.sources.HuggingFaceSource'},
+                'mirror': {
+                    'BACKEND': 'validation.images.sources.LocalMirrorSource',
+                    'OPTIONS': {'root': self.mirror},
+                },
+            },
+            IMAGE_SOURCE_DEFAULT='huggingface',
+            IMAGE_SOURCE_VERSIONS={'v1.0': 'mirror'},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache_patch = mock.patch('validation.images.cache._image_cache', None)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_versions_are_routed_to_their_source(self):
+        """Test that mapped versions use the mirror and others fall back to the default"""
+        self.assertEqual(get_image_source('v1.0').alias, 'mirror')
+        self.assertEqual(get_image_source('v2.0').alias, 'huggingface')
+
+    @mock.patch('validation.images.sources.hf_hub_download')
+    def test_mirror_is_served_in_place(self, download):
+        """Test that mirrored images are read from the revision directory without downloading"""
+        path = fetch_image('images/a.jpg', 'v1.0')
+
+        self.assertEqual(path.read_bytes(), b'v1.0')
+        self.assertTrue(str(path).startswith(os.path.realpath(self.mirror)))
+        self.assertTrue(is_image_cached('images/a.jpg', 'v1.0'))
+        download.assert_not_called()
+
+    def test_mirror_rejects_missing_and_escaping_paths(self):
+        """Test that files outside the revision directory are never served"""
+        with self.assertRaises(ImageNotFound):
+            fetch_image('images/missing.jpg', 'v1.0')
+        with self.assertRaises(ImageNotFound):
+            fetch_image('../main/images/a.jpg', 'v1.0')
+
+
+class ExamImageMetadataTestCase(TestCase):
+    def setUp(self):
+        """Serve exam images from a scratch MEDIA_ROOT"""
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'images'))
+        Image.new('L', (300, 200), 128).save(os.path.join(self.root, 'images', 'a.png'))
+
+        overrides = self.settings(
+            MEDIA_ROOT=self.root,
+            IMAGE_CACHE_DIR=os.path.join(self.root, 'cache'),
+            IMAGE_SOURCE_DEFAULT='filesystem',
+            IMAGE_SOURCE_VERSIONS={},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache_patch = mock.patch('validation.images.cache._image_cache', None)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+        self.exam = Exam.objects.create(external_id='exam_a', image_path='images/a.png')
+        Exam.objects.create(external_id='exam_missing', image_path='images/missing.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_read_image_metadata(self):
+        """Test that dimensions, format, size and checksum are read from the file"""
+        metadata = read_image_metadata(os.path.join(self.root, 'images', 'a.png'))
+
+        self.assertEqual((metadata['image_width'], metadata['image_height']), (300, 200))
+        self.assertEqual(metadata['image_format'], 'PNG')
+        self.assertEqual(metadata['image_size'], os.path.getsize(os.path.join(self.root, 'images', 'a.png')))
+        self.assertEqual(len(metadata['image_sha256']), 64)
+
+    def test_backfill_command_records_metadata(self):
+        """Test that the backfill fills exams with images and reports the missing ones"""
+        out = StringIO()
+        call_command('backfill_exam_image_metadata', stdout=out)
+
+        self.exam.refresh_from_db()
+        self.assertTrue(self.exam.has_image_metadata)
+        self.assertEqual(self.exam.image_width, 300)
+        self.assertIn('Updated 1 exams; 1 images missing, 0 failed.', out.getvalue())
+
+    def test_preview_records_metadata_only_while_rendering(self):
+        """Test that serving a cached preview never fetches the original just to read its metadata"""
+        self.client.force_login(CustomUser.objects.create_superuser('admin@example.com', 'pw'))
+        url = f'/validation/exams/{self.exam.id}/image/preview/256/'
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.image_width, 300)
+
+        Exam.objects.filter(id=self.exam.id).update(image_width=None, image_height=None, image_sha256='')
+        with mock.patch('validation.images.metadata.get_exam_image') as get_original:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        get_original.assert_not_called()
+        self.exam.refresh_from_db()
+        self.assertFalse(self.exam.has_image_metadata)
+
+    def test_prefetched_preview_records_metadata(self):
+        """Test that an exam reached through a prefetched preview still gets its metadata"""
+        prefetcher = ImagePrefetcher(max_workers=1, max_pending_per_user=1)
+        self.addCleanup(prefetcher._executor.shutdown)
+        size = max(settings.IMAGE_PREVIEW_SIZES)
+
+        # Run the worker inline so it shares the test transaction
+        prefetcher._run(1, (self.exam.image_path, self.exam.version), self.exam, size)
+
+        self.exam.refresh_from_db()
+        self.assertEqual((self.exam.image_width, self.exam.image_height), (300, 200))
+        self.assertTrue(is_image_cached(self.exam.image_path, self.exam.version, f'preview-{size}.jpg'))
+
+    @override_settings(HF_TOKEN='token', IMAGE_SOURCE_DEFAULT='huggingface')
+    def test_cached_copy_with_wrong_size_is_downloaded_again(self):
+        """Test that a cached image that does not match the recorded size is replaced"""
+        payloads = [b'truncated', b'x' * 100]
+
+        def fake_download(local_dir, **kwargs):
+            path = os.path.join(local_dir, 'download.png')
+            with open(path, 'wb') as f:
+                f.write(payloads.pop(0))
+            return path
+
+        self.exam.image_size = 100
+        with mock.patch('validation.images.sources.hf_hub_download', side_effect=fake_download):
+            path = get_exam_image(self.exam)
+
+        self.assertEqual(path.read_bytes(), b'x' * 100)
+        self.assertEqual(payloads, [])
+
+
+class MaskOverlayTestCase(TestCase):
+    def setUp(self):
+        """Give one exam two vertebra masks in a run, with a scratch image cache"""
+        self.root = tempfile.mkdtemp()
+        overrides = self.settings(IMAGE_CACHE_DIR=os.path.join(self.root, 'cache'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache_patch = mock.patch('validation.images.cache._image_cache', None)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+        self.exam = Exam.objects.create(external_id='exam_a', image_path='images/a.png')
+        self.run = Run.objects.create(name='Segmentation')
+        model_version = ModelVersion.objects.create(version_number='1.0', model_name='m', model_type='segmentation')
+        self.l1 = np.zeros((40, 60), dtype=bool)
+        self.l1[5:15, 10:30] = True
+        self.l2 = np.zeros((40, 60), dtype=bool)
+        self.l2[20:35, 12:28] = True
+        for name, pixels in (('L1', self.l1), ('L2', self.l2)):
+            PredVertebra.objects.create(
+                run_id=self.run, exam_id=self.exam, model_version=model_version, name=name,
+                polygon=Box(0, 0, 1, 1), mask=Mask.encode(pixels),
+            )
+        self.client.force_login(CustomUser.objects.create_superuser('admin@example.com', 'pw'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_encode_decode_round_trip(self):
+        """Test that run lengths follow the COCO layout and decode to the same pixels"""
+        pixels = np.random.default_rng(0).random((33, 17)) > 0.7
+        pixels[0, 0] = True
+
+        mask = Mask.encode(pixels)
+
+        self.assertEqual(mask.counts[0], 0)
+        self.assertEqual(mask.area, pixels.sum())
+        np.testing.assert_array_equal(Mask.from_bytes(mask.to_bytes()).decode(), pixels)
+        # Column-major: 10 empty columns and 5 rows, then 20 columns of 10 set pixels
+        self.assertEqual(Mask.encode(self.l1).as_dict(), {'size': [40, 60], 'counts': [405, *[10, 30] * 19, 10, 1225]})
+        self.assertEqual(Mask.encode(self.l1).bounding_box, Box(10 / 60, 5 / 40, 30 / 60, 15 / 40))
+
+    def test_overlay_is_rendered_once(self):
+        """Test that the overlay paints each vertebra in its colour and is served from the cache afterwards"""
+        url = f'/validation/exams/{self.exam.id}/runs/{self.run.id}/masks.png'
+        with mock.patch('validation.images.masks.render_mask_overlay', wraps=render_mask_overlay) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual((first.status_code, first['Content-Type']), (200, 'image/png'))
+        self.assertEqual((render.call_count, second.status_code), (1, 200))
+        with Image.open(BytesIO(b''.join(first.streaming_content))) as image:
+            overlay = np.asarray(image)
+        self.assertEqual(overlay.shape, (40, 60, 4))
+        np.testing.assert_array_equal(overlay[..., 3] > 0, self.l1 | self.l2)
+        self.assertNotEqual(tuple(overlay[10, 20, :3]), tuple(overlay[25, 20, :3]))
+
+    def test_duplicated_run_keeps_outlines(self):
+        """Test that vertebrae copied to an intra-operator round keep their contours and masks"""
+        contour = [[0.125, 0.25], [0.375, 0.25], [0.25, 0.5]]
+        PredVertebra.objects.filter(run_id=self.run, name='L1').update(contour=Contour(contour))
+
+        response = self.client.post(f'/validation/admin/run/{self.run.id}/duplicate/', {'round_number': '2'})
+
+        self.assertEqual(response.status_code, 302)
+        copied = PredVertebra.objects.get(run_id__original_run=self.run, name='L1')
+        self.assertEqual(copied.contour.tolist(), contour)
+        self.assertEqual(copied.mask, Mask.encode(self.l1))
+
+    def test_overlay_without_masks_is_404(self):
+        """Test that exams without masks in the run have no overlay"""
+        other_run = Run.objects.create(name='Boxes only')
+
+        response = self.client.get(f'/validation/exams/{self.exam.id}/runs/{other_run.id}/masks.png')
+
+        self.assertEqual(response.status_code, 404)
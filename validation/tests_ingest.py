@@ -0,0 +1,697 @@
+import gzip
+import json
+import math
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from validation.enums.job_status import JobStatus
+from validation.ingest.exams import import_exams
+from validation.ingest.jobs import claim_next_job, fail_stale_jobs, run_job
+from validation.ingest.predictions import create_predictions
+from validation.models import Box, Exam, IngestJob, ModelVersion, PredSeverity, PredVertebra, Run
+from validation.parsers import msgpack
+
+User = get_user_model()
+
+
+class ExamImportTestCase(TestCase):
+    def setUp(self):
+        """Lay out a mirrored revision with a few images and a stray file"""
+        self.root = tempfile.mkdtemp()
+        images = os.path.join(self.root, 'v1.0', 'images')
+        os.makedirs(images)
+        os.makedirs(os.path.join(self.root, 'v1.0', '.cache'))
+        for name in ('EX-1.png', 'EX-2.png', 'EX-3.jpg', 'README.md', '../.cache/EX-9.png'):
+            with open(os.path.join(images, name), 'wb') as f:
+                f.write(b'x')
+
+        overrides = self.settings(
+            IMAGE_SOURCES={
+                'mirror': {
+                    'BACKEND': 'validation.images.sources.LocalMirrorSource',
+                    'OPTIONS': {'root': self.root},
+                },
+            },
+            IMAGE_SOURCE_VERSIONS={'v1.0': 'mirror'},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_rows_are_created_in_chunks_and_reruns_skip_them(self):
+        """Test that matching files become exams and a second import only reports them as skipped"""
+        Exam.objects.create(external_id='EX-2', image_path='old/EX-2.png', version='main')
+
+        with self.assertNumQueries(2 * 3):  # per chunk: lookup, insert, count
+            report = import_exams(
+                ['images/EX-1.png', 'images/EX-2.png', 'images/EX-3.jpg', 'images/EX-4.png', 'README.md'],
+                'v1.0', chunk_size=2,
+            )
+
+        self.assertEqual((report.created, report.skipped, report.ignored, report.invalid), (3, 1, 1, 0))
+        self.assertEqual(Exam.objects.get(external_id='EX-4').image_path, 'images/EX-4.png')
+        self.assertEqual(Exam.objects.get(external_id='EX-2').image_path, 'old/EX-2.png')
+
+        report = import_exams(['images/EX-1.png', 'images/EX-4.png'], 'v1.0')
+        self.assertEqual((report.created, report.skipped), (0, 2))
+
+    def test_invalid_rows_are_reported(self):
+        """Test that duplicate and oversized identifiers are reported instead of inserted"""
+        report = import_exams(
+            ['a/EX-1.png', 'b/EX-1.png', f'{"x" * 101}.png'],
+            'v1.0',
+        )
+
+        self.assertEqual((report.created, report.invalid), (1, 2))
+        self.assertIn('Duplicate', report.errors[0]['error'])
+        self.assertEqual(Exam.objects.count(), 1)
+
+    def test_pattern_must_capture_external_id(self):
+        """Test that a pattern without the named group is rejected"""
+        with self.assertRaises(ValueError):
+            import_exams(['a.png'], 'v1.0', pattern=r'(.*)\.png')
+
+    def test_command_lists_the_revision(self):
+        """Test that the command imports every image of the revision, skipping hidden directories"""
+        out = StringIO()
+        call_command('import_exams_from_manifest', '--dataset-version', 'v1.0', stdout=out)
+
+        self.assertEqual(
+            sorted(Exam.objects.values_list('external_id', 'image_path', 'version')),
+            [('EX-1', 'images/EX-1.png', 'v1.0'), ('EX-2', 'images/EX-2.png', 'v1.0'),
+             ('EX-3', 'images/EX-3.jpg', 'v1.0')],
+        )
+        self.assertIn('3 created', out.getvalue())
+
+    def test_api_import(self):
+        """Test the staff endpoint, including dry runs and bad versions"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin@example.com', 'pw', is_staff=True))
+
+        response = client.post('/api/exams/import/', {'version': 'v1.0', 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['report']['created'], 3)
+        self.assertEqual(Exam.objects.count(), 0)
+
+        response = client.post('/api/exams/import/', {'version': 'v1.0', 'dry_run': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('dry_run', response.data['errors'])
+
+        # A form-encoded "false" is not a dry run
+        response = client.post('/api/exams/import/', {'version': 'v1.0', 'dry_run': 'false'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Exam.objects.count(), 3)
+
+        with mock.patch('validation.api_views.is_available_version', return_value=False), \
+                mock.patch('validation.api_views.get_available_versions', return_value=['main']):
+            response = client.post('/api/exams/import/', {'version': 'v9', 'paths': ['a.png']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('version', response.data['errors'])
+
+    def test_api_import_checks_versions_of_sources_without_revisions(self):
+        """Test that a filesystem source, which lists the same files for any version, cannot vouch for one"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin@example.com', 'pw', is_staff=True))
+        filesystem = {'BACKEND': 'validation.images.sources.FilesystemSource', 'OPTIONS': {'root': self.root}}
+        pattern = r'^v1\.0/images/(?P<external_id>[^/]+)\.png$'
+
+        with self.settings(IMAGE_SOURCES={'files': filesystem}, IMAGE_SOURCE_DEFAULT='files',
+                           IMAGE_SOURCE_VERSIONS={}), \
+                mock.patch('validation.api_views.is_available_version', side_effect=lambda v: v == 'v1.0'), \
+                mock.patch('validation.api_views.get_available_versions', return_value=['main', 'v1.0']):
+            response = client.post('/api/exams/import/', {'version': 'v9', 'pattern': pattern}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('v9', response.data['errors']['version'][0])
+            self.assertEqual(Exam.objects.count(), 0)
+
+            response = client.post('/api/exams/import/', {'version': 'v1.0', 'pattern': pattern}, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(set(Exam.objects.values_list('version', flat=True)), {'v1.0'})
+
+
+class ExamBatchApiTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin@example.com', 'pw', is_staff=True))
+        Exam.objects.create(external_id='EX-OLD', image_path='old.png')
+
+    def _exams(self, *external_ids):
+        return {'exams': [{'external_id': external_id, 'image_path': f'{external_id}.png'}
+                          for external_id in external_ids]}
+
+    def test_bulk_create_uses_one_existence_query(self):
+        """Test that many exams are created with one lookup and returned with their ids"""
+        body = self._exams(*(f'EX-{i}' for i in range(50)))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/exams/bulk/', body, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 50)
+        lookups = [q for q in queries.captured_queries if q['sql'].startswith('SELECT "validation_exam"')]
+        self.assertEqual(len(lookups), 1)
+        first = response.data['exams'][0]
+        self.assertEqual(Exam.objects.get(id=first['id']).external_id, 'EX-0')
+        self.assertEqual(first['version'], 'main')
+
+    def test_existing_exams_reject_or_are_skipped(self):
+        """Test both conflict modes for external_ids that already exist"""
+        body = self._exams('EX-NEW', 'EX-OLD')
+
+        response = self.client.post('/api/exams/bulk/', body, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('EX-OLD', str(response.data['errors']))
+        self.assertFalse(Exam.objects.filter(external_id='EX-NEW').exists())
+
+        response = self.client.post('/api/exams/bulk/?on_conflict=skip', body, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([exam['created'] for exam in response.data['exams']], [True, False])
+        self.assertEqual(response.data['exams'][1]['id'], Exam.objects.get(external_id='EX-OLD').id)
+
+    def test_duplicate_external_ids_in_request(self):
+        """Test that an external_id given twice is rejected before anything is written"""
+        response = self.client.post('/api/exams/bulk/', self._exams('EX-A', 'EX-A'), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Duplicate external_ids: EX-A', str(response.data['errors']))
+        self.assertEqual(Exam.objects.count(), 1)
+
+    def test_resolve_maps_external_ids_in_one_query(self):
+        """Test that ids and versions are returned for known exams and the rest listed as missing"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/exams/resolve/', {
+                'external_ids': ['EX-OLD', 'EX-404', 'EX-OLD']
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(queries), 1)
+        exam = Exam.objects.get(external_id='EX-OLD')
+        self.assertEqual(response.data['exams'], {'EX-OLD': {'id': exam.id, 'version': 'main'}})
+        self.assertEqual(response.data['missing'], ['EX-404'])
+
+
+class PredictionFixtureMixin:
+    """Staff API client, a model version and 20 exams, plus a payload builder"""
+
+    VERTEBRAE = ['L1', 'L2', 'L3', 'L4', 'L5']
+    LEVELS = ['L1/L2', 'L2/L3', 'L3/L4', 'L4/L5', 'L5/S1']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin@example.com', 'pw', is_staff=True))
+        self.model_version = ModelVersion.objects.create(version_number='1.0', model_name='m', model_type='detection')
+        self.exams = [Exam.objects.create(external_id=f'EX-{i}', image_path=f'{i}.png') for i in range(20)]
+
+    def _payload(self, exams):
+        box = {'x1': 0.1, 'y1': 0.2, 'x2': 0.3, 'y2': 0.4}
+        return {
+            'name': 'Inference run',
+            'exam_ids': [exam.id for exam in exams],
+            'vertebra_predictions': [
+                {'name': name, 'confidence': 0.9, 'model_version_id': self.model_version.id,
+                 'exam_id': exam.id, 'polygon': box}
+                for exam in exams for name in self.VERTEBRAE
+            ],
+            'severity_predictions': [
+                {'severity_name': 'Moderate', 'confidence': 0.8, 'model_version_id': self.model_version.id,
+                 'exam_id': exam.id, 'vertebrae_level': level, 'bounding_box': box}
+                for exam in exams for level in self.LEVELS
+            ],
+        }
+
+
+class PredictionIngestTestCase(PredictionFixtureMixin, TestCase):
+    def _count_queries(self, exams):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/runs/with-predictions/', self._payload(exams), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return len(queries)
+
+    def _insert_batches(self, model, count):
+        """INSERTs needed for ``count`` rows: chunks of INGEST_BATCH_SIZE, split by the backend's parameter limit"""
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        batches = 0
+        for start in range(0, count, settings.INGEST_BATCH_SIZE):
+            rows = min(settings.INGEST_BATCH_SIZE, count - start)
+            batches += math.ceil(rows / connection.ops.bulk_batch_size(fields, [None] * rows))
+        return batches
+
+    def test_query_count_does_not_grow_with_the_run(self):
+        """Test that a run is created with a fixed number of queries apart from the INSERT batches its size needs"""
+        small, large = self.exams[:2], self.exams[:20]
+        extra_batches = sum(
+            self._insert_batches(model, len(large) * 5) - self._insert_batches(model, len(small) * 5)
+            for model in (PredVertebra, PredSeverity)
+        )
+
+        self.assertEqual(self._count_queries(large) - self._count_queries(small), extra_batches)
+
+        run = Run.objects.get(name='Inference run', exams=self.exams[19])
+        self.assertEqual(run.exams.count(), 20)
+        self.assertEqual(run.predicted_vertebrae.count(), 100)
+        self.assertEqual(run.predicted_severities.count(), 100)
+        vertebra = PredVertebra.objects.get(run_id=run, exam_id=self.exams[3], name='L4')
+        self.assertEqual((vertebra.polygon, vertebra.model_version_id), (Box(0.1, 0.2, 0.3, 0.4), self.model_version.id))
+
+    def test_unknown_references_are_rejected_up_front(self):
+        """Test that missing exams or model versions fail validation and create nothing"""
+        payload = self._payload(self.exams[:2])
+        payload['exam_ids'].append(999999)
+        payload['severity_predictions'][0]['model_version_id'] = 424242
+
+        response = self.client.post('/api/runs/with-predictions/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999999', str(response.data['errors']['exam_ids']))
+        self.assertIn('424242', str(response.data['errors']['model_version_ids']))
+        self.assertFalse(Run.objects.exists())
+        self.assertFalse(PredVertebra.objects.exists())
+
+    def test_duplicate_predictions_are_rejected(self):
+        """Test that a prediction given twice for the same exam is a validation error, not a database error"""
+        payload = self._payload(self.exams[:1])
+        payload['vertebra_predictions'].append(payload['vertebra_predictions'][0])
+
+        response = self.client.post('/api/runs/with-predictions/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vertebra_predictions', response.data['errors'])
+
+    def test_add_predictions_to_run(self):
+        """Test that predictions added to an existing run use the same bulk path"""
+        run = Run.objects.create(name='Existing')
+        payload = self._payload(self.exams[:3])
+
+        response = self.client.post(f'/api/runs/{run.id}/predictions/', {
+            'vertebra_predictions': payload['vertebra_predictions'],
+            'severity_predictions': payload['severity_predictions'],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], {'vertebrae_count': 15, 'severities_count': 15})
+        self.assertEqual(PredSeverity.objects.filter(run_id=run, vertebrae_level='L5/S1').count(), 3)
+
+    def test_choices_are_stored_as_codes(self):
+        """Test that enum values are stored as small integers but read, filtered and served as text"""
+        run_id = self.client.post('/api/runs/with-predictions/', self._payload(self.exams[:1]), format='json').data['run_id']
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT severity_name, vertebrae_level FROM validation_predseverity ORDER BY vertebrae_level')
+            self.assertEqual(cursor.fetchall(), [(2, level) for level in range(1, 6)])
+        self.assertEqual(PredSeverity.objects.filter(run_id=run_id, vertebrae_level__in=['L1/L2', 'L5/S1']).count(), 2)
+        self.assertEqual(PredVertebra.objects.get(run_id=run_id, name='L3').name, 'L3')
+
+        response = self.client.get(f'/api/runs/{run_id}/predictions/get/')
+        severity = response.data['severity_predictions'][0]
+        self.assertEqual((severity['severity_name'], severity['vertebrae_level']), ('Moderate', 'L1/L2'))
+
+    def test_contour_is_stored_packed_and_bounds_the_box(self):
+        """Test that a contour without a polygon is packed into one column and its bounds become the box"""
+        payload = self._payload(self.exams[:1])
+        contour = [[0.25, 0.5], [0.75, 0.125], [0.5, 0.875], [0.125, 0.625]]
+        del payload['vertebra_predictions'][0]['polygon']
+        payload['vertebra_predictions'][0]['contour'] = contour
+
+        response = self.client.post('/api/runs/with-predictions/', payload, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        vertebra = PredVertebra.objects.get(run_id=response.data['run_id'], name='L1')
+        self.assertEqual(vertebra.polygon, Box(0.125, 0.125, 0.75, 0.875))
+        self.assertEqual(vertebra.contour.tolist(), contour)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT contour FROM validation_predvertebra WHERE id = %s', [vertebra.id])
+            self.assertEqual(len(cursor.fetchone()[0]), 8 * len(contour))
+
+        response = self.client.get(f'/api/runs/{vertebra.run_id_id}/predictions/get/')
+        served = {p['name']: p['contour'] for p in response.data['vertebra_predictions']}
+        self.assertEqual((served['L1'], served['L2']), (contour, None))
+
+    def test_invalid_contours_are_rejected(self):
+        """Test that malformed contours and vertebrae with neither box nor contour fail validation"""
+        for contour in ([[0.1, 0.2], [0.3, 0.4]], [[0.1, 0.2, 0.3]] * 3, 'abc', None):
+            payload = self._payload(self.exams[:1])
+            del payload['vertebra_predictions'][0]['polygon']
+            payload['vertebra_predictions'][0]['contour'] = contour
+
+            response = self.client.post('/api/runs/with-predictions/', payload, format='json')
+
+            self.assertEqual(response.status_code, 400, contour)
+        self.assertFalse(Run.objects.exists())
+
+    def test_mask_is_stored_as_run_lengths(self):
+        """Test that an RLE mask is stored packed, bounds the box when no polygon is given, and is served back"""
+        payload = self._payload(self.exams[:1])
+        # 4x5 mask, column-major: pixels (1..2, 1..3) set
+        mask = {'size': [4, 5], 'counts': [5, 2, 2, 2, 2, 2, 5]}
+        del payload['vertebra_predictions'][0]['polygon']
+        payload['vertebra_predictions'][0]['mask'] = mask
+
+        response = self.client.post('/api/runs/with-predictions/', payload, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        vertebra = PredVertebra.objects.get(run_id=response.data['run_id'], name='L1')
+        self.assertEqual(vertebra.polygon, Box(0.2, 0.25, 0.8, 0.75))
+        self.assertEqual(vertebra.mask.area, 6)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT mask FROM validation_predvertebra WHERE id = %s', [vertebra.id])
+            self.assertEqual(len(cursor.fetchone()[0]), 4 * (2 + len(mask['counts'])))
+
+        response = self.client.get(f'/api/runs/{vertebra.run_id_id}/predictions/get/')
+        served = {p['name']: p['mask'] for p in response.data['vertebra_predictions']}
+        self.assertEqual((served['L1'], served['L2']), (mask, None))
+
+        for bad in ({'size': [4, 5], 'counts': [5, 2]}, {'size': [4, 5], 'counts': [5, 2.5, 12.5]},
+                    {'size': [4, 0], 'counts': []}, {'size': [4, 5], 'counts': [20]}, [1, 2]):
+            payload['vertebra_predictions'][0]['mask'] = bad
+            response = self.client.post('/api/runs/with-predictions/', payload, format='json')
+            self.assertEqual(response.status_code, 400, bad)
+
+    def _ndjson(self, lines):
+        return '\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines).encode()
+
+    def _stream(self, run, body, **params):
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(
+            f'/api/runs/{run.id}/predictions/stream/?{query}', body, content_type='application/x-ndjson'
+        )
+
+    def test_stream_commits_in_batches_and_reports_bad_lines(self):
+        """Test that valid lines are saved batch by batch while bad lines are reported by number"""
+        run = Run.objects.create(name='Streamed')
+        payload = self._payload(self.exams[:4])
+        lines = [dict(row, type='vertebra') for row in payload['vertebra_predictions']]
+        lines += [dict(row, type='severity') for row in payload['severity_predictions']]
+        lines[2] = '{not json'
+        lines[5] = dict(lines[5], exam_id=999999)
+        lines[7] = dict(lines[7], type='other')
+        lines.insert(10, '')
+
+        with mock.patch('validation.ingest.stream.create_predictions', wraps=create_predictions) as create:
+            response = self._stream(run, self._ndjson(lines), batch_size=10)
+
+        self.assertEqual(response.status_code, 200)
+        report = response.data['report']
+        self.assertFalse(response.data['success'])
+        self.assertEqual(report['lines'], 40)
+        self.assertEqual(report['created'], {'vertebrae_count': 17, 'severities_count': 20})
+        self.assertEqual(sorted(error['line'] for error in report['errors']), [3, 6, 8])
+        self.assertIn('Exam 999999 not found', str(report['errors']))
+        self.assertEqual(create.call_count, 4)
+        self.assertEqual(run.predicted_vertebrae.count() + run.predicted_severities.count(), 37)
+
+    def test_stream_keeps_committed_batches_when_one_fails(self):
+        """Test that a batch rejected by the database does not undo earlier batches"""
+        run = Run.objects.create(name='Streamed')
+        rows = [dict(row, type='vertebra') for row in self._payload(self.exams[:2])['vertebra_predictions']]
+
+        self._stream(run, self._ndjson(rows[:5]))
+        response = self._stream(run, self._ndjson(rows), batch_size=5)
+
+        report = response.data['report']
+        self.assertEqual(report['failed_batches'], 1)
+        self.assertEqual(report['errors'][0]['lines'], '1-5')
+        self.assertEqual(report['created']['vertebrae_count'], 5)
+        self.assertEqual(run.predicted_vertebrae.count(), 10)
+
+    def test_stream_rejects_bad_batch_size(self):
+        """Test that a non-numeric batch size is a client error"""
+        run = Run.objects.create(name='Streamed')
+        self.assertEqual(self._stream(run, b'', batch_size='x').status_code, 400)
+
+    def test_on_conflict_update_rewrites_predictions_in_place(self):
+        """Test that re-sending a run with on_conflict=update keeps ids and validations but updates the values"""
+        run = Run.objects.create(name='Rescored')
+        payload = self._payload(self.exams[:2])
+        body = {'vertebra_predictions': payload['vertebra_predictions'],
+                'severity_predictions': payload['severity_predictions']}
+        self.client.post(f'/api/runs/{run.id}/predictions/', body, format='json')
+        severity = PredSeverity.objects.get(run_id=run, exam_id=self.exams[0], vertebrae_level='L1/L2')
+
+        new_version = ModelVersion.objects.create(version_number='2.0', model_name='m', model_type='detection')
+        for row in body['vertebra_predictions'] + body['severity_predictions']:
+            row.update(confidence=0.5, model_version_id=new_version.id)
+        body['severity_predictions'][0]['bounding_box'] = {'x1': 0.5, 'y1': 0.5, 'x2': 0.6, 'y2': 0.6}
+        body['severity_predictions'][0]['severity_name'] = 'Severe'
+
+        response = self.client.post(f'/api/runs/{run.id}/predictions/?on_conflict=update', body, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['updated'], {'vertebrae_count': 10, 'severities_count': 10})
+        self.assertEqual(response.data['created'], {'vertebrae_count': 0, 'severities_count': 0})
+        updated = PredSeverity.objects.get(id=severity.id)
+        self.assertEqual((updated.severity_name, updated.confidence, updated.model_version_id),
+                         ('Severe', 0.5, new_version.id))
+        self.assertEqual(updated.bounding_box, Box(0.5, 0.5, 0.6, 0.6))
+
+    def test_on_conflict_skip_makes_retries_safe(self):
+        """Test that a retried upload with on_conflict=skip only adds what is missing"""
+        run = Run.objects.create(name='Retried')
+        rows = [dict(row, type='vertebra') for row in self._payload(self.exams[:2])['vertebra_predictions']]
+        self._stream(run, self._ndjson(rows[:4]))
+
+        response = self._stream(run, self._ndjson(rows), on_conflict='skip', batch_size=3)
+
+        report = response.data['report']
+        self.assertTrue(response.data['success'])
+        self.assertEqual((report['created']['vertebrae_count'], report['skipped']['vertebrae_count']), (6, 4))
+        self.assertEqual(run.predicted_vertebrae.count(), 10)
+
+    def test_unknown_on_conflict_mode_is_rejected(self):
+        """Test that only the documented conflict modes are accepted"""
+        run = Run.objects.create(name='Run')
+        response = self.client.post(f'/api/runs/{run.id}/predictions/?on_conflict=merge', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('on_conflict', response.data['errors'])
+
+
+class IngestJobTestCase(PredictionFixtureMixin, TestCase):
+    def _run_worker(self):
+        out = StringIO()
+        call_command('run_ingest_worker', '--once', stdout=out)
+        return out.getvalue()
+
+    def test_async_run_is_queued_and_processed_by_the_worker(self):
+        """Test that ?async=true answers 202 at once and the worker creates the run in chunks"""
+        response = self.client.post('/api/runs/with-predictions/?async=true', self._payload(self.exams[:3]),
+                                    format='json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Run.objects.exists())
+        status_url = f"/api/jobs/{response.data['job_id']}/"
+        self.assertTrue(response.data['status_url'].endswith(status_url))
+        self.assertEqual(self.client.get(status_url).data['status'], JobStatus.QUEUED)
+
+        with self.settings(INGEST_BATCH_SIZE=4):
+            output = self._run_worker()
+
+        job = self.client.get(status_url).data
+        self.assertIn('succeeded', output)
+        self.assertEqual((job['status'], job['processed'], job['total'], job['progress']),
+                         (JobStatus.SUCCEEDED, 30, 30, 1.0))
+        run = Run.objects.get(id=job['result']['run_id'])
+        self.assertEqual(job['run'], run.id)
+        self.assertEqual(run.exams.count(), 3)
+        self.assertEqual(run.predicted_vertebrae.count() + run.predicted_severities.count(), 30)
+        self.assertIsNone(IngestJob.objects.get(id=job['id']).payload)
+
+    def test_failed_job_reports_errors_and_leaves_no_run(self):
+        """Test that an invalid payload fails the job with its validation errors"""
+        payload = self._payload(self.exams[:1])
+        payload['exam_ids'].append(999999)
+        job_id = self.client.post('/api/runs/with-predictions/?async=1', payload, format='json').data['job_id']
+
+        self._run_worker()
+
+        job = self.client.get(f'/api/jobs/{job_id}/').data
+        self.assertEqual(job['status'], JobStatus.FAILED)
+        self.assertIn('exam_ids', job['errors'])
+        self.assertFalse(Run.objects.exists())
+
+    def test_async_predictions_keep_the_conflict_mode(self):
+        """Test that queued uploads to an existing run honour on_conflict"""
+        run = Run.objects.create(name='Existing')
+        payload = self._payload(self.exams[:2])
+        body = {'vertebra_predictions': payload['vertebra_predictions'], 'severity_predictions': []}
+        self.client.post(f'/api/runs/{run.id}/predictions/', body, format='json')
+
+        response = self.client.post(f'/api/runs/{run.id}/predictions/?async=true&on_conflict=skip', body,
+                                    format='json')
+        self._run_worker()
+
+        job = IngestJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result['skipped']['vertebrae_count'], 10)
+
+    def test_stalled_jobs_are_failed(self):
+        """Test that a running job without recent progress is marked as failed, deleting its half-created run"""
+        stalled = timezone.now() - timedelta(hours=1)
+        existing = Run.objects.create(name='Existing')
+        half_created = Run.objects.create(name='Half created')
+        add = IngestJob.objects.create(
+            kind=IngestJob.ADD_PREDICTIONS, status=JobStatus.RUNNING, heartbeat_at=stalled, run=existing,
+        )
+        create = IngestJob.objects.create(
+            kind=IngestJob.RUN_WITH_PREDICTIONS, status=JobStatus.RUNNING, heartbeat_at=stalled, run=half_created,
+        )
+
+        self.assertIn('Marked 2 stalled', self._run_worker())
+        self.assertEqual(IngestJob.objects.get(id=add.id).status, JobStatus.FAILED)
+        self.assertEqual(IngestJob.objects.get(id=create.id).status, JobStatus.FAILED)
+        self.assertEqual(list(Run.objects.all()), [existing])
+
+    def test_late_finish_does_not_overwrite_a_stale_failure(self):
+        """Test that a worker finishing after its job was failed as stale leaves it failed and deletes its run"""
+        self.client.post('/api/runs/with-predictions/?async=true', self._payload(self.exams[:1]), format='json')
+        job = claim_next_job(worker='slow')
+        IngestJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(fail_stale_jobs(), 1)
+
+        job = run_job(job)
+
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIn('stopped before finishing', job.errors['job'][0])
+        self.assertFalse(Run.objects.exists())
+
+
+class ColumnarPayloadTestCase(PredictionFixtureMixin, TestCase):
+    def _columnar(self, exams):
+        """The payload of _payload(exams) in the columnar layout, with the model version in the header"""
+        payload = self._payload(exams)
+        columnar = {'name': payload['name'], 'exam_ids': payload['exam_ids'], 'model_version_id': self.model_version.id}
+        for block, box_key, fields in (
+            ('vertebra_predictions', 'polygon', ['exam_id', 'name', 'confidence']),
+            ('severity_predictions', 'bounding_box', ['exam_id', 'vertebrae_level', 'severity_name', 'confidence']),
+        ):
+            rows = payload[block]
+            columnar[block] = {field: [row[field] for row in rows] for field in fields}
+            columnar[block].update({coord: [row[box_key][coord] for row in rows] for coord in ('x1', 'y1', 'x2', 'y2')})
+        return columnar
+
+    @mock.patch('validation.ingest.payloads.PredVertebraSerializer')
+    @mock.patch('validation.ingest.payloads.RunWithPredictionsSerializer')
+    def test_columnar_run_is_created_without_row_serializers(self, run_serializer, vertebra_serializer):
+        """Test that a columnar run is decoded straight into bulk inserts"""
+        response = self.client.post('/api/runs/with-predictions/', self._columnar(self.exams[:3]), format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        run_serializer.assert_not_called()
+        vertebra_serializer.assert_not_called()
+        run = Run.objects.get(id=response.data['run_id'])
+        self.assertEqual((run.name, run.exams.count()), ('Inference run', 3))
+        severity = PredSeverity.objects.get(run_id=run, exam_id=self.exams[2], vertebrae_level='L4/L5')
+        self.assertEqual((severity.severity_name, severity.model_version_id, severity.bounding_box.y2),
+                         ('Moderate', self.model_version.id, 0.4))
+        self.assertEqual(run.predicted_vertebrae.count(), 15)
+
+    def test_columnar_predictions_can_be_added_and_upserted(self):
+        """Test that the add-predictions endpoint accepts columns, including on_conflict"""
+        run = Run.objects.create(name='Existing')
+        columnar = self._columnar(self.exams[:2])
+        body = {'model_version_id': columnar['model_version_id'], 'vertebra_predictions': columnar['vertebra_predictions']}
+
+        self.client.post(f'/api/runs/{run.id}/predictions/', body, format='json')
+        body['vertebra_predictions']['confidence'] = [0.1] * 10
+        response = self.client.post(f'/api/runs/{run.id}/predictions/?on_conflict=update', body, format='json')
+
+        self.assertEqual(response.data['updated']['vertebrae_count'], 10)
+        self.assertEqual(set(run.predicted_vertebrae.values_list('confidence', flat=True)), {0.1})
+
+    def test_invalid_columns_are_reported_by_row(self):
+        """Test that bad values, missing and misaligned columns are rejected with compact errors"""
+        columnar = self._columnar(self.exams[:2])
+        columnar['vertebra_predictions']['name'][3] = 'L9'
+        columnar['severity_predictions']['x1'].pop()
+        del columnar['model_version_id']
+
+        response = self.client.post('/api/runs/with-predictions/', columnar, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['errors']
+        self.assertEqual(len(errors['vertebra_predictions']['name']), 1)
+        self.assertTrue(errors['vertebra_predictions']['name'][0].startswith('Row 3: must be one of: T8, '))
+        self.assertIn('model_version_id', errors['vertebra_predictions'])
+        self.assertIn('same length', str(errors['severity_predictions']))
+        self.assertFalse(Run.objects.exists())
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_messagepack_body(self):
+        """Test that a columnar payload can be sent as MessagePack"""
+        response = self.client.post(
+            '/api/runs/with-predictions/', msgpack.packb(self._columnar(self.exams[:2])),
+            content_type='application/msgpack',
+        )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Run.objects.get(id=response.data['run_id']).predicted_severities.count(), 10)
+
+
+class CompressedBodyTestCase(PredictionFixtureMixin, TestCase):
+    def _post(self, path, body, encoding='gzip', content_type='application/json'):
+        return self.client.post(path, body, content_type=content_type, HTTP_CONTENT_ENCODING=encoding)
+
+    def test_gzip_run_with_predictions(self):
+        """Test that a gzip body is decompressed before parsing"""
+        body = gzip.compress(json.dumps(self._payload(self.exams[:3])).encode())
+
+        response = self._post('/api/runs/with-predictions/', body)
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Run.objects.get(id=response.data['run_id']).predicted_vertebrae.count(), 15)
+
+    def test_gzip_ndjson_stream(self):
+        """Test that the NDJSON stream is decompressed line by line"""
+        run = Run.objects.create(name='Streamed')
+        rows = self._payload(self.exams[:2])['vertebra_predictions']
+        body = gzip.compress('\n'.join(json.dumps(dict(row, type='vertebra')) for row in rows).encode())
+
+        response = self._post(f'/api/runs/{run.id}/predictions/stream/', body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['report']['created']['vertebrae_count'], 10)
+
+    def test_gzip_exam_create(self):
+        """Test that the exam endpoints accept compressed bodies too"""
+        body = gzip.compress(json.dumps({'external_id': 'GZ-1', 'image_path': 'gz.png'}).encode())
+
+        response = self._post('/api/exams/', body)
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Exam.objects.filter(external_id='GZ-1').exists())
+
+    @override_settings(INGEST_MAX_DECOMPRESSED_BYTES=10000)
+    def test_decompressed_size_is_capped(self):
+        """Test that a small body inflating past the cap is refused without saving anything"""
+        payload = self._payload(self.exams)
+        payload['description'] = ' ' * 1000000
+        body = gzip.compress(json.dumps(payload).encode())
+        self.assertLess(len(body), 10000)
+
+        response = self._post('/api/runs/with-predictions/', body)
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Run.objects.exists())
+
+    def test_corrupt_and_unsupported_encodings(self):
+        """Test that a broken gzip body is a parse error and an unknown coding is refused"""
+        response = self._post('/api/runs/with-predictions/', b'not gzip at all')
+        self.assertEqual(response.status_code, 400)
+
+        response = self._post('/api/runs/with-predictions/', b'{}', encoding='br')
+        self.assertEqual(response.status_code, 415)
+        self.assertIn('br', response.json()['message'])
+        self.assertFalse(Run.objects.exists())
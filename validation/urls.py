@@ -8,6 +8,10 @@ urlpatterns = [
     path('exams/', views.ExamListView.as_view(), name='exam_list'),
     path('exams/<int:pk>/', views.ExamDetailView.as_view(), name='exam_detail'),
     path('exams/<int:exam_id>/image/', views.stream_exam_image, name='exam_image'),
+    path('exams/<int:exam_id>/image/preview/<int:size>/', views.stream_exam_image_preview, name='exam_image_preview'),
+    path('exams/<int:exam_id>/image/tiles/pyramid.dzi', views.stream_exam_image_tile_descriptor, name='exam_image_tiles'),
+    path('exams/<int:exam_id>/image/tiles/pyramid_files/<int:level>/<int:col>_<int:row>.jpg', views.stream_exam_image_tile, name='exam_image_tile'),
+    path('exams/<int:exam_id>/runs/<int:run_id>/masks.png', views.stream_exam_mask_overlay, name='exam_mask_overlay'),
     path('api/exam/<int:pk>/', views.get_exam_data, name='get_exam_data'),
     path('api/validation/update-severity/', views.update_validation_severity, name='update_validation_severity'),
     path('api/validation/submit-all/', views.submit_all_validations, name='submit_all_validations'),
@@ -35,6 +39,8 @@ urlpatterns = [
     path('ajax/run-statistics/', views.get_run_statistics, name='ajax_run_statistics'),
     path('ajax/run-details/<int:run_id>/', views.get_run_details, name='ajax_run_details'),
     path('ajax/bulk-run-details/', views.bulk_get_run_details, name='ajax_bulk_run_details'),
+    path('ajax/image-cache-stats/', views.get_image_cache_stats, name='ajax_image_cache_stats'),
+    path('ajax/hub-stats/', views.get_hub_stats, name='ajax_hub_stats'),
     
     # Analytics and reporting URLs (Admin only)
     path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
@@ -6,7 +6,7 @@ from django.views.generic import ListView, DetailView, FormView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.http import JsonResponse, Http404, HttpResponse, HttpResponseRedirect
-from django.db.models import Count, F, Case, When, Q
+from django.db.models import Count, F, Case, When, Q, OuterRef, Prefetch, Subquery
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
@@ -16,16 +16,27 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django import forms
 from collections import defaultdict, Counter
 import json
+import logging
+import mimetypes
 import os
 
-from huggingface_hub import hf_hub_download
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
+from .images import (
+    ensure_exam_image_metadata, exam_image_metadata, get_exam_image, get_exam_preview, get_exam_tile,
+    get_exam_tile_pyramid, get_image_cache, get_mask_overlay, prefetch_exam_images, serve_image_file,
+)
+from .hub import HubUnavailable, get_hub_client
+from .images.tiles import DESCRIPTOR_NAME
 from .models import Exam, Run, RunAssignment, PredSeverity, Validation, PredVertebra
 from .enums.run_status import RunStatus
 from .enums.severity import Severity
 
 from users.models import CustomUser
 
+logger = logging.getLogger(__name__)
+
 # Create your views here.
 class RunAssignmentListView(LoginRequiredMixin, ListView):
     """View to display a list of all run assignments for the current user."""
@@ -33,50 +44,48 @@ class RunAssignmentListView(LoginRequiredMixin, ListView):
     template_name = 'validation/run_assignment_list.html'
     context_object_name = 'assignments'
     login_url = '/users/login/'
+    paginate_by = 20
+    exams_shown = 10  # exam IDs listed per assignment
     
-    def get_queryset(self):
+    def _visible_assignments(self):
         # Superusers can see all assignments
         if self.request.user.is_superuser:
-            return RunAssignment.objects.all().select_related(
-                'run', 'user', 'assigned_by'
-            ).order_by('-assigned_at')
-        else:
-            # Regular users only see their own assignments, excluding cancelled runs
-            return RunAssignment.objects.filter(
-                user=self.request.user
-            ).exclude(
-                run__status='Cancelled'
-            ).select_related(
-                'run', 'assigned_by'
-            ).order_by('-assigned_at')
+            return RunAssignment.objects.all()
+        # Regular users only see their own assignments, excluding cancelled runs
+        return RunAssignment.objects.filter(
+            user=self.request.user
+        ).exclude(
+            run__status='Cancelled'
+        )
+    
+    def get_queryset(self):
+        # Progress and completion are stored on each assignment by the validation
+        # write paths, so rows are displayed as read, without recounting here.
+        # Runs can hold thousands of exams: count them in SQL and load only the first few.
+        exam_links = Run.exams.through.objects.filter(run_id=OuterRef('run_id')).order_by()
+        return self._visible_assignments().select_related(
+            'run', 'user', 'assigned_by'
+        ).annotate(
+            exam_count=Coalesce(Subquery(exam_links.values('run_id').annotate(n=Count('*')).values('n')), 0)
+        ).prefetch_related(
+            Prefetch(
+                'run__exams',
+                queryset=Exam.objects.only('id', 'external_id').order_by('external_id')[:self.exams_shown],
+                to_attr='shown_exams',
+            )
+        ).order_by('-assigned_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Update completion status for all assignments before displaying
-        assignments = self.get_queryset()
-        for assignment in assignments:
-            assignment.update_completion_status()
-        
-        # Add statistics for the current user (or all users if superuser)
-        if self.request.user.is_superuser:
-            total_assignments = RunAssignment.objects.count()
-            completed_assignments = RunAssignment.objects.filter(is_completed=True).count()
-            context['showing_all_users'] = True
-        else:
-            # For regular users, only count assignments for non-cancelled runs
-            total_assignments = RunAssignment.objects.filter(
-                user=self.request.user
-            ).exclude(
-                run__status='Cancelled'
-            ).count()
-            completed_assignments = RunAssignment.objects.filter(
-                user=self.request.user, 
-                is_completed=True
-            ).exclude(
-                run__status='Cancelled'
-            ).count()
-            context['showing_all_users'] = False
+        # Statistics for the current user (or all users if superuser) in one aggregate query
+        stats = self._visible_assignments().aggregate(
+            total_assignments=Count('id'),
+            completed_assignments=Count('id', filter=Q(is_completed=True)),
+        )
+        total_assignments = stats['total_assignments']
+        completed_assignments = stats['completed_assignments']
+        context['showing_all_users'] = self.request.user.is_superuser
         
         context['total_assignments'] = total_assignments
         context['completed_assignments'] = completed_assignments
@@ -498,6 +507,9 @@ class ExamDetailView(LoginRequiredMixin, DetailView):
         # Add navigation to next/previous exams (always, regardless of predictions)
         self._add_navigation_context(context)
         
+        # The viewer shows the largest preview first and loads the original on demand
+        context['image_preview_size'] = max(settings.IMAGE_PREVIEW_SIZES)
+        
         # Add run status to context for template access control
         if hasattr(self, 'run_status') and self.run_status:
             context['run_status'] = self.run_status
@@ -542,6 +554,9 @@ class ExamDetailView(LoginRequiredMixin, DetailView):
             else:
                 context['next_exam'] = None
             
+            # Warm the image cache for the exams the expert is likely to open next
+            prefetch_exam_images(self.request.user.id, exam_list[current_index + 1:])
+            
             # Add position information within the run
             context['exam_position'] = {
                 'current': current_index + 1,
@@ -574,6 +589,7 @@ def get_exam_data(request, pk):
         'exam_id': exam.id,
         'external_id': exam.external_id,
         'image_path': exam.image_path,
+        'image': exam_image_metadata(exam),
         'predictions': []
     }
     
@@ -1007,9 +1023,8 @@ class AdminRunAssignView(FormView):
         
         return super().form_valid(form)
 
-def stream_exam_image(request, exam_id):
-    """Stream exam image from Hugging Face dataset."""
-    # Get the exam to verify access
+def _get_exam_for_image(request, exam_id):
+    """Return the exam if the current user may view its image, else raise Http404."""
     exam = get_object_or_404(Exam, id=exam_id)
     
     # Check if user has access to this exam
@@ -1022,41 +1037,107 @@ def stream_exam_image(request, exam_id):
         if not has_assignment:
             raise Http404("You don't have permission to view this exam image.")
     
+    return exam
+
+def _record_image_metadata(exam, image_file=None):
+    """Store the image dimensions/checksum on first fetch; never fail the response over it."""
     try:
-        # Get Hugging Face token from environment
-        hf_token = os.environ.get('HF_TOKEN')
-        if not hf_token:
-            return HttpResponse("Hugging Face token not configured", status=500)
-        
-        # Construct the file path in the dataset
-        file_path = exam.image_path
-        print("Attempting to download file:", file_path)
-        # Download the image from Hugging Face
-        repo_id = "sieben-ips/l3net"
-        
-        # Use hf_hub_download to get the file
-        downloaded_file = hf_hub_download(
-            repo_id=repo_id,
-            filename=file_path,
-            token=hf_token,
-            repo_type="dataset",
-            revision=exam.version or 'main' 
-        )
-        print("File downloaded successfully:", downloaded_file)
-        # Read and stream the original image without modifications
-        with open(downloaded_file, 'rb') as f:
-            image_data = f.read()
-        print("Image data read successfully, size:", len(image_data))
-        
-        response = HttpResponse(image_data, content_type='image/jpeg')
-        response['Cache-Control'] = 'max-age=3600'  # Cache for 1 hour
-        return response
+        ensure_exam_image_metadata(exam, image_file)
+    except Exception as e:
+        logger.warning(f"Could not record image metadata for exam {exam.id}: {e}")
+
+def stream_exam_image(request, exam_id):
+    """Stream exam image from its configured image source."""
+    # Get the exam to verify access
+    exam = _get_exam_for_image(request, exam_id)
+    
+    try:
+        # Served from a local mirror, or from the cache once a previous request downloaded it
+        image_file = get_exam_image(exam)
+        _record_image_metadata(exam, image_file)
+        content_type = mimetypes.guess_type(exam.image_path)[0] or 'image/jpeg'
+        
+        # Streams the file (or hands it to the proxy) and answers 304/206 where possible
+        return serve_image_file(request, image_file, content_type=content_type)
+        
+    except ImproperlyConfigured as e:
+        return HttpResponse(str(e), status=500)
+    except HubUnavailable:
+        return HttpResponse("Image service temporarily unavailable", status=503)
+    except Exception as e:
+        logger.error(f"Error streaming image for exam {exam_id}: {e}")
+        return HttpResponse("Image not found", status=404)
+
+def stream_exam_image_preview(request, exam_id, size):
+    """Stream a downscaled JPEG preview of the exam image, rendering it on first request."""
+    exam = _get_exam_for_image(request, exam_id)
+    
+    try:
+        # Metadata is recorded only while the original is open for rendering; once the
+        # preview is cached the original may be gone, and backfill_exam_image_metadata
+        # covers exams whose previews were rendered before
+        record = None if exam.has_image_metadata else lambda original: _record_image_metadata(exam, original)
+        preview_file = get_exam_preview(exam, size, on_original=record)
+        return serve_image_file(request, preview_file, content_type='image/jpeg')
+        
+    except ImproperlyConfigured as e:
+        return HttpResponse(str(e), status=500)
+    except HubUnavailable:
+        return HttpResponse("Image service temporarily unavailable", status=503)
+    except Exception as e:
+        logger.error(f"Error rendering {size}px preview for exam {exam_id}: {e}")
+        return HttpResponse("Image not found", status=404)
+
+def stream_exam_image_tile_descriptor(request, exam_id):
+    """Return the Deep Zoom descriptor of the exam image, building its tile pyramid on first request."""
+    exam = _get_exam_for_image(request, exam_id)
+    
+    try:
+        pyramid_dir = get_exam_tile_pyramid(exam)
+        return serve_image_file(request, pyramid_dir / DESCRIPTOR_NAME, content_type='application/xml')
         
+    except ImproperlyConfigured as e:
+        return HttpResponse(str(e), status=500)
+    except HubUnavailable:
+        return HttpResponse("Image service temporarily unavailable", status=503)
+    except Exception as e:
+        logger.error(f"Error building tile pyramid for exam {exam_id}: {e}")
+        return HttpResponse("Image not found", status=404)
+
+def stream_exam_image_tile(request, exam_id, level, col, row):
+    """Stream a single 256px tile of the exam image pyramid."""
+    exam = _get_exam_for_image(request, exam_id)
+    
+    try:
+        tile_file = get_exam_tile(exam, level, col, row)
+        if tile_file is None:
+            return HttpResponse("Tile not found", status=404)
+        return serve_image_file(request, tile_file, content_type='image/jpeg')
+        
+    except ImproperlyConfigured as e:
+        return HttpResponse(str(e), status=500)
+    except HubUnavailable:
+        return HttpResponse("Image service temporarily unavailable", status=503)
     except Exception as e:
-        # Log the error (you might want to use proper logging)
-        print(f"Error streaming image for exam {exam_id}: {str(e)}")
+        logger.error(f"Error streaming tile {level}/{col}_{row} for exam {exam_id}: {e}")
         return HttpResponse("Image not found", status=404)
 
+def stream_exam_mask_overlay(request, exam_id, run_id):
+    """Stream the transparent PNG of an exam's predicted vertebra masks in a run, rendering it on first request."""
+    exam = _get_exam_for_image(request, exam_id)
+    if not request.user.is_superuser and not RunAssignment.objects.filter(user=request.user, run_id=run_id).exists():
+        raise Http404("You don't have permission to view this run.")
+    
+    try:
+        overlay_file = get_mask_overlay(run_id, exam.id)
+        if overlay_file is None:
+            return HttpResponse("No masks for this exam in this run", status=404)
+        return serve_image_file(request, overlay_file, content_type='image/png')
+        
+    except Exception as e:
+        logger.error(f"Error rendering mask overlay for exam {exam_id} in run {run_id}: {e}")
+        return HttpResponse("Mask overlay not available", status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_validation_severity(request):
@@ -1129,10 +1210,13 @@ def submit_all_validations(request):
             user_id=request.user
         )
         
-        # Update validated_at timestamp for existing validations
+        # Update validated_at timestamp for existing validations; only the first
+        # submission of a validation moves the assignment's progress
         from django.utils import timezone
         validated_at = timezone.now()
-        updated_count = existing_validations.update(validated_at=validated_at)
+        resubmitted = existing_validations.filter(validated_at__isnull=False).update(validated_at=validated_at)
+        newly_submitted = existing_validations.filter(validated_at__isnull=True).update(validated_at=validated_at)
+        updated_count = resubmitted + newly_submitted
         
         # For predictions without validations, create them as "correct" (unchanged)
         existing_prediction_ids = set(existing_validations.values_list('pred_severity_id', flat=True))
@@ -1151,6 +1235,11 @@ def submit_all_validations(request):
         if new_validations:
             Validation.objects.bulk_create(new_validations)
             updated_count += len(new_validations)
+        
+        # bulk_create and update() skip Validation.save(), so move the counters here
+        RunAssignment.objects.filter(run_id=run_id, user=request.user).add_progress(
+            validated=newly_submitted + len(new_validations)
+        )
 
         return JsonResponse({
             'message': f'Successfully submitted {updated_count} validations for this exam',
@@ -1445,6 +1534,26 @@ def bulk_get_run_details(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def get_image_cache_stats(request):
+    """AJAX endpoint to get hit/miss counters and disk usage of the exam image cache."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Admin access required'}, status=403)
+    
+    return JsonResponse(get_image_cache().stats())
+
+
+@login_required
+@require_http_methods(["GET"])
+def get_hub_stats(request):
+    """AJAX endpoint to get circuit breaker state and latency/error counters of Hugging Face hub calls."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Admin access required'}, status=403)
+    
+    return JsonResponse(get_hub_client().stats())
+
+
 # Analytics Views for Admin Dashboard
 @staff_member_required
 def analytics_dashboard(request):
@@ -1818,31 +1927,19 @@ def duplicate_run_for_intra_operator(request, run_id):
             # Copy all exam relationships
             duplicate_run.exams.set(original_run.exams.all())
             
-            # Copy all assignments to maintain expert consistency for intra-operator analysis
-            from validation.models import RunAssignment
-            original_assignments = RunAssignment.objects.filter(run=original_run)
-            
-            for assignment in original_assignments:
-                RunAssignment.objects.create(
-                    run=duplicate_run,
-                    user=assignment.user,
-                    assigned_by=request.user,  # Current admin who created the duplicate
-                    notes=f"Auto-assigned from original run {original_run.id} for intra-operator reliability study. "
-                          f"Original assignment: {assignment.notes or 'No notes'}"
-                )
-            
             # Duplicate all predicted severities with new IDs
-            for pred_severity in original_run.predicted_severities.all():
-                # Create new prediction with same data but new ID
-                new_pred = PredSeverity.objects.create(
+            PredSeverity.objects.bulk_create([
+                PredSeverity(
                     severity_name=pred_severity.severity_name,
                     confidence=pred_severity.confidence,
                     vertebrae_level=pred_severity.vertebrae_level,
                     run_id=duplicate_run,
-                    exam_id=pred_severity.exam_id,
-                    model_version=pred_severity.model_version,
+                    exam_id_id=pred_severity.exam_id_id,
+                    model_version_id=pred_severity.model_version_id,
                     bounding_box=pred_severity.bounding_box
                 )
+                for pred_severity in original_run.predicted_severities.all()
+            ], batch_size=settings.INGEST_BATCH_SIZE)
             
             # Copy predicted vertebrae if they exist
             for pred_vertebra in original_run.predicted_vertebrae.all():
@@ -1852,7 +1949,23 @@ def duplicate_run_for_intra_operator(request, run_id):
                     run_id=duplicate_run,
                     exam_id=pred_vertebra.exam_id,
                     model_version=pred_vertebra.model_version,
-                    polygon=pred_vertebra.polygon  # Fixed: was bounding_box
+                    polygon=pred_vertebra.polygon,  # Fixed: was bounding_box
+                    contour=pred_vertebra.contour,
+                    mask=pred_vertebra.mask
+                )
+            
+            # Copy all assignments to maintain expert consistency for intra-operator analysis;
+            # created after the predictions so they start with the run's progress counters
+            from validation.models import RunAssignment
+            original_assignments = RunAssignment.objects.filter(run=original_run).select_related('user')
+            
+            for assignment in original_assignments:
+                RunAssignment.objects.create(
+                    run=duplicate_run,
+                    user=assignment.user,
+                    assigned_by=request.user,  # Current admin who created the duplicate
+                    notes=f"Auto-assigned from original run {original_run.id} for intra-operator reliability study. "
+                          f"Original assignment: {assignment.notes or 'No notes'}"
                 )
             
             messages.success(